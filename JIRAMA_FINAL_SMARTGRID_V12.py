@@ -1,162 +1,413 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-import plotly.express as px
-import hashlib
-import random
-import os
-import base64
-from gtts import gTTS
-from datetime import datetime
+import tempfile
+from datetime import date, timedelta
+from synthese_vocale import cache_depuis_environnement
+from journal_audit import JournalAudit
+from moteur_diagnostic import REGLES_SUPERVISION
+from index_parc import index_parc, TAILLE_PAGE, statistiques as stats_index
+from ingestion_mqtt import ingestion_depuis_environnement
+from pertes_glissantes import appliquer_ratios
+from score_anomalie import scorer_parc, SEUIL_SCORE_HAUTE
+from rendu_carte import figure_carte, statistiques as stats_carte
+from export_missions import FORMATS, fichier_export
+from magasin_partage import magasin
+import mesures_perf
+from mesures_perf import chrono, taille_parc, centiles, histogramme, memoire, session_courante, outils_profil, demarrer_profil, terminer_profil
+from simulateur_parc import instantane, ids_transfos, ecrire_simulation
+from tableau_pagine import tableau_pagine
+from etat_partage import etat_depuis_environnement, initialiser_comptes, compte, enregistrer_compte, ouvrir_session, script_cookie, COOKIE_SESSION
+from identifiants import hacher, a_migrer, VerificateurConnexions, CacheJetons, SurchargeConnexions
 
 # --- 1. SÉCURITÉ ET AUTHENTIFICATION ---
-def make_hashes(password):
-    return hashlib.sha256(str.encode(password)).hexdigest()
+# Comptes : admin_jirama / admin123 | agent_tana / agent123
+COMPTES_INITIAUX = {"admin_jirama": ("admin123", "ADMIN"), "agent_tana": ("agent123", "AGENT")}
 
-def check_hashes(password, hashed_text):
-    return make_hashes(password) == hashed_text
+# Sessions de connexion et comptes dans le backend d'état (JIRAMA_ETAT, voir etat_partage.py) : toute réplique
+# derrière l'équilibreur de charge retrouve la session à partir du jeton du cookie. Comptes écrits une fois par processus
+@st.cache_resource
+def etat():
+    backend = etat_depuis_environnement()
+    initialiser_comptes(backend, {u: {"pwd": hacher(pwd), "role": role} for u, (pwd, role) in COMPTES_INITIAUX.items()})
+    return backend
 
-# Comptes : admin_jirama / admin123 | agent_tana / agent123
-users = {
-    "admin_jirama": {"pwd": make_hashes("admin123"), "role": "ADMIN"},
-    "agent_tana": {"pwd": make_hashes("agent123"), "role": "AGENT"}
-}
-
-if 'logged_in' not in st.session_state:
-    st.session_state.update({'logged_in': False, 'role': None, 'user': None, 'audit_log': []})
-
-def add_audit(action, target):
-    st.session_state.audit_log.append({
-        "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "User": st.session_state.user,
-        "Action": action,
-        "Cible": target
-    })
-
-# --- 2. FONCTION SYNTHÈSE VOCALE (TTS) ---
-def speak_text(text, lang_code):
-    try:
-        tts = gTTS(text=text, lang=lang_code)
-        filename = "temp_speech.mp3"
-        tts.save(filename)
-        with open(filename, "rb") as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            md = f'<audio controls autoplay="true"><source src="data:audio/mp3;base64,{b64}" type="audio/mp3"></audio>'
-            st.markdown(md, unsafe_allow_html=True)
-        os.remove(filename)
-    except Exception as e:
-        st.error(f"Erreur audio : {e}")
-
-# --- 3. INTERFACE DE CONNEXION ---
-if not st.session_state.logged_in:
-    st.title("🔐 JIRAMA : Accès Sécurisé Smart Grid")
-    with st.form("login"):
-        u = st.text_input("Matricule / Identifiant")
-        p = st.text_input("Mot de passe", type='password')
-        if st.form_submit_button("Se connecter"):
-            if u in users and check_hashes(p, users[u]["pwd"]):
-                st.session_state.update({'logged_in': True, 'role': users[u]["role"], 'user': u})
-                st.rerun()
-            else: st.error("Identifiants invalides")
-    st.stop()
-
-# --- 4. LOGIQUE MÉTIER (DONNÉES ET IA) ---
-st.sidebar.title(f"👤 {st.session_state.user}")
-lang = st.sidebar.radio("Langue de l'Assistant", ["FR", "EN"])
-lang_code = 'fr' if lang == "FR" else 'en'
-
-@st.cache_data
-def load_data():
-    regions = ["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"]
-    data = []
-    # Ajout du transformateur pilote obligatoire
-    data.append({"ID": "TR-PILOTE-01", "Région": "Analamanga (Isotry)", "Charge_%": 105, "Perte_Vol_%": 35.0, "Priorité": "HAUTE"})
-    
-    for i in range(11):
-        sortie = random.randint(1000, 2500)
-        facture = sortie * random.uniform(0.40, 0.98)
-        perte_pct = round((1 - (facture / sortie)) * 100, 1)
-        charge = random.randint(40, 115)
-        data.append({
-            "ID": f"TR-MDG-{200+i}", "Région": random.choice(regions),
-            "Charge_%": charge, "Perte_Vol_%": perte_pct,
-            "Priorité": "HAUTE" if perte_pct > 25 or charge > 100 else "NORMAL"
+# Empreintes scrypt vérifiées dans un pool borné ; session vérifiée gardée en cache entre les runs (voir identifiants.py)
+@st.cache_resource
+def verificateur():
+    return VerificateurConnexions()
+
+@st.cache_resource
+def cache_jetons():
+    return CacheJetons()
+
+# Jeton : cookie du navigateur, jamais l'URL. st.context.cookies reste celui de l'ouverture de la page,
+# d'où la copie en session_state à la connexion / déconnexion. Anciens liens ?session=... ignorés.
+if "session" in st.query_params:
+    del st.query_params["session"]
+jeton = st.session_state.get('jeton', st.context.cookies.get(COOKIE_SESSION))
+connexion = cache_jetons().lire(etat(), jeton)
+if connexion is not None and st.context.cookies.get(COOKIE_SESSION) != jeton:
+    components.html(script_cookie(jeton), height=0)
+elif connexion is None and st.context.cookies.get(COOKIE_SESSION):
+    components.html(script_cookie("", 0), height=0)
+st.session_state.update({'logged_in': connexion is not None, 'role': connexion and connexion["role"],
+                         'user': connexion and connexion["utilisateur"]})
+
+# Profilage d'un run complet demandé depuis l'onglet Performances (arrêté dans le finally, quelle que soit l'issue du run)
+@st.cache_resource
+def rapports_profil():
+    # Rapports par session : après st.stop / st.rerun, st.session_state n'est plus modifiable dans le
+    # finally ; le rapport y est repris au run suivant
+    return {}
+
+rapports, id_session = rapports_profil(), session_courante()
+if id_session in rapports:
+    st.session_state.profil_resultat = rapports.pop(id_session)
+capture_profil = demarrer_profil(st.session_state.pop('profil_demande')) if 'profil_demande' in st.session_state else None
+
+try:
+    # Journal d'audit persistant, commun à toutes les sessions (conservé après déconnexion)
+    @st.cache_resource
+    def journal():
+        return JournalAudit()
+
+    def add_audit(action, target):
+        journal().ajouter(st.session_state.user, action, target)
+
+    # Historique des relevés partagé par les sessions (Arrow IPC partitionné, voir historique_parc.py)
+    @st.cache_resource
+    def historique():
+        from historique_parc import HistoriqueParc  # pyarrow.dataset : chargé à l'ouverture de l'onglet Historique
+        return HistoriqueParc()
+
+    # --- 2. FONCTION SYNTHÈSE VOCALE (TTS) ---
+    # Cache audio partagé par toutes les sessions : un rapport déjà lu est rejoué sans nouvelle synthèse
+    @st.cache_resource
+    def cache_audio():
+        return cache_depuis_environnement()
+
+    def speak_text(text, lang_code):
+        try:
+            with chrono("tts"):
+                clip = cache_audio().demander(text, lang_code).result(timeout=30)
+            if st.get_option("server.enableStaticServing"):
+                st.audio(clip.url, format=clip.mime, autoplay=True)
+            else:
+                st.audio(cache_audio().lire_octets(clip), format=clip.mime, autoplay=True)
+        except Exception as e:
+            st.error(f"Erreur audio : {e}")
+
+    # --- 3. INTERFACE DE CONNEXION ---
+    if not st.session_state.logged_in:
+        st.title("🔐 JIRAMA : Accès Sécurisé Smart Grid")
+        with st.form("login"):
+            u = st.text_input("Matricule / Identifiant")
+            p = st.text_input("Mot de passe", type='password')
+            if st.form_submit_button("Se connecter"):
+                fiche = compte(etat(), u)
+                try:
+                    valide = verificateur().soumettre(p, fiche and fiche["pwd"]).result()
+                except SurchargeConnexions:
+                    valide = None
+                    st.warning("Trop de connexions simultanées : réessayez dans quelques secondes.")
+                if valide:
+                    # Ancienne empreinte SHA-256 : remplacée par une empreinte scrypt, calculée hors du script
+                    if a_migrer(fiche["pwd"]):
+                        backend = etat()
+                        try:
+                            verificateur().hacher(p).add_done_callback(lambda f: enregistrer_compte(backend, u, {**fiche, "pwd": f.result()}))
+                        except SurchargeConnexions:
+                            pass  # migration à la prochaine connexion
+                    st.session_state.jeton = ouvrir_session(etat(), u, fiche["role"])
+                    st.session_state.update({'logged_in': True, 'role': fiche["role"], 'user': u})
+                    st.rerun()
+                elif valide is not None: st.error("Identifiants invalides")
+        st.stop()
+
+    # --- 4. LOGIQUE MÉTIER (DONNÉES ET IA) ---
+    st.sidebar.title(f"👤 {st.session_state.user}")
+
+    # Parc simulé reproductible (graine JIRAMA_GRAINE), tiré en une passe vectorisée (voir simulateur_parc.py)
+    def load_data():
+        # Ajout du transformateur pilote obligatoire
+        pilote = pd.DataFrame([{"ID": "TR-PILOTE-01", "Région": "Analamanga (Isotry)", "Charge_%": 105, "Perte_Vol_%": 35.0, "Priorité": "HAUTE"}])
+        nb = taille_parc(11)
+        parc = instantane(nb, sortie_kw=(1000, 2500), taux_facture=(0.40, 0.98), charge=(40, 115))
+        perte_pct = parc["Perte_%"].round(1)
+        simules = pd.DataFrame({
+            "ID": ids_transfos(nb, "TR-MDG-", 200), "Région": parc["Région"],
+            "Charge_%": parc["Charge_%"], "Perte_Vol_%": perte_pct,
+            "Priorité": ((perte_pct > 25) | (parc["Charge_%"] > 100)).map({True: "HAUTE", False: "NORMAL"}),
         })
-    return pd.DataFrame(data)
+        return pd.concat([pilote, simules], ignore_index=True)
+
+    # Mesures temps réel des pinces MQTT (ex: TR-PILOTE-01), si un broker est configuré (JIRAMA_MQTT_BROKER)
+    def appliquer_mesures_live(df, live, ratios, regions_connues):
+        live = live.dropna(subset=["Charge_%", "Perte_Vol_%"])
+        if live.empty:
+            return df
+        # Perte évaluée sur 24h glissantes plutôt que sur le dernier relevé de 15 min
+        live = appliquer_ratios(live, ratios, "ID", "Perte_Vol_%")
+        live = live.assign(Région=live["ID"].map(regions_connues).fillna("Non localisé"))[
+            ["ID", "Région", "Charge_%", "Perte_Vol_%"] + [c for c in ratios.columns if c in live.columns]]
+        live["Priorité"] = ((live["Perte_Vol_%"] > 25) | (live["Charge_%"] > 100)).map({True: "HAUTE", False: "NORMAL"})
+        return pd.concat([df[~df["ID"].isin(live["ID"])], live], ignore_index=True)
+
+    # Magasin unique par processus : les sessions partagent les colonnes au lieu d'une copie chacune
+    with chrono("donnees"):
+        flotte = magasin("jirama_v12", load_data)
+        version_donnees, df = flotte.vue_versionnee()
+        ingestion = ingestion_depuis_environnement()
+        if ingestion is not None:
+            # Régions du parc : partition des relevés MQTT dans l'historique (ingestion_mqtt.py)
+            ingestion.regions = df.set_index("ID")["Région"]
+            df = appliquer_mesures_live(df, ingestion.magasin.instantane(), ingestion.agregateur.ratios(), ingestion.regions)
+        version_carte = (version_donnees, ingestion.magasin.version if ingestion is not None else 0)
 
-df = load_data()
+    # Score de suspicion vs pairs de la même région, complément des seuils fixes pour la Priorité
+    with chrono("diagnostic"):
+        df = df.join(scorer_parc(df, "Région", "Perte_Vol_%"))
+        df.loc[df["Score_Suspicion"] >= SEUIL_SCORE_HAUTE, "Priorité"] = "HAUTE"
 
-# --- 5. DASHBOARD PRINCIPAL ---
-st.title("🎙️ JIRAMA AI : Supervision Vocale & Anti-Fraude")
+    if st.session_state.role == "ADMIN":
+        st.sidebar.caption(f"Données parc : version {version_donnees}")
+        if st.sidebar.button("🔄 Recharger les données"):
+            add_audit("RECHARGEMENT_DONNEES", f"v{flotte.rafraichir()}")
+            st.rerun()
 
-# Sélection du transformateur
-selected_id = st.selectbox("Sélectionner un transformateur pour rapport vocal", df['ID'])
-row = df[df['ID'] == selected_id].iloc[0]
+    # --- 5. DASHBOARD PRINCIPAL ---
+    st.title("🎙️ JIRAMA AI : Supervision Vocale & Anti-Fraude")
 
-def get_diagnosis(r):
-    diag = []
-    if r['Perte_Vol_%'] > 25: diag.append("🚩 Fraude détectée" if lang=="FR" else "🚩 Fraud detected")
-    if r['Charge_%'] > 100: diag.append("⚠️ Surcharge critique" if lang=="FR" else "⚠️ Critical Overload")
-    return " | ".join(diag) if diag else ("✅ Stable" if lang=="FR" else "✅ Stable")
+    # Index par ID partagé entre sessions : accès direct à la ligne, diagnostics précalculés (voir index_parc.py)
+    with chrono("diagnostic"):
+        index = index_parc(("v12", version_carte), df, "ID", "Région", REGLES_SUPERVISION)
 
-diagnosis = get_diagnosis(row)
+    def get_diagnosis(r, lang):
+        return index.diagnostic(r['ID'], lang)
 
-if lang == "FR":
-    script = f"Transformateur {row['ID']}. Région {row['Région']}. Charge {row['Charge_%']} pourcent. Vol suspecté {row['Perte_Vol_%']} pourcent. Diagnostic : {diagnosis}."
-else:
-    script = f"Transformer {row['ID']}. Region {row['Région']}. Load {row['Charge_%']} percent. Theft suspected {row['Perte_Vol_%']} percent. Diagnosis: {diagnosis}."
+    # Fragment : langue, recherche et choix du transformateur ne relancent que le rapport vocal
+    @st.fragment
+    def rapport_vocal(index):
+        lang = st.radio("Langue de l'Assistant", ["FR", "EN"], horizontal=True)
+        lang_code = 'fr' if lang == "FR" else 'en'
 
-col1, col2 = st.columns([2, 1])
-with col1:
-    st.info(f"**Analyse du Bot :** {diagnosis}")
-    st.write(f"**Script vocal :** {script}")
-with col2:
-    if st.button("🔊 LIRE LE RAPPORT"):
-        speak_text(script, lang_code)
-        add_audit("LECTURE_VOCALE", row['ID'])
+        # Sélection du transformateur : recherche côté serveur, seule la page courante part au navigateur
+        s1, s2, s3 = st.columns([2, 2, 1])
+        region_choisie = s1.selectbox("Région", ["Toutes"] + index.regions)
+        region_choisie = None if region_choisie == "Toutes" else region_choisie
+        prefixe = s2.text_input("Rechercher un ID (début, ex: TR-MDG-2)")
+        _, total = index.rechercher(prefixe, region_choisie)
+        nb_pages = max(1, -(-total // TAILLE_PAGE))
+        page = s3.number_input(f"Page (sur {nb_pages})", 1, nb_pages, 1, key=f"page_{region_choisie}_{prefixe}")
+        ids_page, total = index.rechercher(prefixe, region_choisie, page)
+        if not ids_page:
+            st.warning("Aucun transformateur ne correspond à la recherche.")
+            ids_page, total = index.rechercher()
+        selected_id = st.selectbox("Sélectionner un transformateur pour rapport vocal", ids_page)
+        st.caption(f"{total:,} transformateur(s) — page {page}/{nb_pages}")
+        row = index.ligne(selected_id)
 
-st.markdown("---")
+        with chrono("diagnostic"):
+            diagnosis = get_diagnosis(row, lang)
 
-# --- 6. VUES PAR RÔLE ---
+        if lang == "FR":
+            script = f"Transformateur {row['ID']}. Région {row['Région']}. Charge {row['Charge_%']} pourcent. Vol suspecté {row['Perte_Vol_%']} pourcent. Diagnostic : {diagnosis}."
+        else:
+            script = f"Transformer {row['ID']}. Region {row['Région']}. Load {row['Charge_%']} percent. Theft suspected {row['Perte_Vol_%']} percent. Diagnosis: {diagnosis}."
 
-# --- VUE ADMIN ---
-if st.session_state.role == "ADMIN":
-    st.subheader("🛡️ Console Administration & Protocoles")
-    tab_map, tab_audit, tab_proto, tab_checklist = st.tabs(["🗺️ Cartographie", "📜 Audit Log", "🧪 Protocole Pilote", "📋 Check-list Go-Live"])
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.info(f"**Analyse du Bot :** {diagnosis}")
+            if pd.notna(row.get('Perte_24h_%')):
+                st.caption(f"Pertes glissantes : 1h {row['Perte_1h_%']}% | 24h {row['Perte_24h_%']}% | 30j {row['Perte_30j_%']}%")
+            st.write(f"**Script vocal :** {script}")
+        with col2:
+            if st.button("🔊 LIRE LE RAPPORT"):
+                speak_text(script, lang_code)
+                add_audit("LECTURE_VOCALE", row['ID'])
+
+    rapport_vocal(index)
+
+    st.markdown("---")
+
+    # --- 6. VUES PAR RÔLE ---
+
+    # Fragment : le filtre de région ne relance que la carte
+    @st.fragment
+    def carte_admin(df, version_carte):
+        regions_carte = st.multiselect("Filtrer par région", sorted(df["Région"].unique()))
+        vue_carte = df[df["Région"].isin(regions_carte)] if regions_carte else df
+        with chrono("figure"):
+            fig = figure_carte(vue_carte, ("v12_admin", version_carte, tuple(regions_carte)),
+                               x="Région", y="Perte_Vol_%", size="Charge_%", color="Priorité", hover_name="ID")
+            st.plotly_chart(fig, use_container_width=True)
+
+    # Fragment : filtres, pages et export du journal sans relancer la carte ni le rapport
+    @st.fragment
+    def journal_admin():
+        j = journal()
+        j.vider()
+        f1, f2, f3 = st.columns(3)
+        filtres = {
+            "utilisateur": f1.selectbox("Utilisateur", [""] + j.valeurs_distinctes("utilisateur")),
+            "action": f2.selectbox("Action", [""] + j.valeurs_distinctes("action")),
+            "cible": f3.text_input("Cible (ex: TR-PILOTE-01)").strip(),
+        }
+        # Pagination par curseur : pile des curseurs des pages déjà parcourues
+        if st.session_state.get('audit_filtres') != filtres:
+            st.session_state.update({'audit_filtres': filtres, 'audit_pages': [None]})
+        pages = st.session_state.audit_pages
+        page, suivant = j.rechercher(**filtres, avant_id=pages[-1])
+        if page.empty:
+            st.write("Aucun log.")
+        else:
+            st.table(page)
+        n1, n2, n3 = st.columns(3)
+        if n1.button("◀ Page précédente", disabled=len(pages) == 1):
+            pages.pop()
+            st.rerun(scope="fragment")
+        if n2.button("Page suivante ▶", disabled=suivant is None):
+            pages.append(suivant)
+            st.rerun(scope="fragment")
+        n3.caption(f"{j.compter(**filtres):,} entrées — page {len(pages)}")
+        e1, e2 = st.columns(2)
+        e1.download_button("📥 Exporter le journal (CSV)", lambda: j.export_csv_fichier(**filtres), "journal_audit.csv", "text/csv")
+        if e2.button("💾 Sauvegarder la base des logs"):
+            st.success(f"Sauvegarde créée : {j.sauvegarder()}")
+
+    # Fragment : les filtres ne relancent que l'historique ; seules les partitions (région, jour)
+    # sélectionnées sont ouvertes, mappées en mémoire
+    @st.fragment
+    def historique_admin():
+        h = historique()
+        regions_historique = h.regions()
+        if not regions_historique:
+            st.info("Aucun relevé historisé pour l'instant.")
+            # Démo : 7 jours simulés du parc (scénarios B et C du protocole injectés à mi-période)
+            if st.button("🧪 Importer 7 jours simulés"):
+                with tempfile.TemporaryDirectory() as dossier:
+                    ecrire_simulation(dossier, taille_parc(11), 7 * 96, injections={"B": 0.05, "C": 0.02}, debut_injection=3 * 96)
+                    h.importer_simulation(dossier)
+                add_audit("IMPORT_HISTORIQUE", "Simulation_7j")
+                st.rerun(scope="fragment")
+            return
+        h1, h2, h3 = st.columns(3)
+        regions_vue = h1.multiselect("Régions", regions_historique, default=regions_historique[:1])
+        periode = h2.date_input("Période", (date.today() - timedelta(days=6), date.today()))
+        priorites = h3.multiselect("Priorité", ["HAUTE", "NORMAL"])
+        if not regions_vue or len(periode) != 2:
+            st.caption("Choisir au moins une région et une période complète.")
+            return
+        with chrono("historique"):
+            synthese = h.pertes_journalieres(regions_vue, periode[0], periode[1], priorites)
+        if synthese.empty:
+            st.write("Aucun relevé sur cette sélection.")
+            return
+        st.line_chart(synthese, x="Jour", y="Perte_%", color="Région")
+        tableau_pagine(synthese, "historique_admin")
+
+    # Fragment : centiles, histogrammes, caches et mémoire du processus ; rafraîchis sans relancer le reste
+    @st.fragment
+    def performances_admin():
+        p1, p2 = st.columns(2)
+        # Interrupteur global du processus : recopié dans le widget à chaque run (un autre admin a pu le
+        # changer), écrit seulement sur un changement réel de cette session
+        st.session_state.instrumentation_active = mesures_perf.actif
+        p1.toggle("Instrumentation active", key="instrumentation_active",
+                  on_change=lambda: mesures_perf.activer(st.session_state.instrumentation_active))
+        portee = p2.radio("Portée", ["Toutes les sessions", "Cette session"], horizontal=True)
+        session = session_courante() if portee == "Cette session" else None
+        lignes = centiles(session)
+        if lignes:
+            st.dataframe(pd.DataFrame(lignes), hide_index=True, use_container_width=True)
+            section = st.selectbox("Histogramme de la section", [l["Section"] for l in lignes])
+            bornes, effectifs = histogramme(section, session)
+            st.bar_chart(pd.DataFrame({"Durée (ms)": bornes.round(2), "Runs": effectifs}), x="Durée (ms)", y="Runs")
+        else:
+            st.write("Aucune mesure pour l'instant.")
+
+        caches = {"Cartographie (figures)": stats_carte, "Index du parc": stats_index, "Audio TTS": cache_audio().statistiques(),
+                  "Sessions vérifiées (jetons)": cache_jetons().statistiques}
+        st.dataframe(pd.DataFrame([
+            {"Cache": nom, "Succès": s["succes"], "Échecs": s["echecs"],
+             "Taux de succès": f"{s['succes'] / max(s['succes'] + s['echecs'], 1):.0%}"}
+            for nom, s in caches.items()
+        ]), hide_index=True, use_container_width=True)
+        m = memoire()
+        m1, m2 = st.columns(2)
+        m1.metric("Mémoire du processus (RSS)", f"{m['rss_mo']:,.0f} Mo" if m['rss_mo'] else "n/d")
+        m2.metric("Pic mémoire", f"{m['pic_mo']:,.0f} Mo" if m['pic_mo'] else "n/d")
+
+        o1, o2 = st.columns(2)
+        outil = o1.radio("Profileur", outils_profil(), horizontal=True)
+        if o2.button("🔬 Profiler le prochain run complet"):
+            st.session_state.profil_demande = outil
+            st.rerun()
+        if 'profil_resultat' in st.session_state:
+            st.code(st.session_state.profil_resultat, language=None)
+
+    # Fragment : le choix du format d'export ne relance que la liste des missions
+    @st.fragment
+    def missions_terrain(missions):
+        tableau_pagine(missions, "missions_terrain")
+        format_export = st.radio("Format d'export", list(FORMATS), horizontal=True)
+        fmt = FORMATS[format_export]
+        # Fichier généré uniquement au clic, bloc par bloc, avec GPS et motif (voir export_missions.py)
+        if st.download_button(f"📥 Exporter Missions ({format_export})",
+                              lambda: fichier_export(missions, format_export, col_id="ID", col_region="Région",
+                                                     col_perte="Perte_Vol_%", col_charge="Charge_%", seuil_fraude=25),
+                              f"missions_tana.{fmt['extension']}", fmt['mime']):
+            add_audit(fmt['audit'], "Liste_Missions")
+
+    # --- VUE ADMIN ---
+    if st.session_state.role == "ADMIN":
+        st.subheader("🛡️ Console Administration & Protocoles")
+        tab_map, tab_histo, tab_audit, tab_perf, tab_proto, tab_checklist = st.tabs(["🗺️ Cartographie", "📈 Historique", "📜 Audit Log", "⏱️ Performances", "🧪 Protocole Pilote", "📋 Check-list Go-Live"])
     
-    with tab_map:
-        fig = px.scatter(df, x="Région", y="Perte_Vol_%", size="Charge_%", color="Priorité", hover_name="ID")
-        st.plotly_chart(fig, use_container_width=True)
+        with tab_map:
+            carte_admin(df, version_carte)
+
+        with tab_histo:
+            historique_admin()
     
-    with tab_audit:
-        st.table(pd.DataFrame(st.session_state.audit_log)) if st.session_state.audit_log else st.write("Aucun log.")
-
-    with tab_proto:
-        st.markdown("""
-        ### 🧪 Protocole de Test Pilote : TR-PILOTE-01
-        1. **Configuration** : Emplacement Isotry. Capteur MQTT actif.
-        2. **Scénario A (Référence)** : Vérifier 0% fraude -> Bot doit dire "Stable".
-        3. **Scénario B (Injection)** : Simuler 35% écart -> Alerte rouge immédiate.
-        4. **Scénario C (Surcharge)** : Simuler >100% charge -> Alerte Orange + Batterie.
-        """)
-
-    with tab_checklist:
-        st.markdown("""
-        ### 📋 Check-list Finale Go-Live
-        - [ ] **MQTT SSL** : Certificat installé sur le broker.
-        - [ ] **Secrets** : Mots de passe déplacés dans `secrets.toml`.
-        - [ ] **Requirements** : gTTS, plotly, paho-mqtt installés.
-        - [ ] **Backup** : Base de données des logs sauvegardée.
-        """)
-
-# --- VUE AGENT ---
-else:
-    st.subheader("📋 Mes Missions Terrain")
-    missions = df[df['Priorité'] == "HAUTE"]
-    st.dataframe(missions)
-    if st.download_button("📥 Exporter Missions (CSV)", missions.to_csv().encode('utf-8'), "missions_tana.csv", "text/csv"):
-        add_audit("EXPORT_CSV", "Liste_Missions")
-
-if st.sidebar.button("Déconnexion"):
-    st.session_state.logged_in = False
+        with tab_audit:
+            journal_admin()
+
+        with tab_perf:
+            performances_admin()
+
+        with tab_proto:
+            st.markdown("""
+            ### 🧪 Protocole de Test Pilote : TR-PILOTE-01
+            1. **Configuration** : Emplacement Isotry. Capteur MQTT actif.
+            2. **Scénario A (Référence)** : Vérifier 0% fraude -> Bot doit dire "Stable".
+            3. **Scénario B (Injection)** : Simuler 35% écart -> Alerte rouge immédiate.
+            4. **Scénario C (Surcharge)** : Simuler >100% charge -> Alerte Orange + Batterie.
+            """)
+
+        with tab_checklist:
+            st.markdown("""
+            ### 📋 Check-list Finale Go-Live
+            - [ ] **MQTT SSL** : Certificat installé sur le broker.
+            - [ ] **Secrets** : Mots de passe déplacés dans `secrets.toml`.
+            - [ ] **Requirements** : gTTS, plotly, paho-mqtt installés.
+            - [ ] **Backup** : Base de données des logs sauvegardée.
+            """)
+
+    # --- VUE AGENT ---
+    else:
+        st.subheader("📋 Mes Missions Terrain")
+        missions_terrain(df[df['Priorité'] == "HAUTE"].sort_values("Score_Suspicion", ascending=False))
+
+    if st.sidebar.button("Déconnexion"):
+        cache_jetons().fermer(etat(), jeton)
+        st.session_state.update({'jeton': None, 'logged_in': False})
+        st.rerun()
+finally:
+    # Fin du run profilé (y compris st.stop, st.rerun ou exception) : rapport affiché par l'onglet
+    # Performances au run suivant
+    if capture_profil is not None:
+        rapports[id_session] = terminer_profil(capture_profil)
+if capture_profil is not None:
     st.rerun()
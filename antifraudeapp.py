@@ -1,7 +1,12 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import random
+from magasin_partage import magasin
+from rendu_carte import figure_carte
+from mesures_perf import chrono, taille_parc
+from simulateur_parc import instantane, ids_transfos
+from tableau_pagine import tableau_pagine
+from planification_nocturne import dernier_plan
+from stockage_batteries import simuler_memorise
 
 # --- CONFIGURATION JIRAMA ---
 st.set_page_config(page_title="JIRAMA - Supervision Nationale", layout="wide")
@@ -9,62 +14,82 @@ st.title("⚡ JIRAMA : Plateforme de Lutte contre la Fraude & Optimisation")
 
 # --- 1. SIMULATION DONNÉES TRANSFORMATEURS (Surcharge & Fraude) ---
 # Dans la réalité, ces données proviennent de compteurs communicants Schneider/Siemens
-regions = ["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"]
-data_transfo = []
-
-for i in range(20):
-    region = random.choice(regions)
-    energie_sortie_kw = random.randint(500, 1500)
-    energie_facturee_kw = energie_sortie_kw * random.uniform(0.6, 0.95) # Le reste est de la perte/vol
-    perte_pourcentage = (1 - (energie_facturee_kw / energie_sortie_kw)) * 100
-    charge_transfo = random.randint(40, 110) # > 100% = Surcharge
-    
-    data_transfo.append({
-        "Transfo_ID": f"TR-{1000+i}",
-        "Region": region,
-        "Charge (%)": charge_transfo,
-        "Perte/Vol (%)": round(perte_pourcentage, 2),
-        "Statut": "CRITIQUE" if charge_transfo > 95 or perte_pourcentage > 30 else "OK"
+# Parc tiré en une passe vectorisée, identique d'un lancement à l'autre (graine JIRAMA_GRAINE, voir simulateur_parc.py)
+def generer_donnees():
+    nb = taille_parc(20)
+    # Facturé = 60 à 95% de l'énergie sortie : le reste est de la perte/vol ; charge > 100% = Surcharge
+    parc = instantane(nb, sortie_kw=(500, 1500), taux_facture=(0.6, 0.95), charge=(40, 110))
+    return pd.DataFrame({
+        "Transfo_ID": ids_transfos(nb, "TR-", 1000),
+        "Region": parc["Région"],
+        "Charge (%)": parc["Charge_%"],
+        "Perte/Vol (%)": parc["Perte_%"].round(2),
+        "Statut": ((parc["Charge_%"] > 95) | (parc["Perte_%"] > 30)).map({True: "CRITIQUE", False: "OK"}),
     })
 
-df_jirama = pd.DataFrame(data_transfo)
+# Magasin unique par processus : les widgets (slider ensoleillement) ne régénèrent plus le parc
+with chrono("donnees"):
+    version_donnees, df_jirama = magasin("supervision_nationale", generer_donnees).vue_versionnee()
 
 # --- 2. MODULE WEB SCRAPING (Simulation Météo pour Solaire) ---
-# On simule ici la récupération de données météo pour l'ensoleillement à Tana
-st.sidebar.header("🌦️ Prévisions Production Solaire")
-st.sidebar.info("Données récupérées via [Open-Météo](https://open-meteo.com)")
-ensoleillement = st.sidebar.slider("Ensoleillement prévu (W/m²)", 0, 1000, 800)
-
 # --- 3. GESTION SURPRODUCTION & BATTERIES ---
-surproduction = 0
-if ensoleillement > 700:
-    surproduction = (ensoleillement - 700) * 10 # kW excédentaires
-    st.sidebar.warning(f"🔋 SURPRODUCTION DÉTECTÉE : {surproduction} kW en cours de stockage.")
+# Fragment : le curseur d'ensoleillement ne relance que ce panneau (pas les KPI ni la carte) ;
+# l'énergie stockée, seule valeur qui en dépend, est affichée ici
+@st.fragment
+def panneau_batteries():
+    # On simule ici la récupération de données météo pour l'ensoleillement à Tana
+    st.header("🌦️ Prévisions Production Solaire")
+    st.info("Données récupérées via [Open-Météo](https://open-meteo.com)")
+    ensoleillement = st.slider("Ensoleillement prévu (W/m²)", 0, 1000, 800)
+
+    # Dispatch horaire sur un an des sites BESS + solaire face aux surcharges du parc (voir stockage_batteries.py),
+    # mémorisé par empreinte des charges et de l'ensoleillement
+    with chrono("stockage"):
+        synthese = simuler_memorise(df_jirama["Charge (%)"], df_jirama["Region"], ensoleillement_crete=ensoleillement)["synthese"]
+    stocke = synthese["Solaire stocké (kWh/jour)"].sum()
+    besoin = synthese["Besoin (MWh/an)"].sum()
+    if stocke > 0:
+        st.warning(f"🔋 SURPRODUCTION SOLAIRE : {stocke:,.0f} kWh/jour stockés en moyenne pour la pointe du soir.")
+    st.metric("Énergie Stockée (Batteries)", f"{stocke:,.0f} kWh/jour")
+    st.metric("Délestage évité", f"{100 * (1 - synthese['Délestage (MWh)'].sum() / besoin):.0f}%" if besoin > 0 else "100%",
+              help=f"Surcharges à couvrir : {besoin:,.1f} MWh/an")
+    st.dataframe(synthese[["Région", "Délestage évité (%)", "Heures-transfo délestées"]], hide_index=True)
+
+with st.sidebar:
+    panneau_batteries()
 
 # --- 4. DASHBOARD SUPERVISION ---
-kpi1, kpi2, kpi3 = st.columns(3)
+kpi1, kpi2 = st.columns(2)
 with kpi1:
     st.metric("Pertes Non Techniques (Vol)", f"{df_jirama['Perte/Vol (%)'].mean():.1f}%", delta="⚠️ Critique")
 with kpi2:
     transfos_critiques = len(df_jirama[df_jirama['Statut'] == "CRITIQUE"])
     st.metric("Transformateurs en Surcharge", transfos_critiques, delta=f"{transfos_critiques} alertes")
-with kpi3:
-    st.metric("Énergie Stockée (Batteries)", f"{surproduction * 24:,.0f} kWh")
 
 st.markdown("---")
 
 # --- 5. CARTOGRAPHIE ANALYTIQUE ---
 st.subheader("📍 Cartographie des Risques par Région")
-fig_map = px.scatter(df_jirama, x="Region", y="Perte/Vol (%)", size="Charge (%)", 
-                     color="Statut", hover_name="Transfo_ID",
-                     title="Localisation des vols d'électricité et surcharges")
-st.plotly_chart(fig_map, use_container_width=True)
+with chrono("figure"):
+    fig_map = figure_carte(df_jirama, ("supervision_nationale", version_donnees), x="Region", y="Perte/Vol (%)", size="Charge (%)",
+                           color="Statut", hover_name="Transfo_ID",
+                           title="Localisation des vols d'électricité et surcharges")
+    st.plotly_chart(fig_map, use_container_width=True)
 
 # --- 6. PLANIFICATION DES DESCENTES ---
-st.subheader("📅 Planification des Descentes Techniques")
-priority_targets = df_jirama[df_jirama['Perte/Vol (%)'] > 25].sort_values(by="Perte/Vol (%)", ascending=False)
-st.write("Cibles prioritaires pour les agents de contrôle :")
-st.dataframe(priority_targets)
+# Fragment : changer de page ne relance que ce tableau (une page envoyée au navigateur)
+@st.fragment
+def cibles_prioritaires(priority_targets):
+    st.subheader("📅 Planification des Descentes Techniques")
+    # Plan classé dans la nuit sur tout l'historique (planification_nocturne.py), chargé sans recalcul
+    rapport, plan = dernier_plan()
+    if plan is not None:
+        with st.expander(f"🌙 Plan nocturne du {rapport['jour']} ({rapport['jours']} jours d'historique, {len(plan):,} transformateurs)"):
+            tableau_pagine(plan, "plan_nocturne")
+    st.write("Cibles prioritaires pour les agents de contrôle :")
+    tableau_pagine(priority_targets, "cibles_prioritaires")
+
+cibles_prioritaires(df_jirama[df_jirama['Perte/Vol (%)'] > 25].sort_values(by="Perte/Vol (%)", ascending=False))
 
 # --- 7. AMÉLIORATION : OPTIMISATION CONSOMMATION ---
 st.info("💡 **Conseil d'optimisation :** En cas de pic de charge sur Analamanga, basculer le surplus des batteries vers le réseau pour éviter le délestage tournant.")
@@ -0,0 +1,283 @@
+import argparse
+import dataclasses
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+# Sans réseau ni journal de production : synthèse vocale hors ligne, base d'audit jetable
+os.environ.setdefault("JIRAMA_TTS", "horsligne")
+os.environ.setdefault("JIRAMA_AUDIT_DB", os.path.join(tempfile.mkdtemp(prefix="bench_apps_"), "audit.db"))
+
+import pandas as pd
+import streamlit
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+import index_parc
+import magasin_partage
+import mesures_perf
+import rendu_carte
+
+logging.disable(logging.WARNING)  # avertissements Streamlit du mode sans serveur
+
+# Banc d'essai des tableaux de bord, sans navigateur (streamlit.testing AppTest).
+# Pour chaque taille de parc N (JIRAMA_NB_TRANSFOS) et chaque script / rôle :
+#  - run "froid" (génération du parc, figure non mémorisée) puis `--reruns` runs "chauds",
+#    durée totale et durée par section (donnees, diagnostic, figure) relevée par mesures_perf.chrono ;
+#  - export : les fonctions passées à st.download_button sont exécutées comme au clic ;
+#  - pic mémoire Python (tracemalloc) du run froid et d'un run chaud, mesuré dans une passe séparée
+#    pour ne pas fausser les durées ;
+#  - avec --interactions : latence du run déclenché par un widget (langue, curseurs, filtres...).
+#    Comme dans le navigateur, un widget placé dans un @st.fragment ne relance que ce fragment
+#    (portée "fragment"), les autres relancent tout le script (portée "app").
+# Résultat en JSON (--sortie) pour suivre les régressions d'une version à l'autre.
+#
+#   python benchmarks/bench_apps.py --tailles 20 1000 10000 --sortie bench_apps.json
+#   python benchmarks/bench_apps.py --tailles 10000 --interactions --sans-memoire
+
+SCENARIOS = [
+    {"script": "jiramaSmartGridapp.py", "magasin": "mission_control", "role": None},
+    {"script": "antifraudeapp.py", "magasin": "supervision_nationale", "role": None},
+    {"script": "jiramaantifraudapp.py", "magasin": "ai_monitor", "role": None},
+    {"script": "jirama_SmartGrid_V10.py", "magasin": "jirama_v10", "role": ("agent_tana", "agent123")},
+    {"script": "jirama_SmartGrid_V10.py", "magasin": "jirama_v10", "role": ("admin_jirama", "admin123")},
+    {"script": "JIRAMA_FINAL_SMARTGRID_V12.py", "magasin": "jirama_v12", "role": ("agent_tana", "agent123")},
+    {"script": "JIRAMA_FINAL_SMARTGRID_V12.py", "magasin": "jirama_v12", "role": ("admin_jirama", "admin123")},
+]
+
+# Interactions mesurées par script : (type de widget, libellé, valeurs appliquées tour à tour).
+# Un widget absent pour un rôle (ex: filtre de carte côté agent) est ignoré.
+INTERACTIONS = {
+    "antifraudeapp.py": [("slider", "Ensoleillement prévu (W/m²)", (950, 800))],
+    "jiramaantifraudapp.py": [("radio", "Sélectionner la langue du Bot / Select Bot Language", ("EN", "FR")),
+                              ("slider", "Seuil Alerte Fraude (%)", (35, 25))],
+    "jiramaSmartGridapp.py": [("radio", "Langue / Language", ("EN", "FR")),
+                              ("radio", "Format d'export", ("Parquet", "CSV"))],
+    "jirama_SmartGrid_V10.py": [("radio", "Langue de l'Assistant", ("EN", "FR")),
+                                ("radio", "Format d'export", ("Parquet", "CSV"))],
+    "JIRAMA_FINAL_SMARTGRID_V12.py": [("radio", "Langue de l'Assistant", ("EN", "FR")),
+                                      ("radio", "Format d'export", ("Parquet", "CSV")),
+                                      ("multiselect", "Filtrer par région", (["Diana"], []))],
+}
+
+# AppTest relance toujours le script entier : pour reproduire le navigateur, le fragment qui
+# contient le widget modifié est placé dans la requête de rerun (fragment_id_queue).
+# Les fragments de chaque widget sont relevés dans les messages envoyés au navigateur.
+_fragment_des_widgets = {}
+_fragment_cible = None
+_request_rerun = LocalScriptRunner.request_rerun
+_forward_msgs = LocalScriptRunner.forward_msgs
+
+
+def _request_rerun_fragment(self, rerun_data):
+    if _fragment_cible is None:
+        return _request_rerun(self, rerun_data)
+    # Le runner neuf d'AppTest a déjà une requête de run complet en attente : on la remplace
+    with self._requests._lock:
+        self._requests._rerun_data = dataclasses.replace(rerun_data, fragment_id_queue=[_fragment_cible])
+    return True
+
+
+def _relever_fragments(self):
+    messages = _forward_msgs(self)
+    for msg in messages:
+        if msg.HasField("delta") and msg.delta.fragment_id and msg.delta.HasField("new_element"):
+            element = msg.delta.new_element
+            type_element = element.WhichOneof("type")
+            widget_id = getattr(getattr(element, type_element), "id", "") if type_element else ""
+            if widget_id:
+                _fragment_des_widgets[widget_id] = msg.delta.fragment_id
+    return messages
+
+
+LocalScriptRunner.request_rerun = _request_rerun_fragment
+LocalScriptRunner.forward_msgs = _relever_fragments
+
+# Fonctions d'export enregistrées par st.download_button pendant le dernier run
+_exports = []
+_add_deferred = MediaFileManager.add_deferred
+
+
+def _capturer_export(self, data_callable, mimetype, coordinates, file_name=None, **options):
+    _exports.append((file_name, data_callable))
+    return _add_deferred(self, data_callable, mimetype, coordinates, file_name=file_name, **options)
+
+
+MediaFileManager.add_deferred = _capturer_export
+
+
+def _executer(at):
+    # Un run du script ; lève une erreur si l'application a affiché une exception
+    at.run()
+    if at.exception:
+        raise RuntimeError("; ".join(e.message for e in at.exception))
+    return at
+
+
+def _demarrer(scenario, timeout_s):
+    # Parc et figures régénérés : le premier run mesure le démarrage à froid pour cette taille
+    magasin_partage._magasins.pop(scenario["magasin"], None)
+    rendu_carte._memo.clear()
+    index_parc._memo.clear()
+    _fragment_des_widgets.clear()
+    at = AppTest.from_file(os.path.join(RACINE, scenario["script"]), default_timeout=timeout_s)
+    if scenario["role"] is not None:
+        # Page de connexion seule (st.stop avant les données), puis connexion au run suivant
+        _executer(at)
+        utilisateur, mot_de_passe = scenario["role"]
+        at.text_input[0].input(utilisateur)
+        at.text_input[1].input(mot_de_passe)
+        at.button[0].click()
+    return at
+
+
+def _mesurer_run(at):
+    mesures_perf.releve()
+    debut = time.perf_counter()
+    _executer(at)
+    duree = time.perf_counter() - debut
+    return {"duree_s": round(duree, 4),
+            "sections_s": {s: round(sum(d), 4) for s, d in mesures_perf.releve().items()}}
+
+
+def _mesurer_exports():
+    resultats = []
+    for nom_fichier, fonction in _exports:
+        mesures_perf.releve()
+        debut = time.perf_counter()
+        donnees = fonction()
+        duree = time.perf_counter() - debut
+        if hasattr(donnees, "read"):
+            taille = os.fstat(donnees.fileno()).st_size if hasattr(donnees, "fileno") else len(donnees.read())
+            donnees.close()
+        else:
+            taille = len(donnees)
+        resultats.append({"fichier": nom_fichier, "duree_s": round(duree, 4), "octets": taille})
+    return resultats
+
+
+def _widget(at, type_widget, libelle):
+    return next((w for w in getattr(at, type_widget) if w.label == libelle), None)
+
+
+def _mesurer_interactions(scenario, reruns, timeout_s):
+    global _fragment_cible
+    resultats = []
+    for type_widget, libelle, valeurs in INTERACTIONS.get(scenario["script"], []):
+        at = _executer(_executer(_demarrer(scenario, timeout_s)))
+        if _widget(at, type_widget, libelle) is None:
+            continue
+        durees, portee = [], "app"
+        for k in range(reruns):
+            widget = _widget(at, type_widget, libelle)
+            widget.set_value(valeurs[k % len(valeurs)])
+            _fragment_cible = _fragment_des_widgets.get(widget.id)
+            portee = "fragment" if _fragment_cible else "app"
+            try:
+                debut = time.perf_counter()
+                _executer(at)
+                durees.append(time.perf_counter() - debut)
+            finally:
+                _fragment_cible = None
+        resultats.append({"widget": libelle, "portee": portee, "durees_s": [round(d, 4) for d in durees],
+                          "mediane_s": round(float(pd.Series(durees).median()), 4)})
+    return resultats
+
+
+def _pic_memoire(scenario, timeout_s):
+    tracemalloc.start()
+    at = _demarrer(scenario, timeout_s)
+    tracemalloc.reset_peak()
+    _executer(at)
+    froid = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    _executer(at)
+    chaud = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"froid_mo": round(froid / 2**20, 2), "chaud_mo": round(chaud / 2**20, 2)}
+
+
+def mesurer(scenario, n, reruns, timeout_s, memoire=True, interactions=False):
+    os.environ[mesures_perf.VARIABLE_TAILLE_PARC] = str(n)
+    resultat = {"script": scenario["script"], "role": scenario["role"][0] if scenario["role"] else None, "n": n}
+    try:
+        at = _demarrer(scenario, timeout_s)
+        resultat["froid"] = _mesurer_run(at)
+        chauds = []
+        for _ in range(reruns):
+            _exports.clear()
+            chauds.append(_mesurer_run(at))
+        resultat["chauds"] = chauds
+        resultat["chaud_median_s"] = round(float(pd.Series([r["duree_s"] for r in chauds]).median()), 4) if chauds else None
+        resultat["exports"] = _mesurer_exports()
+        if interactions:
+            resultat["interactions"] = _mesurer_interactions(scenario, reruns, timeout_s)
+        if memoire:
+            resultat["memoire"] = _pic_memoire(scenario, timeout_s)
+    except Exception as e:
+        resultat["erreur"] = f"{type(e).__name__}: {e}"
+    return resultat
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RACINE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai AppTest des tableaux de bord JIRAMA")
+    parser.add_argument("--tailles", type=int, nargs="+", default=[20, 1_000, 10_000])
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--scripts", nargs="+", help="Limiter à ces scripts (nom de fichier)")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--sans-memoire", action="store_true", help="Ne pas faire la passe tracemalloc")
+    parser.add_argument("--interactions", action="store_true", help="Mesurer aussi les runs déclenchés par les widgets")
+    parser.add_argument("--sortie", help="Fichier JSON de résultats (sinon sortie standard)")
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.scripts or s["script"] in args.scripts]
+    resultats = []
+    for n in args.tailles:
+        for scenario in scenarios:
+            r = mesurer(scenario, n, args.reruns, args.timeout, memoire=not args.sans_memoire,
+                        interactions=args.interactions)
+            resultats.append(r)
+            etat = r.get("erreur") or (f"froid {r['froid']['duree_s']:.2f}s  chaud {r['chaud_median_s']:.2f}s  "
+                                       f"{r['froid']['sections_s']}")
+            print(f"{n:>8}  {r['script']:<32}{r['role'] or '-':<14}{etat}", file=sys.stderr)
+            for i in r.get("interactions", []):
+                print(f"{'':>10}{'↳ ' + i['widget'][:44]:<46}{i['portee']:<10}{i['mediane_s']:.3f}s", file=sys.stderr)
+
+    rapport = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "reruns": args.reruns,
+        "resultats": resultats,
+    }
+    texte = json.dumps(rapport, ensure_ascii=False, indent=2)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            f.write(texte)
+    else:
+        print(texte)
+    return 1 if any("erreur" in r for r in resultats) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
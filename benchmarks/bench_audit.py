@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from journal_audit import JournalAudit
+
+# Benchmark du journal d'audit : débit d'écriture bufferisée (group commit) puis latence
+# des requêtes paginées/filtrées de l'onglet admin sur un journal de plusieurs millions de lignes.
+# Enfin, attente d'une écriture (vider) pendant la sauvegarde complète, qui tourne dans son propre thread,
+# et rotation du journal vivant : premier semestre déplacé dans les archives mensuelles.
+
+UTILISATEURS = ["admin_jirama", "agent_tana"] + [f"agent_{i:03d}" for i in range(40)]
+ACTIONS = ["LECTURE_VOCALE", "EXPORT_CSV", "GENERATION_MISSION", "RECHARGEMENT_DONNEES"]
+
+
+def mesurer(nom, fn, repetitions=20):
+    t0 = time.perf_counter()
+    for _ in range(repetitions):
+        res = fn()
+    print(f"{nom:<45}{(time.perf_counter() - t0) / repetitions * 1000:8.2f} ms")
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entrees", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        j = JournalAudit(os.path.join(dossier, "audit.db"))
+        t0 = time.perf_counter()
+        for i in range(args.entrees):
+            j.ajouter(UTILISATEURS[i % len(UTILISATEURS)], ACTIONS[i % len(ACTIONS)], f"TR-MDG-{i % 60_000}",
+                      horodatage=f"2026-{1 + i * 12 // args.entrees:02d}-01 08:00:00")
+        t_empiler = time.perf_counter() - t0
+        j.vider(timeout=600)
+        t_total = time.perf_counter() - t0
+        print(f"{args.entrees:,} entrées empilées en {t_empiler:.2f}s ({args.entrees / t_empiler:,.0f}/s côté UI), "
+              f"écrites en {t_total:.2f}s ({args.entrees / t_total:,.0f}/s)")
+
+        mesurer("première page, sans filtre", lambda: j.rechercher())
+        _, curseur = j.rechercher(limite=args.entrees // 2)
+        mesurer("page au milieu du journal (curseur)", lambda: j.rechercher(avant_id=curseur))
+        mesurer("filtre utilisateur agent_tana", lambda: j.rechercher(utilisateur="agent_tana"))
+        mesurer("filtre action + cible TR-MDG-42", lambda: j.rechercher(action="LECTURE_VOCALE", cible="TR-MDG-42"))
+        mesurer("filtre période (mars)", lambda: j.rechercher(debut="2026-03-01", fin="2026-04-01"))
+        mesurer("comptage agent_tana", lambda: j.compter(utilisateur="agent_tana"), repetitions=5)
+        mesurer("liste des utilisateurs (filtre)", lambda: j.valeurs_distinctes("utilisateur"), repetitions=5)
+        t0 = time.perf_counter()
+        j.sauvegarder()
+        print(f"{'sauvegarde complète':<45}{(time.perf_counter() - t0) * 1000:8.2f} ms")
+
+        sauvegarde = threading.Thread(target=j._maintenance_quotidienne)
+        sauvegarde.start()
+        attentes = []
+        while sauvegarde.is_alive():
+            t0 = time.perf_counter()
+            j.ajouter("admin_jirama", "EXPORT_CSV", "TR-MDG-1")
+            j.vider()
+            attentes.append(time.perf_counter() - t0)
+        print(f"{'vider() pendant la sauvegarde (max.)':<45}{max(attentes, default=0) * 1000:8.2f} ms "
+              f"({len(attentes)} écritures)")
+
+        t0 = time.perf_counter()
+        nb = j.archiver("2026-07-01")
+        print(f"{'archivage du 1er semestre':<45}{(time.perf_counter() - t0) * 1000:8.2f} ms "
+              f"({nb:,} entrées déplacées, {j.compter():,} restantes, {len(os.listdir(j.dossier_archives))} archives)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rendu_carte
+from rendu_carte import figure_carte
+
+# Benchmark de la cartographie : temps de construction + sérialisation (ce que fait st.plotly_chart)
+# et taille du JSON envoyé au navigateur, px.scatter brut vs rendu agrégé/mémorisé.
+
+REGIONS = np.array(["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"])
+
+
+def parc(n, rng):
+    perte = np.round(rng.uniform(2, 60, n), 1)
+    charge = rng.integers(40, 116, n)
+    return pd.DataFrame({
+        "ID": [f"TR-MDG-{i}" for i in range(n)],
+        "Région": REGIONS[rng.integers(0, len(REGIONS), n)],
+        "Charge_%": charge,
+        "Perte_Vol_%": perte,
+        "Priorité": np.where((perte > 25) | (charge > 100), "HAUTE", "NORMAL"),
+    })
+
+
+def construire_et_serialiser(fn):
+    t0 = time.perf_counter()
+    spec = pio.to_json(fn(), validate=False)
+    return time.perf_counter() - t0, len(spec)
+
+
+def main():
+    rng = np.random.default_rng(1)
+    args = dict(x="Région", y="Perte_Vol_%", size="Charge_%", color="Priorité", hover_name="ID")
+    print(f"{'lignes':>10}{'brut (s)':>11}{'brut (Mo)':>11}{'agrégé (s)':>12}{'agrégé (Mo)':>13}{'mémo (ms)':>11}")
+    for n in [20, 1_000, 10_000, 60_000, 200_000, 1_000_000]:
+        df = parc(n, rng)
+        if n <= 200_000:
+            t_brut, o_brut = construire_et_serialiser(lambda: px.scatter(df, **args))
+            brut = f"{t_brut:>11.2f}{o_brut / 2**20:>11.2f}"
+        else:
+            brut = f"{'-':>11}{'-':>11}"
+        t_agr, o_agr = construire_et_serialiser(lambda: figure_carte(df, ("bench", n), **args))
+        t_memo, _ = construire_et_serialiser(lambda: figure_carte(df, ("bench", n), **args))
+        print(f"{n:>10}{brut}{t_agr:>12.2f}{o_agr / 2**20:>13.3f}{t_memo * 1000:>11.1f}")
+    print(f"mémo : {rendu_carte.statistiques}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from moteur_diagnostic import diagnostiquer, REGLES_SUPERVISION, REGLES_MISSIONS, REGLES_BOT_IA
+
+# Benchmark : df.apply ligne à ligne (logique d'origine) vs moteur vectorisé, de 20 à 1M transformateurs.
+# Usage : python benchmarks/bench_diagnostic.py [taille_max]
+
+# --- 1. LOGIQUE D'ORIGINE (RÉFÉRENCE) ---
+def get_diagnosis(r, lang):
+    diag = []
+    if r['Perte_Vol_%'] > 25: diag.append("🚩 Fraude détectée" if lang=="FR" else "🚩 Fraud detected")
+    if r['Charge_%'] > 100: diag.append("⚠️ Surcharge critique" if lang=="FR" else "⚠️ Critical Overload")
+    return " | ".join(diag) if diag else ("✅ Stable" if lang=="FR" else "✅ Stable")
+
+def bot_logic(row, lang):
+    if row['Perte/Vol (%)'] > 35:
+        return "🚨 Descente immédiate requise : Vol massif suspecté." if lang == "FR" else "🚨 Immediate raid required: Massive theft suspected."
+    elif row['Charge (%)'] > 100:
+        return "⚠️ Délestage imminent : Basculer sur batterie." if lang == "FR" else "⚠️ Imminent blackout: Switch to battery."
+    return "✅ Stable"
+
+def ai_recommandation(row, lang):
+    recos = []
+    if row['Perte_Fraude_Pct'] > 25:
+        recos.append("🚩 Fraude suspectée élevée" if lang == "FR" else "🚩 High Fraud Suspected")
+    if row['Charge_Pct'] > 95:
+        recos.append("⚠️ Surcharge critique" if lang == "FR" else "⚠️ Critical Overload")
+    if row['Temp_Huile'] > 85:
+        recos.append("🔥 Surchauffe huile" if lang == "FR" else "🔥 Oil Overheating")
+    if not recos:
+        return "✅ État Nominal" if lang == "FR" else "✅ Nominal State"
+    return " | ".join(recos)
+
+CAS = [
+    ("get_diagnosis", REGLES_SUPERVISION, get_diagnosis),
+    ("bot_logic", REGLES_MISSIONS, bot_logic),
+    ("ai_recommandation", REGLES_BOT_IA, ai_recommandation),
+]
+
+# --- 2. DONNÉES ---
+def generer(n, rng):
+    perte = np.round((1 - rng.uniform(0.4, 0.98, n)) * 100, 1)
+    charge = rng.integers(30, 116, n)
+    return pd.DataFrame({
+        "Perte_Vol_%": perte, "Charge_%": charge,
+        "Perte/Vol (%)": perte, "Charge (%)": charge,
+        "Perte_Fraude_Pct": perte, "Charge_Pct": charge,
+        "Temp_Huile": rng.integers(40, 96, n),
+    })
+
+# --- 3. MESURES ---
+def chrono(fn):
+    t0 = time.perf_counter()
+    res = fn()
+    return res, time.perf_counter() - t0
+
+def main(taille_max=1_000_000, taille_max_apply=100_000):
+    rng = np.random.default_rng(42)
+    tailles = [n for n in [20, 1_000, 10_000, 60_000, 100_000, 1_000_000] if n <= taille_max]
+    print(f"{'règles':<18}{'lignes':>10}{'apply FR+EN (s)':>18}{'vectorisé (s)':>16}{'gain':>8}")
+    for nom, regles, ref in CAS:
+        for n in tailles:
+            df = generer(n, rng)
+            vect, t_vect = chrono(lambda: diagnostiquer(df, regles))
+            if n <= taille_max_apply:
+                attendu, t_apply = chrono(lambda: {lang: df.apply(lambda r: ref(r, lang), axis=1) for lang in ["FR", "EN"]})
+                for lang in ["FR", "EN"]:
+                    assert (vect[lang] == attendu[lang]).all(), f"{nom} {lang} : divergence avec la logique d'origine"
+                print(f"{nom:<18}{n:>10}{t_apply:>18.4f}{t_vect:>16.4f}{t_apply / t_vect:>7.0f}x")
+            else:
+                print(f"{nom:<18}{n:>10}{'-':>18}{t_vect:>16.4f}{'-':>8}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
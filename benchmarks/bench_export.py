@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from export_missions import FORMATS, fichier_export
+
+# Benchmark de l'export des ordres de mission : pic mémoire Python (tracemalloc) et durée,
+# ancien missions.to_csv().encode() en mémoire vs export par blocs vers un fichier temporaire.
+
+COLONNES = dict(col_id="ID", col_region="Région", col_perte="Perte_Vol_%", col_charge="Charge_%", seuil_fraude=25)
+
+
+def mesurer(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resultat = fn()
+    duree = time.perf_counter() - t0
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duree, pic, resultat
+
+
+def main(n=1_000_000):
+    rng = np.random.default_rng(5)
+    regions = np.array(["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"])
+    missions = pd.DataFrame({
+        "ID": [f"TR-MDG-{i}" for i in range(n)],
+        "Région": regions[rng.integers(0, 5, n)],
+        "Charge_%": rng.integers(40, 116, n),
+        "Perte_Vol_%": np.round(rng.uniform(2, 60, n), 1),
+    })
+    duree, pic, donnees = mesurer(lambda: missions.to_csv().encode("utf-8"))
+    print(f"{'ancien to_csv (sans GPS/motif)':<32}{duree:7.2f}s  pic {pic / 2**20:8.1f} Mo  fichier {len(donnees) / 2**20:7.1f} Mo")
+    del donnees
+    for format_export in FORMATS:
+        duree, pic, fichier = mesurer(lambda: fichier_export(missions, format_export, **COLONNES))
+        taille = os.fstat(fichier.fileno()).st_size
+        fichier.close()
+        print(f"{'blocs ' + format_export:<32}{duree:7.2f}s  pic {pic / 2**20:8.1f} Mo  fichier {taille / 2**20:7.1f} Mo")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
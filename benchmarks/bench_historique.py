@@ -0,0 +1,70 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+import pyarrow.dataset as ds
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from historique_parc import HistoriqueParc, PARTITIONS
+from simulateur_parc import ecrire_simulation
+from pertes_glissantes import INTERVALLES_PAR_JOUR
+
+# Benchmark de l'historique partitionné : vue "une région, un jour, priorité HAUTE"
+# lue en scannant tout le pays puis filtrée dans pandas, contre l'élagage des partitions
+# (noms de dossiers) + filtre de priorité poussé au scanner sur des fichiers mappés en mémoire.
+
+
+def chrono(fn, repetitions=3):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fn()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur, resultat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transfos", type=int, default=10_000)
+    parser.add_argument("--jours", type=int, default=7)
+    args = parser.parse_args()
+
+    racine = tempfile.mkdtemp(prefix="jirama_historique_")
+    try:
+        simulation, dossier = os.path.join(racine, "simulation"), os.path.join(racine, "historique")
+        ecrire_simulation(simulation, args.transfos, args.jours * INTERVALLES_PAR_JOUR, graine=11,
+                          injections={"B": 0.05, "C": 0.02}, debut_injection=args.jours // 2 * INTERVALLES_PAR_JOUR)
+        h = HistoriqueParc(dossier)
+        t0 = time.perf_counter()
+        nb = h.importer_simulation(simulation)
+        duree = time.perf_counter() - t0
+        taille = sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(dossier) for f in fs) / 1e6
+        print(f"{nb:,} relevés importés en {duree:.2f}s ({nb / duree / 1e6:.1f} M/s), {taille:.0f} Mo sur disque")
+
+        region, jour = "Diana", date.today() - timedelta(days=1)
+
+        def pays_entier():
+            df = ds.dataset(dossier, format="ipc", partitioning=PARTITIONS).to_table().to_pandas()
+            return df[(df["region"] == region) & (df["jour"] == jour) & (df["Priorité"] == "HAUTE")]
+
+        t_pays, vue_pays = chrono(pays_entier, 1)
+        t_part, vue = chrono(lambda: h.table([region], jour, jour, ["HAUTE"]))
+        ouverts = h._fichiers([region], jour, jour)
+        tous = h._fichiers(None, None, None)
+        print(f"vue {region} / {jour} / HAUTE : {vue.num_rows:,} relevés")
+        print(f"  pays entier + filtre pandas : {t_pays:.3f}s ({len(tous)} fichiers lus)")
+        print(f"  partitions élaguées + mmap  : {t_part:.4f}s ({len(ouverts)} fichier ouvert)")
+        assert vue.num_rows == len(vue_pays)
+
+        t_synth, synthese = chrono(lambda: h.pertes_journalieres([region]))
+        t_synth_pays, _ = chrono(lambda: h.pertes_journalieres(), 1)
+        print(f"synthèse journalière {region} : {t_synth:.3f}s ({len(synthese)} jours) ; tout le pays : {t_synth_pays:.3f}s")
+    finally:
+        shutil.rmtree(racine, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
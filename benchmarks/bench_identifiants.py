@@ -0,0 +1,123 @@
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from etat_partage import EtatMemoire, EtatRedis, ServeurResp, ouvrir_session, lire_session
+from identifiants import hacher, verifier, VerificateurConnexions, CacheJetons, SurchargeConnexions
+
+# Benchmark des connexions : coût d'une empreinte SHA-256 / scrypt, « rafale » de connexions (relève
+# d'équipe) à travers le pool borné selon le nombre de workers (connexions/s, latences, refus au-delà
+# de la file), et retard maximal d'un thread « interface » qui bat toutes les --battement-ms pendant la
+# rafale : vérification faite dans le thread lui-même (avant) ou confiée au pool (après).
+# Enfin, session du jeton lue dans le cache ou dans le backend d'état à chaque run (mémoire, serveur RESP local).
+
+
+def chrono(fn, repetitions=5):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fn()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur
+
+
+def rafale(nb_workers, nb_connexions, nb_clients, max_en_attente, empreinte):
+    # nb_clients sessions qui se connectent en même temps ; chacune attend sa propre vérification
+    verificateur = VerificateurConnexions(nb_workers, max_en_attente)
+    latences, refus = [], [0]
+    verrou = threading.Lock()
+
+    def client(i):
+        t0 = time.perf_counter()
+        try:
+            ok = verificateur.soumettre("agent123" if i % 10 else "mauvais", empreinte).result()
+            assert ok == bool(i % 10)
+        except SurchargeConnexions:
+            with verrou:
+                refus[0] += 1
+            return
+        with verrou:
+            latences.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(nb_clients) as clients:
+        list(clients.map(client, range(nb_connexions)))
+    duree = time.perf_counter() - t0
+    verificateur.fermer()
+    latences.sort()
+    return {"debit": len(latences) / duree, "p50": statistics.median(latences),
+            "p95": latences[int(0.95 * (len(latences) - 1))], "refus": refus[0]}
+
+
+def retard_interface(mode, nb_connexions, battement_s, empreinte):
+    # Le thread « interface » traite ses connexions (dans le thread ou via le pool) tout en battant :
+    # retard max. = plus grand écart entre deux battements au-delà de la période prévue
+    verificateur = VerificateurConnexions()
+    en_attente = list(range(nb_connexions))
+    futures = []
+    dernier, retard = time.perf_counter(), 0.0
+    while en_attente or not all(f.done() for f in futures):
+        if en_attente:
+            en_attente.pop()
+            if mode == "thread":
+                verifier("agent123", empreinte)
+            else:
+                futures.append(verificateur.soumettre("agent123", empreinte))
+        time.sleep(battement_s)
+        maintenant = time.perf_counter()
+        retard = max(retard, maintenant - dernier - battement_s)
+        dernier = maintenant
+    verificateur.fermer()
+    return retard
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--connexions", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=100, help="Sessions qui se connectent simultanément")
+    parser.add_argument("--max-en-attente", type=int, default=64)
+    parser.add_argument("--battement-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    empreinte = hacher("agent123")
+    ancienne = hashlib.sha256(b"agent123").hexdigest()
+    t_sha = chrono(lambda: verifier("agent123", ancienne), 1000)
+    t_scrypt = chrono(lambda: verifier("agent123", empreinte))
+    t_inconnu = chrono(lambda: verifier("agent123", None))
+    print(f"{os.cpu_count()} cœur(s) ; vérification SHA-256 {t_sha * 1e6:.1f} µs, scrypt {t_scrypt * 1e3:.1f} ms, "
+          f"identifiant inconnu {t_inconnu * 1e3:.1f} ms")
+
+    print(f"\nRafale : {args.connexions} connexions, {args.clients} clients simultanés, file max. {args.max_en_attente}")
+    print(f"{'workers':>8}{'connexions/s':>14}{'p50 (ms)':>10}{'p95 (ms)':>10}{'refusées':>10}")
+    for w in args.workers:
+        m = rafale(w, args.connexions, args.clients, args.max_en_attente, empreinte)
+        print(f"{w:>8}{m['debit']:>14.1f}{m['p50'] * 1e3:>10.0f}{m['p95'] * 1e3:>10.0f}{m['refus']:>10}")
+
+    battement_s = args.battement_ms / 1e3
+    print(f"\nThread interface (battement {args.battement_ms:g} ms), 20 connexions :")
+    for mode, libelle in (("thread", "vérification dans le thread"), ("pool", "vérification dans le pool")):
+        print(f"  {libelle:<30} retard max. {retard_interface(mode, 20, battement_s, empreinte) * 1e3:6.1f} ms")
+
+    serveur = ServeurResp(("127.0.0.1", 0))
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    print("\nSession du jeton, par run :")
+    for nom, etat in (("mémoire", EtatMemoire()), ("RESP local", EtatRedis(f"redis://127.0.0.1:{serveur.server_address[1]}/0"))):
+        jetons = [ouvrir_session(etat, f"agent_{i:03d}", "AGENT") for i in range(1000)]
+        cache = CacheJetons()
+        for j in jetons:
+            cache.lire(etat, j)
+        t_backend = chrono(lambda: [lire_session(etat, j) for j in jetons], 3) / len(jetons)
+        t_cache = chrono(lambda: [cache.lire(etat, j) for j in jetons], 3) / len(jetons)
+        print(f"  {nom:<12} backend {t_backend * 1e6:8.1f} µs   cache {t_cache * 1e6:6.1f} µs")
+    serveur.shutdown()
+
+
+if __name__ == "__main__":
+    main()
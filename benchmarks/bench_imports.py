@@ -0,0 +1,128 @@
+import argparse
+import ast
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+# Coût du démarrage à froid des tableaux de bord, chaque mesure dans un processus neuf :
+#  1. imports : les imports de premier niveau du script rejoués sous `python -X importtime`,
+#     total et modules les plus coûteux (temps cumulé, enfants compris) ;
+#  2. premier run : import de Streamlit + premier run AppTest (page de connexion pour V10 / V12),
+#     puis run connecté ; relève à chaque étape les dépendances lourdes effectivement chargées.
+# Les modules du dépôt chargent plotly.express, gTTS et pyarrow.dataset au premier usage :
+# ils ne doivent apparaître qu'après le run qui affiche une carte, lit un message ou l'historique.
+#
+#   python benchmarks/bench_imports.py [--detail 8] [--sortie bench_imports.json]
+
+SCENARIOS = [
+    {"script": "jiramaSmartGridapp.py", "role": None},
+    {"script": "antifraudeapp.py", "role": None},
+    {"script": "jiramaantifraudapp.py", "role": None},
+    {"script": "jirama_SmartGrid_V10.py", "role": ("agent_tana", "agent123")},
+    {"script": "JIRAMA_FINAL_SMARTGRID_V12.py", "role": ("agent_tana", "agent123")},
+    {"script": "JIRAMA_FINAL_SMARTGRID_V12.py", "role": ("admin_jirama", "admin123")},
+]
+LOURDS = ["plotly.express", "gtts", "pyarrow.dataset", "paho.mqtt.client", "reportlab"]
+LIGNE_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def imports_du_script(script):
+    with open(os.path.join(RACINE, script), encoding="utf-8") as f:
+        arbre = ast.parse(f.read())
+    return "\n".join(ast.unparse(n) for n in arbre.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+
+
+def _importtime(code):
+    env = dict(os.environ, JIRAMA_TTS="horsligne")
+    sortie = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=RACINE, env=env,
+                            capture_output=True, text=True, check=True).stderr
+    modules = {}
+    for ligne in sortie.splitlines():
+        m = LIGNE_IMPORTTIME.match(ligne)
+        if m and len(m.group(3)) == 1:
+            modules[m.group(4)] = int(m.group(2)) / 1e3
+    return modules
+
+
+def temps_imports(code, demarrage):
+    # {module: temps cumulé en ms} pour les imports directs (profondeur 0) du code, et leur total,
+    # hors modules du démarrage de l'interpréteur (site, encodings...)
+    modules = {m: ms for m, ms in _importtime(code).items() if m not in demarrage}
+    return modules, sum(modules.values())
+
+
+def lourds_charges():
+    return [m for m in LOURDS if m in sys.modules]
+
+
+def premier_run(script, role):
+    # Exécuté dans le processus enfant : durées et dépendances lourdes chargées à chaque étape
+    logging.disable(logging.WARNING)
+    etapes = []
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    etapes.append({"etape": "import streamlit", "duree_s": time.perf_counter() - t0, "lourds": lourds_charges()})
+    t0 = time.perf_counter()
+    at = AppTest.from_file(os.path.join(RACINE, script), default_timeout=120).run()
+    etapes.append({"etape": "premier run", "duree_s": time.perf_counter() - t0, "lourds": lourds_charges()})
+    if role:
+        at.text_input[0].input(role[0])
+        at.text_input[1].input(role[1])
+        t0 = time.perf_counter()
+        at.button[0].click().run()
+        etapes.append({"etape": "connexion", "duree_s": time.perf_counter() - t0, "lourds": lourds_charges()})
+    return {"etapes": etapes, "erreurs": [e.message for e in at.exception]}
+
+
+def mesurer_run(scenario):
+    env = dict(os.environ, JIRAMA_TTS="horsligne")
+    sortie = subprocess.run([sys.executable, os.path.abspath(__file__), "--enfant", json.dumps(scenario)], cwd=RACINE,
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(sortie.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--detail", type=int, default=6, help="Modules les plus coûteux affichés par script")
+    parser.add_argument("--sortie", default=None)
+    parser.add_argument("--enfant", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.enfant:
+        scenario = json.loads(args.enfant)
+        print(json.dumps(premier_run(scenario["script"], scenario["role"])))
+        return
+
+    demarrage = set(_importtime("pass"))
+    resultats = []
+    imports = {}
+    for scenario in SCENARIOS:
+        script = scenario["script"]
+        if script not in imports:
+            imports[script] = temps_imports(imports_du_script(script), demarrage)
+            modules, total = imports[script]
+            print(f"\n{script} : imports de premier niveau {total:.0f} ms")
+            for nom, ms in sorted(modules.items(), key=lambda x: -x[1])[:args.detail]:
+                print(f"    {ms:8.1f} ms  {nom}")
+        modules, total = imports[script]
+        run = mesurer_run(scenario)
+        resultats.append({**scenario, "imports_ms": round(total, 1), "modules_ms": modules, **run})
+        if scenario["role"]:
+            print(f"  rôle {scenario['role'][0]}")
+        for e in run["etapes"]:
+            print(f"  {e['etape']:<17}{e['duree_s']:7.2f}s   lourds chargés : {', '.join(e['lourds']) or '-'}")
+        if run["erreurs"]:
+            print(f"  erreurs : {run['erreurs']}")
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from index_parc import IndexParc
+from moteur_diagnostic import diagnostic_ligne, REGLES_SUPERVISION
+
+# Benchmark du chemin "rapport vocal" de V10/V12 : ancienne recherche df[df['ID'] == id].iloc[0]
+# + diagnostic_ligne vs IndexParc (construction une fois par version, puis accès direct),
+# et taille de la liste d'options envoyée au st.selectbox (parc complet vs une page).
+
+REGIONS = np.array(["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"])
+
+
+def parc(n, rng):
+    return pd.DataFrame({
+        "ID": [f"TR-MDG-{200 + i}" for i in range(n)],
+        "Région": REGIONS[rng.integers(0, len(REGIONS), n)],
+        "Charge_%": rng.integers(40, 116, n),
+        "Perte_Vol_%": np.round(rng.uniform(2, 60, n), 1),
+    })
+
+
+def chrono_moyen(fn, ids):
+    t0 = time.perf_counter()
+    for i in ids:
+        fn(i)
+    return (time.perf_counter() - t0) / len(ids)
+
+
+def main():
+    rng = np.random.default_rng(3)
+    print(f"{'lignes':>10}{'ancien (ms)':>13}{'index (µs)':>12}{'construction (ms)':>19}{'préfixe (µs)':>14}"
+          f"{'options avant (Ko)':>20}{'options page (Ko)':>19}")
+    for n in [1_000, 10_000, 100_000, 1_000_000]:
+        df = parc(n, rng)
+        ids = df["ID"].sample(200, random_state=1).tolist()
+        ancien = chrono_moyen(lambda i: diagnostic_ligne(df[df["ID"] == i].iloc[0], REGLES_SUPERVISION, "FR"), ids[:20])
+        t0 = time.perf_counter()
+        index = IndexParc(df, "ID", "Région", REGLES_SUPERVISION)
+        construction = time.perf_counter() - t0
+        nouveau = chrono_moyen(lambda i: (index.ligne(i), index.diagnostic(i, "FR")), ids)
+        prefixe = chrono_moyen(lambda i: index.rechercher(i[:9], "Diana"), ids)
+        avant = sum(len(i) + 3 for i in df["ID"]) / 1024
+        page = sum(len(i) + 3 for i in index.rechercher()[0]) / 1024
+        print(f"{n:>10}{ancien * 1e3:>13.2f}{nouveau * 1e6:>12.1f}{construction * 1e3:>19.1f}{prefixe * 1e6:>14.1f}"
+              f"{avant:>20.1f}{page:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
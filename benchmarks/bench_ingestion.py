@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingestion_mqtt import BrokerFactice, IngestionMQTT, client_paho, topic_transfo, MAX_FILE_EN_ATTENTE
+
+# Benchmark du débit d'ingestion MQTT (objectif : 10 000 msg/s sur un cœur).
+# Broker factice en mémoire par défaut, ou Mosquitto local : --broker localhost
+# --max-en-attente réduit la file d'entrée : messages en surplus perdus et comptés, mémoire bornée.
+
+def messages(nb_messages, nb_transfos):
+    # Payloads préencodés pour ne mesurer que l'ingestion
+    payloads = []
+    for i in range(nb_transfos):
+        payloads.append((topic_transfo(f"TR-MDG-{i}"), json.dumps(
+            {"sortie_kwh": 1000 + i % 1500, "facture_kwh": 700 + i % 700, "charge_pct": 40 + i % 75, "temp_huile": 40 + i % 55}
+        ).encode()))
+    return [payloads[i % nb_transfos] for i in range(nb_messages)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--transfos", type=int, default=60_000)
+    parser.add_argument("--broker", default=None, help="hôte Mosquitto (défaut : broker factice en mémoire)")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--max-en-attente", type=int, default=MAX_FILE_EN_ATTENTE)
+    args = parser.parse_args()
+
+    lot = messages(args.messages, args.transfos)
+    if args.broker:
+        ingestion = IngestionMQTT(client_paho(args.broker, args.port), max_en_attente=args.max_en_attente).demarrer()
+        emetteur = client_paho(args.broker, args.port)
+        emetteur.loop_start()
+        time.sleep(0.5)
+    else:
+        broker = BrokerFactice()
+        ingestion = IngestionMQTT(broker.client(), max_en_attente=args.max_en_attente).demarrer()
+        emetteur = broker.client()
+
+    t0 = time.perf_counter()
+    for topic, payload in lot:
+        emetteur.publish(topic, payload)
+    t_pub = time.perf_counter() - t0
+    while ingestion.nb_recus + ingestion.nb_rejetes + ingestion.nb_perdus < args.messages and time.perf_counter() - t0 < 120:
+        time.sleep(0.005)
+    t_total = time.perf_counter() - t0
+    ingestion.arreter()
+
+    t1 = time.perf_counter()
+    snap = ingestion.magasin.instantane()
+    t_snap = time.perf_counter() - t1
+    print(f"messages publiés   : {args.messages} en {t_pub:.2f}s")
+    print(f"messages ingérés   : {ingestion.nb_recus} (rejetés : {ingestion.nb_rejetes}, perdus : {ingestion.nb_perdus}) en {t_total:.2f}s")
+    print(f"débit              : {ingestion.nb_recus / t_total:,.0f} msg/s")
+    print(f"instantané         : {len(snap)} transformateurs en {t_snap * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
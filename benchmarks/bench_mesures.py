@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mesures_perf
+from mesures_perf import chrono, centiles
+
+# Coût par appel de `with chrono(section)` : instrumentation désactivée, active hors Streamlit
+# (mesure globale seule), et comparaison à une boucle vide. Puis coût de centiles() sur des
+# tampons pleins (ce que paie l'onglet Performances de la console admin).
+
+N = 1_000_000
+
+
+def boucle_vide():
+    t0 = time.perf_counter()
+    for _ in range(N):
+        pass
+    return time.perf_counter() - t0
+
+
+def boucle_chrono():
+    t0 = time.perf_counter()
+    for _ in range(N):
+        with chrono("bench"):
+            pass
+    return time.perf_counter() - t0
+
+
+def main():
+    vide = boucle_vide()
+    mesures_perf.activer(False)
+    inactif = boucle_chrono()
+    mesures_perf.activer(True)
+    actif = boucle_chrono()
+    print(f"boucle vide            : {vide / N * 1e9:7.0f} ns/itération")
+    print(f"chrono désactivé       : {(inactif - vide) / N * 1e9:7.0f} ns/appel")
+    print(f"chrono actif           : {(actif - vide) / N * 1e9:7.0f} ns/appel")
+    for section in ["donnees", "diagnostic", "figure", "tts", "export"]:
+        for _ in range(mesures_perf.TAILLE_TAMPON):
+            mesures_perf.enregistrer(section, 0.01)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        centiles()
+    print(f"centiles (6 sections x {mesures_perf.TAILLE_TAMPON} mesures) : {(time.perf_counter() - t0) * 10:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
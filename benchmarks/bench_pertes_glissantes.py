@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pertes_glissantes import AgregateurPertes, INTERVALLES_PAR_JOUR, PAS_MINUTES
+
+# Benchmark : mise à jour incrémentale des taux de perte 1h/24h/30j à chaque tick de 15 min,
+# contre le recalcul naïf pandas (groupby + rolling sur tout l'historique) à chaque rafraîchissement.
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transfos", type=int, default=2_000)
+    parser.add_argument("--jours", type=int, default=31)
+    parser.add_argument("--ticks-mesures", type=int, default=200, help="ticks chronométrés après le préchauffage")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    n, t_total = args.transfos, args.jours * INTERVALLES_PAR_JOUR
+    ids = [f"TR-MDG-{i}" for i in range(n)]
+    sortie = rng.uniform(10, 40, (t_total, n))
+    facture = sortie * rng.uniform(0.4, 0.98, (1, n))
+
+    # --- Incrémental : un tick = tout le parc en un appel vectorisé ---
+    ag = AgregateurPertes(capacite=n)
+    t0 = time.perf_counter()
+    for t in range(t_total - args.ticks_mesures):
+        ag.ajouter_lot(ids, sortie[t], facture[t], t * PAS_MINUTES * 60)
+    t_prechauffage = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for t in range(t_total - args.ticks_mesures, t_total):
+        ag.ajouter_lot(ids, sortie[t], facture[t], t * PAS_MINUTES * 60)
+        ratios = ag.ratios()
+    t_tick = (time.perf_counter() - t0) / args.ticks_mesures
+    print(f"{n} transformateurs x {t_total} intervalles ({n * t_total:,} relevés)")
+    print(f"incrémental : historique chargé en {t_prechauffage:.2f}s, "
+          f"{t_tick * 1000:.2f} ms par tick (mise à jour + ratios), {t_tick / n * 1e6:.2f} µs par relevé")
+
+    # --- Naïf : recalcul complet sur l'historique long à chaque rafraîchissement ---
+    long = pd.DataFrame({
+        "ID": np.tile(ids, t_total),
+        "t": np.repeat(np.arange(t_total), n),
+        "sortie": sortie.ravel(),
+        "facture": facture.ravel(),
+    })
+    t0 = time.perf_counter()
+    g = long.groupby("ID", sort=False)
+    naif = {}
+    for nom, w in [("1h", 4), ("24h", INTERVALLES_PAR_JOUR), ("30j", 30 * INTERVALLES_PAR_JOUR)]:
+        s = g["sortie"].rolling(w, min_periods=1).sum().groupby(level=0).last()
+        f = g["facture"].rolling(w, min_periods=1).sum().groupby(level=0).last()
+        naif[nom] = np.round((1 - f / s) * 100, 1)
+    t_naif = time.perf_counter() - t0
+    print(f"pandas rolling (recalcul complet) : {t_naif * 1000:.0f} ms par rafraîchissement "
+          f"({t_naif / t_tick:.0f}x plus lent)")
+
+    ecart = np.abs(ratios["Perte_24h_%"].to_numpy() - naif["24h"].reindex(ratios.index).to_numpy()).max()
+    print(f"écart max 24h incrémental vs pandas : {ecart:.2f} point(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from historique_parc import HistoriqueParc
+from simulateur_parc import ecrire_simulation
+from planification_nocturne import planifier
+from pertes_glissantes import INTERVALLES_PAR_JOUR
+
+# Benchmark du traitement nocturne : même historique simulé, pool de 1 à N processus.
+# Débit par étape, et part parallélisable mesurée (temps CPU des tâches / durée de l'étape) :
+# sur une machine à C cœurs, l'accélération attendue d'une étape est min(processus, C, tâches).
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transfos", type=int, default=20_000)
+    parser.add_argument("--jours", type=int, default=7)
+    parser.add_argument("--processus", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count()}))
+    args = parser.parse_args()
+
+    racine = tempfile.mkdtemp(prefix="jirama_planification_")
+    try:
+        simulation, historique = os.path.join(racine, "simulation"), os.path.join(racine, "historique")
+        ecrire_simulation(simulation, args.transfos, args.jours * INTERVALLES_PAR_JOUR, graine=5,
+                          injections={"B": 0.05, "C": 0.02}, debut_injection=args.jours // 2 * INTERVALLES_PAR_JOUR)
+        HistoriqueParc(historique).importer_simulation(simulation, date.today() - timedelta(days=args.jours))
+        print(f"{os.cpu_count()} cœur(s) disponible(s) ; {args.transfos:,} transformateurs x {args.jours} jours")
+        print(f"{'processus':>10}{'total (s)':>11}{'agrég. (s)':>12}{'relevés/s':>14}{'CPU agrég. (s)':>16}"
+              f"{'classement (s)':>16}{'publication (s)':>17}")
+        for n in args.processus:
+            r = planifier(nb_jours=args.jours, processus=n, dossier_historique=historique,
+                          dossier_sortie=os.path.join(racine, f"missions_{n}"))
+            a, c, p = r["etapes"]["agregation"], r["etapes"]["classement"], r["etapes"]["publication"]
+            print(f"{n:>10}{r['duree_totale_s']:>11.3f}{a['duree_s']:>12.3f}{a['releves_par_s']:>14,}{a['cpu_s']:>16.3f}"
+                  f"{c['duree_s']:>16.3f}{p['duree_s']:>17.3f}")
+        print(f"tâches parallèles : {a['taches']} (agrégation), {c['taches']} (classement)")
+    finally:
+        shutil.rmtree(racine, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import multiprocessing as mp
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+from etat_partage import EtatMemoire, EtatRedis, initialiser_comptes, compte, ouvrir_session
+from identifiants import hacher, verifier, CacheJetons
+
+# Test de charge multi-répliques : R processus « répliques » derrière un équilibreur sans affinité
+# (une file commune : chaque requête va à la première réplique libre, pas à celle de la connexion).
+# U utilisateurs se connectent, puis envoient chacun P requêtes de page. Chaque requête :
+#  session du jeton (cache de jetons, sinon backend d'état) -> rendu (score de suspicion sur le parc) -> audit.
+# Mesures : débit des pages selon R, part des requêtes servies par une autre réplique que celle de la
+# connexion, sessions perdues, et entrées d'audit retrouvées dans la base commune.
+# Backend "memoire" : état propre à chaque réplique (situation d'avant) ; "resp" : serveur local
+# compatible Redis (etat_partage.py) lancé pour le test, ou --redis URL d'un vrai Redis.
+# Sur une machine à C cœurs, le débit d'un rendu limité par le CPU plafonne vers R = C ; --attente-ms
+# ajoute une attente d'E/S par page (envoi des deltas au navigateur), pendant laquelle une autre
+# réplique peut travailler.
+#
+#   python benchmarks/bench_repliques.py --repliques 1 2 4 --utilisateurs 50 --pages 20
+
+# Une empreinte scrypt partagée par les comptes de test (une par compte coûterait ~10 s au démarrage)
+EMPREINTE = hacher("agent123")
+COMPTES = {f"agent_{i:03d}": {"pwd": EMPREINTE, "role": "AGENT"} for i in range(200)}
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def replique(url_etat, chemin_audit, taille_parc, attente_s, requetes, reponses):
+    os.environ["JIRAMA_AUDIT_DB"] = chemin_audit
+    from journal_audit import JournalAudit
+    from simulateur_parc import instantane
+    from score_anomalie import scorer_parc
+    etat = EtatMemoire() if url_etat == "memoire" else EtatRedis(url_etat)
+    initialiser_comptes(etat, COMPTES)
+    journal = JournalAudit(chemin_audit)
+    jetons = CacheJetons()
+    parc = instantane(taille_parc, graine=21)
+    reponses.put(("pret", os.getpid(), None))
+    while True:
+        requete = requetes.get()
+        if requete is None:
+            break
+        genre, utilisateur, valeur = requete
+        if genre == "connexion":
+            fiche = compte(etat, utilisateur)
+            ok = verifier(valeur, fiche and fiche["pwd"])
+            jeton = ouvrir_session(etat, utilisateur, fiche["role"]) if ok else None
+            journal.ajouter(utilisateur, "CONNEXION", None)
+            reponses.put(("connexion", os.getpid(), (utilisateur, jeton)))
+        else:
+            session = jetons.lire(etat, valeur)
+            if session is not None:
+                scorer_parc(parc, "Région", "Perte_%")
+                if attente_s:
+                    time.sleep(attente_s)
+                journal.ajouter(session["utilisateur"], "CONSULTATION", utilisateur)
+            reponses.put(("page", os.getpid(), (utilisateur, session is not None)))
+    journal.vider()
+    reponses.put(("fin", os.getpid(), None))
+
+
+def scenario(nb_repliques, url_etat, args):
+    dossier = tempfile.mkdtemp(prefix="bench_repliques_")
+    chemin_audit = os.path.join(dossier, "audit.db")
+    requetes, reponses = mp.Queue(), mp.Queue()
+    processus = [mp.Process(target=replique, args=(url_etat, chemin_audit, args.parc, args.attente_ms / 1e3, requetes, reponses))
+                 for _ in range(nb_repliques)]
+    try:
+        for p in processus:
+            p.start()
+        for _ in processus:
+            reponses.get()
+        utilisateurs = list(COMPTES)[:args.utilisateurs]
+        for u in utilisateurs:
+            requetes.put(("connexion", u, "agent123"))
+        jetons, replique_connexion = {}, {}
+        for _ in utilisateurs:
+            _, pid, (u, jeton) = reponses.get()
+            jetons[u], replique_connexion[u] = jeton, pid
+        # Pages de tous les utilisateurs entremêlées, comme des clics concurrents
+        pages = [u for u in utilisateurs for _ in range(args.pages)]
+        random.Random(0).shuffle(pages)
+        t0 = time.perf_counter()
+        for u in pages:
+            requetes.put(("page", u, jetons[u]))
+        servies_ailleurs = perdues = 0
+        for _ in pages:
+            _, pid, (u, ok) = reponses.get()
+            servies_ailleurs += pid != replique_connexion[u]
+            perdues += not ok
+        duree = time.perf_counter() - t0
+        for _ in processus:
+            requetes.put(None)
+        for _ in processus:
+            reponses.get()
+        from journal_audit import JournalAudit
+        audits = JournalAudit(chemin_audit).compter()
+        return {"pages": len(pages), "duree_s": duree, "debit": len(pages) / duree, "ailleurs": servies_ailleurs / len(pages),
+                "perdues": perdues, "audits": audits, "audits_attendus": len(utilisateurs) + len(pages) - perdues}
+    finally:
+        for p in processus:
+            p.join(timeout=10)
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repliques", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count()}))
+    parser.add_argument("--utilisateurs", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20, help="Requêtes de page par utilisateur")
+    parser.add_argument("--parc", type=int, default=2_000, help="Transformateurs scorés par page")
+    parser.add_argument("--attente-ms", type=float, default=0.0)
+    parser.add_argument("--redis", default=None, help="URL d'un Redis existant (sinon serveur local lancé pour le test)")
+    args = parser.parse_args()
+
+    serveur = None
+    url = args.redis
+    if url is None:
+        port = port_libre()
+        serveur = subprocess.Popen([sys.executable, os.path.join(RACINE, "etat_partage.py"), "--port", str(port)],
+                                   stdout=subprocess.PIPE, text=True)
+        serveur.stdout.readline()
+        url = f"redis://127.0.0.1:{port}/0"
+    try:
+        print(f"{os.cpu_count()} cœur(s) ; {args.utilisateurs} utilisateurs x {args.pages} pages ; attente E/S {args.attente_ms} ms/page")
+        print(f"{'backend':<9}{'répliques':>10}{'pages/s':>10}{'autre réplique':>16}{'sessions perdues':>18}{'audit':>16}")
+        for backend, url_etat, liste in [("memoire", "memoire", [max(2, min(args.repliques))]), ("resp", url, args.repliques)]:
+            for r in liste:
+                m = scenario(r, url_etat, args)
+                print(f"{backend:<9}{r:>10}{m['debit']:>10.0f}{m['ailleurs']:>15.0%}{m['perdues']:>18}"
+                      f"{m['audits']:>9}/{m['audits_attendus']:<6}")
+    finally:
+        if serveur is not None:
+            serveur.terminate()
+            serveur.wait()
+
+
+if __name__ == "__main__":
+    main()
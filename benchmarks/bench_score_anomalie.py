@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from score_anomalie import ScoreurAnomalies, scorer_parc, SEUIL_SCORE_HAUTE
+
+# Benchmark : ajustement incrémental + score de 1M transformateur-jours (objectif : quelques secondes).
+# Un vol injecté sur 1% des transformateurs en fin de période doit remonter en tête du classement,
+# y compris quand son niveau absolu reste sous le seuil fixe de 25%.
+# Un transformateur sans sortie mesurée (perte NaN) est scoré 0, sans casser le classement du dashboard.
+
+REGIONS = np.array(["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transfos", type=int, default=2_740)
+    parser.add_argument("--jours", type=int, default=365)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    n, j = args.transfos, args.jours
+    region = rng.integers(0, len(REGIONS), n)
+    base = rng.uniform(5, 20, n)
+    saison = np.array([0, 0, 0, 0, 1.5, 3, 2])  # pertes plus fortes le week-end
+    perte = base[None, :] + saison[np.arange(j) % 7][:, None] + rng.normal(0, 1.5, (j, n))
+    fraudeurs = rng.choice(n, n // 100, replace=False)
+    perte[-30:, fraudeurs] += 8  # branchements clandestins sur le dernier mois
+    sans_sortie = np.setdiff1d(np.arange(n), fraudeurs)[0]
+    perte[-1, sans_sortie] = np.nan  # compteur en panne le dernier jour
+
+    lignes = np.tile(np.arange(n), j)
+    jours = np.repeat(np.arange(j), n)
+    t0 = time.perf_counter()
+    scoreur = ScoreurAnomalies(n)
+    score = scoreur.scorer_historique(lignes, jours, REGIONS[region][lignes], perte.ravel())
+    duree = time.perf_counter() - t0
+    print(f"{n * j:,} transformateur-jours ajustés et scorés en {duree:.2f}s ({n * j / duree:,.0f}/s)")
+
+    dernier = score[-n:]
+    top = np.argsort(-dernier)[:len(fraudeurs)]
+    rappel = len(set(top) & set(fraudeurs)) / len(fraudeurs)
+    sous_seuil = (perte[-1, fraudeurs] <= 25).mean()
+    print(f"dernier jour : {(dernier >= SEUIL_SCORE_HAUTE).sum()} transformateurs en HAUTE, "
+          f"{rappel:.0%} des fraudeurs injectés dans le top {len(fraudeurs)} "
+          f"({sous_seuil:.0%} d'entre eux sous le seuil fixe de 25%)")
+
+    instantane = pd.DataFrame({"Région": REGIONS[region], "Perte_%": perte[-1], "Ligne": np.arange(n)})
+    classement = scorer_parc(instantane, "Région", "Perte_%", scoreur, "Ligne", (j - 1) % 7)
+    print(f"instantané avec perte NaN : score {classement['Score_Suspicion'].iloc[sans_sortie]}, "
+          f"rang {classement['Rang_Suspicion'].iloc[sans_sortie]}/{n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from simulateur_parc import instantane, ecrire_simulation, lire_simulation, ids_transfos, CODES_SCENARIOS
+from pertes_glissantes import AgregateurPertes, INTERVALLES_PAR_JOUR, PAS_MINUTES
+
+# Benchmark du simulateur : ancienne boucle random.* ligne par ligne (load_data des applications)
+# vs instantane() vectorisé, puis génération de N x T relevés en fichiers mappés en mémoire
+# et relecture par un consommateur (AgregateurPertes, un tick = tout le parc).
+
+
+def boucle_random(n):
+    regions = ["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"]
+    data = []
+    for i in range(n):
+        sortie = random.randint(1000, 2500)
+        facture = sortie * random.uniform(0.40, 0.98)
+        perte_pct = round((1 - (facture / sortie)) * 100, 1)
+        charge = random.randint(40, 115)
+        data.append({"ID": f"TR-MDG-{200+i}", "Région": random.choice(regions), "Charge_%": charge, "Perte_Vol_%": perte_pct})
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transfos", type=int, default=104_167)
+    parser.add_argument("--intervalles", type=int, default=INTERVALLES_PAR_JOUR)
+    parser.add_argument("--dossier", default=None, help="Dossier de sortie (sinon dossier temporaire supprimé)")
+    args = parser.parse_args()
+
+    print(f"{'transfos':>10}{'boucle random (s)':>19}{'instantane (s)':>16}")
+    for n in [10_000, 100_000, 1_000_000]:
+        t0 = time.perf_counter()
+        boucle_random(n)
+        ancien = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        instantane(n, graine=1)
+        ids_transfos(n)
+        nouveau = time.perf_counter() - t0
+        print(f"{n:>10}{ancien:>19.3f}{nouveau:>16.3f}")
+    assert instantane(1000, graine=5).equals(instantane(1000, graine=5))
+
+    dossier = args.dossier or tempfile.mkdtemp(prefix="jirama_sim_")
+    try:
+        nb_releves = args.transfos * args.intervalles
+        t0 = time.perf_counter()
+        ecrire_simulation(dossier, args.transfos, args.intervalles, graine=7,
+                          injections={"A": 0.01, "B": 0.05, "C": 0.02}, debut_injection=args.intervalles // 2)
+        duree = time.perf_counter() - t0
+        taille = sum(os.path.getsize(os.path.join(dossier, f)) for f in os.listdir(dossier)) / 1e6
+        print(f"\n{nb_releves:,} relevés ({args.transfos:,} x {args.intervalles}) écrits en {duree:.2f}s "
+              f"({nb_releves / duree / 1e6:.1f} M relevés/s, {taille:.0f} Mo)")
+
+        meta, colonnes = lire_simulation(dossier)
+        ids = ids_transfos(meta["nb_transfos"], meta["prefixe_id"], meta["premier_id"]).tolist()
+        ag = AgregateurPertes(capacite=meta["nb_transfos"])
+        t0 = time.perf_counter()
+        for t in range(meta["nb_intervalles"]):
+            ag.ajouter_lot(ids, colonnes["sortie_kwh"][t], colonnes["facture_kwh"][t], t * PAS_MINUTES * 60)
+        ratios = ag.ratios()
+        duree = time.perf_counter() - t0
+        print(f"relecture mappée + agrégation glissante : {duree:.2f}s ({nb_releves / duree / 1e6:.1f} M relevés/s)")
+        scenario = np.asarray(colonnes["scenario"])
+        for nom, code in CODES_SCENARIOS.items():
+            masque = scenario == code
+            print(f"  scénario {nom} : {masque.sum():>6} transfos, perte 1h moyenne {ratios['Perte_1h_%'].to_numpy()[masque].mean():5.1f}%, "
+                  f"charge max dernier intervalle {colonnes['charge_pct'][-1][masque].max():5.1f}%")
+    finally:
+        if args.dossier is None:
+            shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from simulateur_parc import instantane
+from stockage_batteries import simuler_dispatch, simuler_memorise, facteur_charge, PUISSANCE_NOMINALE_KW, HEURES_PAR_AN
+
+# Benchmark du dispatch BESS : un an au pas horaire pour toutes les régions, par taille de parc.
+# Simulation complète (besoin, état de charge, transformateurs délestés), relance mémorisée
+# (empreinte des entrées), et calcul du besoin sur un tableau dense heures x transformateurs
+# (ce qu'évitent les charges triées + sommes cumulées), vérifié identique.
+
+
+def chrono(fn, repetitions=3):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fn()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur, resultat
+
+
+def besoin_dense(charges, facteur):
+    return (np.clip(charges[None, :] * facteur[:, None] - 100, 0, None) * (PUISSANCE_NOMINALE_KW / 100)).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dense-max", type=int, default=10_000, help="Taille max. du calcul dense (mémoire heures x N)")
+    args = parser.parse_args()
+
+    facteur = facteur_charge()
+    print(f"{HEURES_PAR_AN} pas horaires ; {'N':>8}{'dispatch (s)':>14}{'mémorisé (ms)':>15}{'besoin dense (s)':>18}{'évité (%)':>11}")
+    for n in args.tailles:
+        parc = instantane(n, graine=20, charge=(40, 115))
+        t_sim, resultat = chrono(lambda: simuler_dispatch(parc["Charge_%"], parc["Région"]))
+        simuler_memorise(parc["Charge_%"], parc["Région"])
+        t_memo, _ = chrono(lambda: simuler_memorise(parc["Charge_%"], parc["Région"]))
+        synthese = resultat["synthese"]
+        evite = 100 * (1 - synthese["Délestage (MWh)"].sum() / synthese["Besoin (MWh/an)"].sum())
+        dense = "-"
+        if n <= args.dense_max:
+            region = resultat["series"]["regions"][0]
+            charges = parc.loc[parc["Région"] == region, "Charge_%"].to_numpy(float)
+            t_dense, b = chrono(lambda: besoin_dense(charges, facteur), 1)
+            assert np.allclose(b, resultat["series"]["besoin_kwh"][:, 0])
+            dense = f"{t_dense * len(synthese):.2f}"
+        print(f"{'':<22}{n:>8,}{t_sim:>14.3f}{t_memo * 1e3:>15.1f}{dense:>18}{evite:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geographie import COORDONNEES_REGIONS
+from simulateur_parc import instantane, ids_transfos
+from tournees import planifier_tournees, positions, matrice_temps, DUREE_CONTROLE_H, DUREE_JOURNEE_H
+
+# Benchmark des tournées terrain : N cibles HAUTE réparties sur les régions, A agents par région.
+# Durée de planification (matrice des temps + plus proche voisin + 2-opt), et comparaison à la
+# pratique actuelle : chaque agent suit le tableau trié par perte décroissante, en sautant les
+# cibles qui ne rentrent plus dans sa journée. Même matrice, mêmes agents, même journée.
+
+
+def ordre_du_tableau(temps, gains, pertes, nb_agents, duree_h=DUREE_JOURNEE_H):
+    # (Ar récupérés, heures de route) en suivant le tableau trié par perte
+    restants = np.ones(len(gains), dtype=bool)
+    recupere = route = 0.0
+    ordre = np.argsort(-pertes, kind="stable") + 1
+    for _ in range(nb_agents):
+        courant, ecoule = 0, 0.0
+        for cible in ordre:
+            if restants[cible - 1] and ecoule + temps[courant, cible] + DUREE_CONTROLE_H + temps[cible, 0] <= duree_h:
+                ecoule += temps[courant, cible] + DUREE_CONTROLE_H
+                route += temps[courant, cible]
+                recupere += gains[cible - 1]
+                restants[cible - 1] = False
+                courant = cible
+        route += temps[courant, 0]
+    return recupere, route
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cibles", type=int, default=5_000)
+    parser.add_argument("--agents", type=int, default=10, help="Agents par région")
+    args = parser.parse_args()
+
+    parc = instantane(args.cibles, graine=19, taux_facture=(0.4, 0.7))
+    missions = pd.DataFrame({"ID": ids_transfos(args.cibles, "TR-MDG-", 1000), "Région": parc["Région"],
+                             "Perte": parc["Perte_%"], "Manque à gagner (Ar)": (parc["Sortie_kW"] - parc["Facture_kW"]) * 24 * 30 * 600})
+    print(f"{args.cibles:,} cibles HAUTE, {missions['Région'].nunique()} régions, {args.agents} agents par région")
+
+    t0 = time.perf_counter()
+    feuille, synthese = planifier_tournees(missions, "ID", "Région", "Manque à gagner (Ar)", agents_par_region=args.agents)
+    duree = time.perf_counter() - t0
+    print(f"planification : {duree:.2f}s ({len(feuille):,} arrêts sur {len(synthese)} tournées)")
+
+    t0 = time.perf_counter()
+    base_ar = base_h = 0.0
+    for region, groupe in missions.groupby("Région"):
+        lat, lon = positions(groupe["ID"].to_numpy(), groupe["Région"].to_numpy())
+        temps = matrice_temps(np.r_[COORDONNEES_REGIONS[region][0], lat], np.r_[COORDONNEES_REGIONS[region][1], lon])
+        ar, h = ordre_du_tableau(temps, groupe["Manque à gagner (Ar)"].to_numpy(float), groupe["Perte"].to_numpy(float), args.agents)
+        base_ar, base_h = base_ar + ar, base_h + h
+    print(f"(matrices seules, ordre du tableau : {time.perf_counter() - t0:.2f}s)")
+
+    opt_ar, opt_h = synthese["Récupéré (Ar)"].sum(), synthese["Route (h)"].sum()
+    print(f"{'':<22}{'Ar récupérés':>18}{'route (h)':>12}{'Ar / h de route':>18}")
+    print(f"{'ordre du tableau':<22}{base_ar:>18,.0f}{base_h:>12.1f}{base_ar / base_h:>18,.0f}")
+    print(f"{'tournées optimisées':<22}{opt_ar:>18,.0f}{opt_h:>12.1f}{opt_ar / opt_h:>18,.0f}")
+
+
+if __name__ == "__main__":
+    main()
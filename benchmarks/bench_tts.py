@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from synthese_vocale import CacheAudio, MoteurHorsLigne
+
+# Benchmark du cache audio avec le moteur hors ligne (aucun accès réseau).
+# Mesure : synthèse à froid, relecture d'un rapport déjà en cache (objectif < 50 ms),
+# et N sessions demandant le même rapport en même temps (une seule synthèse attendue).
+
+SCRIPT = "Transformateur TR-PILOTE-01. Région Analamanga (Isotry). Charge 105 pourcent. Vol suspecté 35.0 pourcent. Diagnostic : 🚩 Fraude détectée | ⚠️ Surcharge critique."
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latence", type=float, default=0.5, help="latence simulée du service TTS (s)")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--rapports", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        cache = CacheAudio(MoteurHorsLigne(latence_s=args.latence), dossier=dossier, max_disque_octets=20 * 2**20)
+
+        t0 = time.perf_counter()
+        clip = cache.demander(SCRIPT, "fr").result()
+        print(f"synthèse à froid          : {(time.perf_counter() - t0) * 1000:8.1f} ms ({clip.taille} octets)")
+
+        durees = []
+        for _ in range(1000):
+            t0 = time.perf_counter()
+            clip = cache.demander(SCRIPT, "fr").result()
+            cache.lire_octets(clip)
+            durees.append(time.perf_counter() - t0)
+        durees.sort()
+        print(f"relecture en cache p50/p99: {durees[500] * 1000:8.3f} / {durees[990] * 1000:.3f} ms")
+
+        avant = cache.statistiques()["echecs"]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.sessions) as pool:
+            list(pool.map(lambda _: cache.demander(SCRIPT, "en").result(), range(args.sessions)))
+        print(f"{args.sessions} sessions, même rapport : {(time.perf_counter() - t0) * 1000:8.1f} ms, "
+              f"{cache.statistiques()['echecs'] - avant} synthèse(s)")
+
+        t0 = time.perf_counter()
+        futurs = [cache.demander(f"{SCRIPT} #{i}", "fr") for i in range(args.rapports)]
+        for f in futurs:
+            f.result()
+        print(f"{args.rapports} rapports distincts   : {time.perf_counter() - t0:8.2f} s "
+              f"(pool de {cache._pool._max_workers} workers)")
+        stats = cache.statistiques()
+        print(f"disque : {stats['clips_disque']} clips / {stats['octets_disque'] / 2**20:.1f} Mo "
+              f"(max {cache.max_disque_octets / 2**20:.0f} Mo), mémoire : {stats['octets_memoire'] / 2**20:.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+# --- ÉTAT PARTAGÉ ENTRE RÉPLIQUES (SESSIONS DE CONNEXION, COMPTES) ---
+# La connexion et le rôle ne vivent plus seulement dans st.session_state, propre à une réplique :
+# ils sont écrits dans un backend d'état choisi par JIRAMA_ETAT.
+#  - absent / "memoire" : EtatMemoire, dictionnaire du processus (une seule réplique) ;
+#  - "redis://hote:port/base" : EtatRedis, client RESP minimal (bibliothèque standard) vers Redis,
+#    ou vers le serveur local compatible de ce module : python etat_partage.py --port 6380
+# À la connexion, la session reçoit un jeton, jamais placé dans l'URL (liens partagés, historique, journaux
+# de proxy) : il est écrit dans un cookie (COOKIE_SESSION, SameSite=Strict, Secure en HTTPS, expiration
+# absolue DUREE_SESSION_S), renvoyé par le navigateur à chaque connexion WebSocket. Si l'équilibreur de
+# charge envoie la reconnexion du navigateur sur une autre réplique, celle-ci lit le cookie et retrouve
+# la session dans le backend : plus besoin de sessions « collantes ». Le backend fait foi : déconnexion et expiration sont
+# visibles de toutes les répliques (après au plus la durée du cache de jetons, identifiants.py). Le journal d'audit est déjà partagé (base SQLite WAL
+# commune, JIRAMA_AUDIT_DB) ; les comptes sont initialisés une fois dans le backend, pas à chaque run.
+
+VARIABLE_ETAT = "JIRAMA_ETAT"
+DUREE_SESSION_S = 8 * 3600     # expiration glissante, prolongée à chaque run
+PREFIXE_SESSION = "jirama:session:"
+PREFIXE_COMPTE = "jirama:compte:"
+COOKIE_SESSION = "jirama_session"
+
+
+# --- 1. BACKEND EN MÉMOIRE (UNE RÉPLIQUE) ---
+class EtatMemoire:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._valeurs = {}
+        self._expirations = {}
+
+    def _vivant(self, cle):
+        expiration = self._expirations.get(cle)
+        if expiration is not None and expiration <= time.monotonic():
+            self._valeurs.pop(cle, None)
+            self._expirations.pop(cle, None)
+        return cle in self._valeurs
+
+    def lire(self, cle):
+        with self._verrou:
+            return self._valeurs[cle] if self._vivant(cle) else None
+
+    def definir(self, cle, valeur, ttl_s=None, si_absent=False):
+        # Retourne False si si_absent et la clé existe déjà
+        with self._verrou:
+            if si_absent and self._vivant(cle):
+                return False
+            self._valeurs[cle] = valeur
+            if ttl_s is None:
+                self._expirations.pop(cle, None)
+            else:
+                self._expirations[cle] = time.monotonic() + ttl_s
+            return True
+
+    def expirer(self, cle, ttl_s):
+        with self._verrou:
+            if not self._vivant(cle):
+                return False
+            self._expirations[cle] = time.monotonic() + ttl_s
+            return True
+
+    def supprimer(self, cle):
+        with self._verrou:
+            self._expirations.pop(cle, None)
+            return self._valeurs.pop(cle, None) is not None
+
+
+# --- 2. BACKEND RESP (REDIS OU SERVEUR LOCAL COMPATIBLE) ---
+def _encoder(*arguments):
+    morceaux = [f"*{len(arguments)}\r\n".encode()]
+    for a in arguments:
+        a = a if isinstance(a, bytes) else str(a).encode()
+        morceaux.append(b"$%d\r\n%s\r\n" % (len(a), a))
+    return b"".join(morceaux)
+
+
+def _lire_reponse(flux):
+    ligne = flux.readline()
+    if not ligne:
+        raise ConnectionError("connexion fermée par le serveur")
+    genre, corps = ligne[:1], ligne[1:-2]
+    if genre == b"+":
+        return corps.decode()
+    if genre == b"-":
+        raise RuntimeError(corps.decode())
+    if genre == b":":
+        return int(corps)
+    if genre == b"$":
+        taille = int(corps)
+        return None if taille < 0 else flux.read(taille + 2)[:-2]
+    if genre == b"*":
+        taille = int(corps)
+        return None if taille < 0 else [_lire_reponse(flux) for _ in range(taille)]
+    raise ValueError(f"réponse RESP inattendue : {ligne!r}")
+
+
+class EtatRedis:
+    # Une connexion par thread (sessions Streamlit servies en parallèle), reconnexion automatique une fois
+    def __init__(self, url="redis://127.0.0.1:6379/0", timeout_s=5):
+        u = urlparse(url)
+        self.adresse = (u.hostname or "127.0.0.1", u.port or 6379)
+        self.base = int(u.path.strip("/") or 0)
+        self.mot_de_passe = u.password
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+
+    def _connexion(self):
+        flux = getattr(self._local, "flux", None)
+        if flux is None:
+            s = self._local.socket = socket.create_connection(self.adresse, timeout=self.timeout_s)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            flux = self._local.flux = s.makefile("rwb")
+            if self.mot_de_passe:
+                self._envoyer(flux, "AUTH", self.mot_de_passe)
+            if self.base:
+                self._envoyer(flux, "SELECT", self.base)
+        return flux
+
+    @staticmethod
+    def _envoyer(flux, *arguments):
+        flux.write(_encoder(*arguments))
+        flux.flush()
+        return _lire_reponse(flux)
+
+    def commande(self, *arguments):
+        for tentative in range(2):
+            try:
+                return self._envoyer(self._connexion(), *arguments)
+            except (ConnectionError, OSError):
+                self._fermer()
+                if tentative:
+                    raise
+
+    def _fermer(self):
+        # Connexion en échec fermée (flux et socket) avant la reconnexion : pas de socket orphelin
+        for nom in ("flux", "socket"):
+            objet = getattr(self._local, nom, None)
+            setattr(self._local, nom, None)
+            if objet is not None:
+                try:
+                    objet.close()
+                except OSError:
+                    pass
+
+    def lire(self, cle):
+        valeur = self.commande("GET", cle)
+        return None if valeur is None else json.loads(valeur)
+
+    def definir(self, cle, valeur, ttl_s=None, si_absent=False):
+        arguments = ["SET", cle, json.dumps(valeur)]
+        if ttl_s is not None:
+            arguments += ["PX", int(ttl_s * 1000)]
+        if si_absent:
+            arguments.append("NX")
+        return self.commande(*arguments) == "OK"
+
+    def expirer(self, cle, ttl_s):
+        return self.commande("PEXPIRE", cle, int(ttl_s * 1000)) == 1
+
+    def supprimer(self, cle):
+        return self.commande("DEL", cle) == 1
+
+
+def etat_depuis_environnement():
+    # Backend unique par processus selon JIRAMA_ETAT (voir en-tête)
+    global _etat
+    with _verrou_etat:
+        if _etat is None:
+            url = os.environ.get(VARIABLE_ETAT, "memoire")
+            _etat = EtatMemoire() if url == "memoire" else EtatRedis(url)
+        return _etat
+
+
+_etat = None
+_verrou_etat = threading.Lock()
+
+
+# --- 3. SESSIONS DE CONNEXION ET COMPTES ---
+def ouvrir_session(etat, utilisateur, role, ttl_s=DUREE_SESSION_S):
+    jeton = secrets.token_urlsafe(24)
+    etat.definir(PREFIXE_SESSION + jeton, {"utilisateur": utilisateur, "role": role, "debut": time.time()}, ttl_s)
+    return jeton
+
+
+def lire_session(etat, jeton, ttl_s=DUREE_SESSION_S):
+    # Session du jeton (prolongée), ou None si inconnue / expirée / fermée
+    if not jeton:
+        return None
+    valeur = etat.lire(PREFIXE_SESSION + jeton)
+    if valeur is not None:
+        etat.expirer(PREFIXE_SESSION + jeton, ttl_s)
+    return valeur
+
+
+def fermer_session(etat, jeton):
+    if jeton:
+        etat.supprimer(PREFIXE_SESSION + jeton)
+
+
+def script_cookie(jeton, duree_s=DUREE_SESSION_S, nom=COOKIE_SESSION):
+    # HTML d'un composant invisible (même origine que la page) qui écrit le cookie de session sur la
+    # page parente ; jeton vide et duree_s=0 : suppression du cookie (déconnexion)
+    return ("<script>const s = window.parent.location.protocol === 'https:' ? '; Secure' : '';"
+            f"window.parent.document.cookie = '{nom}={jeton}; Path=/; Max-Age={int(duree_s)}; SameSite=Strict' + s;</script>")
+
+
+def initialiser_comptes(etat, comptes):
+    # {utilisateur: {"pwd": empreinte, "role": ...}} ; un compte déjà présent (modifié ailleurs) est conservé
+    for utilisateur, compte in comptes.items():
+        etat.definir(PREFIXE_COMPTE + utilisateur, compte, si_absent=True)
+
+
+def compte(etat, utilisateur):
+    return etat.lire(PREFIXE_COMPTE + utilisateur) if utilisateur else None
+
+
+def enregistrer_compte(etat, utilisateur, fiche):
+    # Remplace le compte (ex: empreinte migrée vers scrypt)
+    etat.definir(PREFIXE_COMPTE + utilisateur, fiche)
+
+
+# --- 4. SERVEUR LOCAL COMPATIBLE REDIS (DÉMO / TESTS SANS REDIS) ---
+class _GestionnaireResp(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                arguments = _lire_reponse(self.rfile)
+            except (ConnectionError, OSError, ValueError):
+                return
+            try:
+                reponse = self.server.executer([a.decode() if i == 0 else a for i, a in enumerate(arguments)])
+            except Exception as e:
+                reponse = RuntimeError(f"ERR {e}")
+            self.wfile.write(_reponse(reponse))
+            self.wfile.flush()
+
+
+def _reponse(valeur):
+    if isinstance(valeur, RuntimeError):
+        return b"-%s\r\n" % str(valeur).encode()
+    if valeur is True:
+        return b"+OK\r\n"
+    if isinstance(valeur, str):
+        return b"+%s\r\n" % valeur.encode()
+    if isinstance(valeur, int):
+        return b":%d\r\n" % valeur
+    if valeur is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(valeur), valeur)
+
+
+class ServeurResp(socketserver.ThreadingTCPServer):
+    # Sous-ensemble de Redis utilisé par EtatRedis : PING, GET, SET [PX|EX] [NX], PEXPIRE, EXPIRE, DEL,
+    # EXISTS, DBSIZE, FLUSHDB, SELECT, AUTH (acceptés) ; une seule base, en mémoire
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, adresse=("127.0.0.1", 6380)):
+        super().__init__(adresse, _GestionnaireResp)
+        self.etat = EtatMemoire()
+
+    def executer(self, arguments):
+        nom, args = arguments[0].upper(), arguments[1:]
+        e = self.etat
+        if nom == "PING":
+            return "PONG"
+        if nom in ("SELECT", "AUTH"):
+            return True
+        if nom == "GET":
+            return e.lire(args[0])
+        if nom == "SET":
+            options = [a.decode().upper() for a in args[2:]]
+            ttl_s = None
+            for unite, facteur in (("PX", 1e-3), ("EX", 1)):
+                if unite in options:
+                    ttl_s = int(options[options.index(unite) + 1]) * facteur
+            return True if e.definir(args[0], args[1], ttl_s, si_absent="NX" in options) else None
+        if nom in ("PEXPIRE", "EXPIRE"):
+            return int(e.expirer(args[0], int(args[1]) * (1e-3 if nom == "PEXPIRE" else 1)))
+        if nom == "DEL":
+            return sum(e.supprimer(c) for c in args)
+        if nom == "EXISTS":
+            return sum(e.lire(c) is not None for c in args)
+        if nom == "DBSIZE":
+            with e._verrou:
+                return sum(e._vivant(c) for c in list(e._valeurs))
+        if nom == "FLUSHDB":
+            with e._verrou:
+                e._valeurs.clear()
+                e._expirations.clear()
+            return True
+        return RuntimeError(f"ERR commande inconnue '{nom}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur d'état local compatible Redis (sous-ensemble RESP)")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+    with ServeurResp((args.hote, args.port)) as serveur:
+        print(f"Serveur d'état sur redis://{args.hote}:{args.port}/0", flush=True)
+        serveur.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
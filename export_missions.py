@@ -0,0 +1,105 @@
+import tempfile
+import zlib
+import numpy as np
+from geographie import coordonnees_gps
+from mesures_perf import chrono
+
+# --- EXPORT DES ORDRES DE MISSION (GÉNÉRATION À LA DEMANDE, PAR BLOCS) ---
+# Rien n'est calculé tant que l'agent ne clique pas : st.download_button reçoit une fonction,
+# exécutée au clic. Les missions sont enrichies (GPS, motif) et encodées bloc par bloc ; seul le
+# bloc courant est en mémoire, le fichier est assemblé sur disque (fichier temporaire).
+# Colonnes attendues par le protocole pilote : ID, localisation GPS, motif "Suspicion de Fraude".
+
+TAILLE_BLOC = 50_000
+FORMATS = {
+    "CSV": {"extension": "csv", "mime": "text/csv", "audit": "EXPORT_CSV"},
+    "CSV.GZ": {"extension": "csv.gz", "mime": "application/gzip", "audit": "EXPORT_CSV_GZ"},
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet", "audit": "EXPORT_PARQUET"},
+}
+# Indexé par fraude + 2 * surcharge
+MOTIFS = np.array(["Contrôle préventif", "Suspicion de Fraude", "Surcharge", "Suspicion de Fraude + Surcharge"], dtype=object)
+
+
+def enrichir(bloc, col_id, col_region, col_perte, col_charge, seuil_fraude):
+    lat, lon = coordonnees_gps(bloc[col_id].to_numpy(), bloc[col_region].to_numpy())
+    fraude = bloc[col_perte].to_numpy() > seuil_fraude
+    surcharge = bloc[col_charge].to_numpy() > 100
+    motif = MOTIFS[fraude.astype(np.int8) + 2 * surcharge.astype(np.int8)]
+    return bloc.assign(Latitude=lat, Longitude=lon, Motif=motif)
+
+
+def blocs_missions(missions, taille_bloc=TAILLE_BLOC, **colonnes):
+    for debut in range(0, max(len(missions), 1), taille_bloc):
+        yield enrichir(missions.iloc[debut:debut + taille_bloc], **colonnes)
+
+
+def _csv(blocs):
+    premier = True
+    for bloc in blocs:
+        yield bloc.to_csv(index=False, header=premier).encode("utf-8")
+        premier = False
+
+
+def _gzip(flux):
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 : en-tête gzip
+    for morceau in flux:
+        sortie = compresseur.compress(morceau)
+        if sortie:
+            yield sortie
+    yield compresseur.flush()
+
+
+class _Tampon:
+    # Puits minimal pour ParquetWriter : les octets écrits sont rendus après chaque groupe de lignes
+    def __init__(self):
+        self.morceaux = []
+        self.closed = False
+
+    def write(self, donnees):
+        self.morceaux.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self):
+        morceaux, self.morceaux = self.morceaux, []
+        return b"".join(morceaux)
+
+
+def _parquet(blocs):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    tampon, ecrivain = _Tampon(), None
+    for bloc in blocs:
+        table = pa.Table.from_pandas(bloc, preserve_index=False)
+        if ecrivain is None:
+            ecrivain = pq.ParquetWriter(tampon, table.schema, compression="zstd")
+        ecrivain.write_table(table)
+        yield tampon.vider()
+    if ecrivain is not None:
+        ecrivain.close()
+        yield tampon.vider()
+
+
+def generer_export(missions, format="CSV", taille_bloc=TAILLE_BLOC, **colonnes):
+    # Générateur d'octets du fichier d'ordres de mission, bloc par bloc
+    blocs = blocs_missions(missions, taille_bloc, **colonnes)
+    if format == "Parquet":
+        return _parquet(blocs)
+    flux = _csv(blocs)
+    return _gzip(flux) if format == "CSV.GZ" else flux
+
+
+def fichier_export(missions, format="CSV", **colonnes):
+    # Pour st.download_button(data=lambda: fichier_export(...)) : fichier temporaire sur disque,
+    # supprimé à sa fermeture
+    with chrono("export"):
+        fichier = tempfile.TemporaryFile()
+        for morceau in generer_export(missions, format, **colonnes):
+            fichier.write(morceau)
+        fichier.seek(0)
+    return fichier
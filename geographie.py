@@ -0,0 +1,30 @@
+import hashlib
+import numpy as np
+
+# --- RÉFÉRENTIEL GÉOGRAPHIQUE ---
+# Centres approximatifs des régions desservies (chef-lieu) et du poste pilote d'Isotry.
+# Tant que les coordonnées relevées sur le terrain ne sont pas disponibles, chaque transformateur
+# est placé autour du centre de sa région avec un décalage déterministe tiré de son ID :
+# la même position d'un export à l'autre.
+
+COORDONNEES_REGIONS = {
+    "Analamanga": (-18.9137, 47.5361),           # Antananarivo
+    "Analamanga (Isotry)": (-18.9175, 47.5140),  # Poste pilote TR-PILOTE-01
+    "Atsinanana": (-18.1492, 49.4023),           # Toamasina
+    "Diana": (-12.2787, 49.2917),                # Antsiranana
+    "Boeny": (-15.7167, 46.3167),                # Mahajanga
+    "Sava": (-14.2667, 50.1667),                 # Sambava
+}
+RAYON_DEG = 0.25
+
+
+def coordonnees_gps(ids, regions, rayon_deg=RAYON_DEG):
+    # Retourne (latitude, longitude) en tableaux NumPy ; NaN pour une région inconnue
+    centres = np.array([COORDONNEES_REGIONS.get(r, (np.nan, np.nan)) for r in regions], dtype=float).reshape(-1, 2)
+    graines = np.array([int.from_bytes(hashlib.blake2b(str(i).encode(), digest_size=4).digest(), "little") for i in ids],
+                       dtype=np.float64)
+    angle = (graines % 3600) / 3600 * 2 * np.pi
+    distance = rayon_deg * np.sqrt((graines // 3600 % 1000) / 1000)
+    pilote = np.array([str(r).endswith("(Isotry)") for r in regions], dtype=bool)
+    distance[pilote] = 0.0
+    return np.round(centres[:, 0] + distance * np.sin(angle), 5), np.round(centres[:, 1] + distance * np.cos(angle), 5)
@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from urllib.parse import quote, unquote
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+from simulateur_parc import lire_simulation, ids_transfos
+from pertes_glissantes import INTERVALLES_PAR_JOUR
+
+# --- HISTORIQUE DES RELEVÉS (ARROW IPC PARTITIONNÉ PAR RÉGION ET PAR JOUR) ---
+# Arborescence : <dossier>/region=<Région encodée>/jour=<AAAA-MM-JJ>/lot-<id>.arrow
+# Chaque lot est un fichier Arrow IPC non compressé : la lecture le mappe en mémoire (use_mmap)
+# sans copie ni décodage. Les filtres région / dates sont appliqués sur les noms de dossiers
+# avant toute ouverture : une vue sur une région ne liste ni n'ouvre les fichiers des autres.
+# Le filtre sur la priorité (et tout filtre Arrow supplémentaire) est poussé au scanner.
+# Un lot est écrit dans un fichier temporaire puis renommé : un lecteur ne voit jamais de fichier partiel.
+# Compactage : le fichier fusionné est écrit sous un nom caché (ignoré des lecteurs), les anciens lots
+# sont supprimés, puis il est renommé : un lecteur ne voit jamais anciens lots et fusion ensemble.
+# La liste des lots remplacés est gardée dans ses métadonnées : un compactage interrompu (arrêt entre
+# suppression et renommage) est terminé au compactage suivant.
+
+DOSSIER_HISTORIQUE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "historique")
+TAILLE_LOT = 64 * 1024
+
+# Règle de priorité de V10 / V12 (get_diagnosis) appliquée à chaque relevé
+SEUIL_PERTE_HAUTE = 25
+SEUIL_CHARGE_HAUTE = 100
+
+SCHEMA = pa.schema([
+    ("ID", pa.string()),
+    ("Horodatage", pa.timestamp("s")),
+    ("Sortie_kWh", pa.float32()),
+    ("Facture_kWh", pa.float32()),
+    ("Charge_%", pa.float32()),
+    ("Temp_Huile", pa.float32()),
+    ("Perte_%", pa.float32()),
+    ("Priorité", pa.string()),
+])
+PARTITIONS = ds.partitioning(pa.schema([("region", pa.string()), ("jour", pa.date32())]), flavor="hive")
+NOMS_PARTITIONS = {"region": "Région", "jour": "Jour"}
+
+
+def perte_pct(sortie, facture):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(sortie > 0, (1 - facture / sortie) * 100, np.nan).astype(np.float32)
+
+
+def priorite(perte, charge):
+    # Tableau Arrow de chaînes, construit depuis un code 0/1 (pas d'objet Python par ligne)
+    code = ((perte > SEUIL_PERTE_HAUTE) | (charge > SEUIL_CHARGE_HAUTE)).astype(np.int8)
+    return pa.DictionaryArray.from_arrays(code, pa.array(["NORMAL", "HAUTE"])).cast(pa.string())
+
+
+def _dossier_partition(region, jour):
+    return f"region={quote(str(region), safe='')}", f"jour={jour.isoformat()}"
+
+
+class HistoriqueParc:
+    def __init__(self, dossier=None):
+        self.dossier = dossier or os.environ.get("JIRAMA_HISTORIQUE", DOSSIER_HISTORIQUE)
+        os.makedirs(self.dossier, exist_ok=True)
+        self._fs = pafs.LocalFileSystem(use_mmap=True)
+        self._verrou = threading.Lock()
+
+    # --- 1. ÉCRITURE ---
+    def _ecrire_partition(self, region, jour, table, lots_remplaces=()):
+        chemin = os.path.join(self.dossier, *_dossier_partition(region, jour))
+        os.makedirs(chemin, exist_ok=True)
+        nom = f"lot-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.arrow"
+        temporaire = os.path.join(chemin, f".{nom}.tmp")
+        schema = SCHEMA.with_metadata({"lots_remplaces": json.dumps(list(lots_remplaces))}) if lots_remplaces else SCHEMA
+        with pa.OSFile(temporaire, "wb") as f, pa.ipc.new_file(f, schema) as ecrivain:
+            ecrivain.write_table(table.select(SCHEMA.names).cast(schema), max_chunksize=TAILLE_LOT)
+        self._publier(chemin, temporaire, nom, lots_remplaces)
+        return len(table)
+
+    @staticmethod
+    def _publier(chemin, temporaire, nom, lots_remplaces):
+        # Lots remplacés supprimés avant le renommage du fichier qui les fusionne
+        for f in lots_remplaces:
+            try:
+                os.remove(os.path.join(chemin, f))
+            except FileNotFoundError:
+                pass
+        os.replace(temporaire, os.path.join(chemin, nom))
+
+    def _reprendre_compactages(self, chemin, fichiers):
+        # Fusion écrite mais pas encore publiée (arrêt pendant compacter) : publication terminée
+        for f in fichiers:
+            if not (f.startswith(".lot-") and f.endswith(".arrow.tmp")):
+                continue
+            try:
+                with pa.memory_map(os.path.join(chemin, f)) as source:
+                    metadonnees = pa.ipc.open_file(source).schema.metadata or {}
+            except (pa.ArrowInvalid, OSError):
+                continue  # écriture interrompue : fichier incomplet, jamais publié
+            if b"lots_remplaces" in metadonnees:
+                self._publier(chemin, os.path.join(chemin, f), f[1:-len(".tmp")], json.loads(metadonnees[b"lots_remplaces"]))
+
+    def ajouter(self, df):
+        # df : ID, Région, Horodatage, Sortie_kWh, Facture_kWh, Charge_% (+ Temp_Huile, Perte_%, Priorité facultatifs)
+        # Retourne le nombre de relevés écrits, un fichier par couple (région, jour) présent dans df
+        df = df.assign(Horodatage=pd.to_datetime(df["Horodatage"]).astype("datetime64[s]"))
+        if "Temp_Huile" not in df:
+            df = df.assign(Temp_Huile=np.nan)
+        if "Perte_%" not in df:
+            df = df.assign(**{"Perte_%": perte_pct(df["Sortie_kWh"].to_numpy(float), df["Facture_kWh"].to_numpy(float))})
+        if "Priorité" not in df:
+            df = df.assign(Priorité=priorite(df["Perte_%"].to_numpy(), df["Charge_%"].to_numpy()).to_pandas())
+        nb = 0
+        with self._verrou:
+            for (region, jour), groupe in df.groupby([df["Région"], df["Horodatage"].dt.floor("D")], sort=False):
+                nb += self._ecrire_partition(region, jour.date(), pa.Table.from_pandas(groupe, preserve_index=False))
+        return nb
+
+    def importer_simulation(self, dossier_simulation, debut=None):
+        # Charge une simulation de simulateur_parc.ecrire_simulation (relevés (T, N) mappés en mémoire),
+        # journée par journée et région par région, sans passer par pandas
+        meta, colonnes = lire_simulation(dossier_simulation)
+        # Par défaut, la simulation se termine aujourd'hui
+        jours = -(-meta["nb_intervalles"] // INTERVALLES_PAR_JOUR)
+        debut = pd.Timestamp(debut or date.today() - timedelta(days=jours - 1)).floor("D")
+        pas = np.timedelta64(meta["pas_minutes"], "m")
+        ids = pa.array(ids_transfos(meta["nb_transfos"], meta["prefixe_id"], meta["premier_id"]))
+        region = np.asarray(colonnes["region"])
+        nb = 0
+        for t0 in range(0, meta["nb_intervalles"], INTERVALLES_PAR_JOUR):
+            t1 = min(t0 + INTERVALLES_PAR_JOUR, meta["nb_intervalles"])
+            instants = np.datetime64(debut, "s") + np.arange(t0, t1) * pas
+            for code, nom in enumerate(meta["regions"]):
+                positions = np.flatnonzero(region == code)
+                if not len(positions):
+                    continue
+                k, m = t1 - t0, len(positions)
+                valeurs = {col: colonnes[col][t0:t1, positions].ravel() for col in meta["colonnes"]}
+                perte = perte_pct(valeurs["sortie_kwh"], valeurs["facture_kwh"])
+                table = pa.table({
+                    "ID": ids.take(pa.array(np.tile(positions, k))),
+                    "Horodatage": np.repeat(instants, m),
+                    "Sortie_kWh": valeurs["sortie_kwh"], "Facture_kWh": valeurs["facture_kwh"],
+                    "Charge_%": valeurs["charge_pct"], "Temp_Huile": valeurs["temp_huile"],
+                    "Perte_%": perte, "Priorité": priorite(perte, valeurs["charge_pct"]),
+                })
+                with self._verrou:
+                    nb += self._ecrire_partition(nom, pd.Timestamp(instants[0]).date(), table)
+        return nb
+
+    def compacter(self):
+        # Regroupe les lots de chaque partition en un seul fichier (les micro-lots s'accumulent au fil des ticks)
+        nb = 0
+        with self._verrou:
+            for chemin, _, fichiers in os.walk(self.dossier):
+                self._reprendre_compactages(chemin, fichiers)
+                lots = sorted(f for f in os.listdir(chemin) if f.endswith(".arrow"))
+                if len(lots) < 2:
+                    continue
+                table = ds.dataset([os.path.join(chemin, f) for f in lots], schema=SCHEMA, format="ipc",
+                                   filesystem=self._fs).to_table()
+                region, jour = (os.path.basename(p).partition("=")[2] for p in (os.path.dirname(chemin), chemin))
+                self._ecrire_partition(unquote(region), date.fromisoformat(jour), table, lots_remplaces=lots)
+                nb += 1
+        return nb
+
+    # --- 2. LECTURE (ÉLAGAGE DES PARTITIONS + FILTRES POUSSÉS AU SCANNER) ---
+    def regions(self):
+        return sorted(unquote(d.partition("=")[2]) for d in os.listdir(self.dossier) if d.startswith("region="))
+
+    def _fichiers(self, regions, debut, fin):
+        if regions is None:
+            dossiers = [d for d in os.listdir(self.dossier) if d.startswith("region=")]
+        else:
+            dossiers = [f"region={quote(str(r), safe='')}" for r in regions]
+        fichiers = []
+        for d in dossiers:
+            chemin = os.path.join(self.dossier, d)
+            if not os.path.isdir(chemin):
+                continue
+            for j in sorted(os.listdir(chemin)):
+                jour = date.fromisoformat(j.partition("=")[2])
+                if (debut and jour < debut) or (fin and jour > fin):
+                    continue
+                fichiers += [os.path.join(chemin, j, f) for f in sorted(os.listdir(os.path.join(chemin, j))) if f.endswith(".arrow")]
+        return fichiers
+
+    def table(self, regions=None, debut=None, fin=None, priorites=None, colonnes=None, filtre=None):
+        # Table Arrow (zéro copie sur les fichiers mappés) ; colonnes de partition : region, jour
+        schema = SCHEMA.append(pa.field("region", pa.string())).append(pa.field("jour", pa.date32()))
+        if priorites:
+            selection = pc.field("Priorité").isin(list(priorites))
+            filtre = selection if filtre is None else filtre & selection
+        for essai in range(2):
+            fichiers = self._fichiers(regions, debut, fin)
+            if not fichiers:
+                table = schema.empty_table()
+                return table.select(colonnes) if colonnes else table
+            try:
+                dataset = ds.dataset(fichiers, schema=schema, format="ipc", partitioning=PARTITIONS,
+                                     partition_base_dir=self.dossier, filesystem=self._fs)
+                return dataset.to_table(columns=colonnes, filter=filtre)
+            except FileNotFoundError:
+                # Lots remplacés par compacter() entre le listage et l'ouverture : on relit la liste une fois
+                if essai:
+                    raise
+
+    def lire(self, regions=None, debut=None, fin=None, priorites=None, colonnes=None):
+        return self.table(regions, debut, fin, priorites, colonnes).to_pandas().rename(columns=NOMS_PARTITIONS)
+
+    def pertes_journalieres(self, regions=None, debut=None, fin=None, priorites=None):
+        # Synthèse par région et par jour, agrégée par Arrow sur les fichiers mappés
+        table = self.table(regions, debut, fin, priorites, ["region", "jour", "ID", "Sortie_kWh", "Facture_kWh", "Charge_%"])
+        synthese = table.group_by(["region", "jour"]).aggregate([
+            ("Sortie_kWh", "sum"), ("Facture_kWh", "sum"), ("Charge_%", "max"), ("ID", "count_distinct"), ("ID", "count"),
+        ]).to_pandas().rename(columns={
+            **NOMS_PARTITIONS, "Sortie_kWh_sum": "Sortie_kWh", "Facture_kWh_sum": "Facture_kWh", "Charge_%_max": "Charge_max_%",
+            "ID_count_distinct": "Transformateurs", "ID_count": "Relevés",
+        })
+        synthese["Perte_%"] = perte_pct(synthese["Sortie_kWh"].to_numpy(), synthese["Facture_kWh"].to_numpy()).astype(float).round(1)
+        return synthese.sort_values(["Région", "Jour"], ignore_index=True)
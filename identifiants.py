@@ -0,0 +1,151 @@
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from etat_partage import lire_session, fermer_session
+
+# --- IDENTIFIANTS : EMPREINTES SCRYPT, VÉRIFICATION EN POOL BORNÉ, CACHE DES SESSIONS VÉRIFIÉES ---
+# Empreinte : scrypt (coûteux en mémoire, sel aléatoire par compte), stockée en clair dans le compte :
+#   scrypt$<n>$<r>$<p>$<sel base64>$<clé base64>
+# Comparaison en temps constant (hmac.compare_digest). Un identifiant inconnu est vérifié contre une
+# empreinte factice : même durée de réponse qu'un mauvais mot de passe. Les anciennes empreintes SHA-256
+# sans sel restent acceptées le temps de la migration (a_migrer : re-hacher au prochain succès).
+# Vérification : un pool de NB_VERIFICATEURS threads (scrypt libère le GIL) et au plus MAX_EN_ATTENTE
+# demandes en file ; au-delà, SurchargeConnexions plutôt qu'une file sans fin lors d'une relève d'équipe.
+# Le script d'une session attend sa propre vérification ; le serveur et les autres sessions continuent.
+# Cache des jetons : la session vérifiée est relue dans le backend d'état au plus toutes les
+# DUREE_CACHE_JETON_S secondes, pas à chaque run (déconnexion sur une autre réplique visible après ce délai).
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+TAILLE_SEL = 16
+TAILLE_CLE = 32
+MEMOIRE_MAX = 64 * 2 ** 20
+NB_VERIFICATEURS = max(2, min(8, os.cpu_count() or 1))
+MAX_EN_ATTENTE = 64
+DUREE_CACHE_JETON_S = 30
+TAILLE_CACHE_JETONS = 4096
+
+
+# --- 1. EMPREINTES ---
+def _b64(octets):
+    return base64.b64encode(octets).decode()
+
+
+def hacher(mot_de_passe, sel=None, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    sel = sel or os.urandom(TAILLE_SEL)
+    cle = hashlib.scrypt(mot_de_passe.encode(), salt=sel, n=n, r=r, p=p, maxmem=MEMOIRE_MAX, dklen=TAILLE_CLE)
+    return f"scrypt${n}${r}${p}${_b64(sel)}${_b64(cle)}"
+
+
+@functools.cache
+def _empreinte_factice():
+    # Calculée au premier identifiant inconnu, pas à l'import (démarrage à froid)
+    return hacher("", sel=b"\0" * TAILLE_SEL)
+
+
+def a_migrer(empreinte):
+    # Ancienne empreinte SHA-256 (64 caractères hexadécimaux) ou paramètres scrypt plus faibles qu'aujourd'hui
+    if not empreinte.startswith("scrypt$"):
+        return True
+    _, n, r, p, _, _ = empreinte.split("$")
+    return (int(n), int(r), int(p)) < (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def verifier(mot_de_passe, empreinte):
+    # empreinte None (identifiant inconnu) : calcul sur l'empreinte factice, réponse False
+    connu = empreinte is not None
+    empreinte = empreinte or _empreinte_factice()
+    if empreinte.startswith("scrypt$"):
+        _, n, r, p, sel, cle = empreinte.split("$")
+        calcule = hashlib.scrypt(mot_de_passe.encode(), salt=base64.b64decode(sel), n=int(n), r=int(r), p=int(p),
+                                 maxmem=MEMOIRE_MAX, dklen=len(base64.b64decode(cle)))
+        return hmac.compare_digest(calcule, base64.b64decode(cle)) and connu
+    calcule = hashlib.sha256(mot_de_passe.encode()).hexdigest()
+    return hmac.compare_digest(calcule.encode(), empreinte.encode()) and connu
+
+
+# --- 2. VÉRIFICATION EN POOL BORNÉ ---
+class SurchargeConnexions(RuntimeError):
+    pass
+
+
+class VerificateurConnexions:
+    def __init__(self, nb_workers=NB_VERIFICATEURS, max_en_attente=MAX_EN_ATTENTE):
+        self._pool = ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix="verification")
+        self._places = threading.BoundedSemaphore(max_en_attente)
+        self._verrou = threading.Lock()
+        self.statistiques = {"verifiees": 0, "refusees_surcharge": 0, "duree_s": 0.0}
+
+    def _executer(self, fn, *arguments):
+        t0 = time.perf_counter()
+        try:
+            return fn(*arguments)
+        finally:
+            with self._verrou:
+                self.statistiques["verifiees"] += 1
+                self.statistiques["duree_s"] += time.perf_counter() - t0
+            self._places.release()
+
+    def _soumettre(self, fn, *arguments):
+        # SurchargeConnexions si MAX_EN_ATTENTE calculs sont déjà en cours ou en file
+        if not self._places.acquire(blocking=False):
+            with self._verrou:
+                self.statistiques["refusees_surcharge"] += 1
+            raise SurchargeConnexions("Trop de connexions simultanées")
+        return self._pool.submit(self._executer, fn, *arguments)
+
+    def soumettre(self, mot_de_passe, empreinte):
+        # Future[bool]
+        return self._soumettre(verifier, mot_de_passe, empreinte)
+
+    def hacher(self, mot_de_passe):
+        # Future[str] : nouvelle empreinte (migration d'un ancien compte, changement de mot de passe)
+        return self._soumettre(hacher, mot_de_passe)
+
+    def fermer(self):
+        self._pool.shutdown(wait=True)
+
+
+# --- 3. CACHE DES SESSIONS VÉRIFIÉES ---
+class CacheJetons:
+    def __init__(self, duree_s=DUREE_CACHE_JETON_S, taille=TAILLE_CACHE_JETONS):
+        self.duree_s = duree_s
+        self.taille = taille
+        self._verrou = threading.Lock()
+        self._jetons = OrderedDict()
+        self.statistiques = {"succes": 0, "echecs": 0}
+
+    def lire(self, etat, jeton):
+        # Session du jeton : depuis le cache si vérifiée il y a moins de duree_s, sinon depuis le backend
+        if not jeton:
+            return None
+        maintenant = time.monotonic()
+        with self._verrou:
+            entree = self._jetons.get(jeton)
+            if entree is not None and entree[1] > maintenant:
+                self._jetons.move_to_end(jeton)
+                self.statistiques["succes"] += 1
+                return entree[0]
+        session = lire_session(etat, jeton)
+        with self._verrou:
+            self.statistiques["echecs"] += 1
+            if session is None:
+                self._jetons.pop(jeton, None)
+            else:
+                self._jetons[jeton] = (session, maintenant + self.duree_s)
+                while len(self._jetons) > self.taille:
+                    self._jetons.popitem(last=False)
+        return session
+
+    def fermer(self, etat, jeton):
+        # Déconnexion : retirée du cache de cette réplique et du backend (les autres la voient sous duree_s)
+        with self._verrou:
+            self._jetons.pop(jeton, None)
+        fermer_session(etat, jeton)
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from moteur_diagnostic import diagnostiquer
+
+# --- INDEX DU PARC PAR ID (RAPPORT VOCAL D'UN TRANSFORMATEUR) ---
+# Construit une fois par version des données, puis partagé par toutes les sessions :
+#  - ligne(id) : accès direct par table de hachage (pd.Index.get_loc) au lieu de df[df['ID'] == id] ;
+#  - diagnostic(id, lang) : diagnostics FR/EN précalculés pour tout le parc en une passe vectorisée ;
+#  - rechercher(prefixe, region, page) : sélecteur paginé côté serveur ; la recherche par préfixe
+#    d'ID est une recherche dichotomique dans les ID triés (par région si une région est choisie).
+# Seule la page courante (TAILLE_PAGE ID) est envoyée au navigateur dans le st.selectbox.
+
+TAILLE_PAGE = 50
+TAILLE_MEMO = 8
+
+_memo = OrderedDict()
+_verrou = threading.Lock()
+statistiques = {"succes": 0, "echecs": 0}
+
+
+class IndexParc:
+    def __init__(self, df, col_id, col_region, regles):
+        # Un ID présent deux fois (ex: relevé MQTT) : la dernière ligne fait foi
+        self.df = df.drop_duplicates(col_id, keep="last").reset_index(drop=True)
+        self.col_id = col_id
+        ids = self.df[col_id].to_numpy(dtype=str)  # chaînes à largeur fixe : tri et searchsorted natifs
+        self._positions = pd.Index(ids)
+        if len(ids):
+            # La table de hachage de pd.Index est construite au premier get_loc : ici, pas à la première visite
+            self._positions.get_loc(ids[0])
+        self._diagnostics = {lang: col.to_numpy() for lang, col in diagnostiquer(self.df, regles).items()}
+        # Ordre d'origine (liste sans recherche) et ordre trié (recherche par préfixe), par région :
+        # un seul tri des ID, puis chaque région en extrait ses positions sans retrier
+        codes, regions = pd.factorize(self.df[col_region].astype(str), sort=True)
+        self.regions = list(regions)
+        tri = np.argsort(ids, kind="stable")
+        codes_tries = codes[tri]
+        self._ordre = {None: np.arange(len(ids))}
+        self._tri = {None: (ids[tri], tri)}
+        for code, region in enumerate(self.regions):
+            self._ordre[region] = np.flatnonzero(codes == code)
+            positions = tri[codes_tries == code]
+            self._tri[region] = (ids[positions], positions)
+
+    def __len__(self):
+        return len(self.df)
+
+    def __contains__(self, id_transfo):
+        return id_transfo in self._positions
+
+    def ligne(self, id_transfo):
+        return self.df.iloc[self._positions.get_loc(id_transfo)]
+
+    def diagnostic(self, id_transfo, lang):
+        return self._diagnostics[lang][self._positions.get_loc(id_transfo)]
+
+    def rechercher(self, prefixe="", region=None, page=1, taille_page=TAILLE_PAGE):
+        # Retourne (ID de la page demandée, nombre total de résultats)
+        prefixe = prefixe.strip().upper()
+        if prefixe:
+            ids_tries, positions = self._tri.get(region, (np.array([], dtype=str), np.array([], dtype=int)))
+            debut = np.searchsorted(ids_tries, prefixe, side="left")
+            fin = np.searchsorted(ids_tries, prefixe + "\uffff", side="left")
+            positions = positions[debut:fin]
+        else:
+            positions = self._ordre.get(region, np.array([], dtype=int))
+        debut = (max(page, 1) - 1) * taille_page
+        return self._positions[positions[debut:debut + taille_page]].tolist(), len(positions)
+
+
+def index_parc(cle, df, col_id, col_region, regles):
+    # `cle` = (vue, version des données...) : doit changer dès que `df` change
+    with _verrou:
+        index = _memo.get(cle)
+        if index is not None:
+            _memo.move_to_end(cle)
+            statistiques["succes"] += 1
+            return index
+    index = IndexParc(df, col_id, col_region, regles)
+    with _verrou:
+        statistiques["echecs"] += 1
+        _memo[cle] = index
+        while len(_memo) > TAILLE_MEMO:
+            _memo.popitem(last=False)
+    return index
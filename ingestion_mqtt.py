@@ -0,0 +1,333 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+import os
+import numpy as np
+import pandas as pd
+from pertes_glissantes import AgregateurPertes
+
+# --- INGESTION TEMPS RÉEL DES PINCES AMPÈREMÉTRIQUES (MQTT) ---
+# Topic   : jirama/transfo/<ID>/mesures   (ex: jirama/transfo/TR-PILOTE-01/mesures)
+# Payload : {"sortie_kwh": 1520.0, "facture_kwh": 988.0, "charge_pct": 104, "temp_huile": 71, "ts": 1718000000}
+# Le callback MQTT ne fait qu'empiler le message ; un thread dédié dépile par micro-lots
+# et écrit dans un magasin en colonnes NumPy. Le script Streamlit ne lit que des instantanés.
+# File bornée (max_en_attente) : si le broker publie plus vite que le thread ne dépile, les messages
+# en surplus sont abandonnés et comptés (nb_perdus, voir statistiques()) au lieu de saturer la mémoire.
+# Historisation : les relevés acceptés sont aussi écrits dans l'historique Arrow (historique_parc.py),
+# par paquets toutes les `periode_historique_s` secondes (et à l'arrêt), partitionnés par la région
+# du transformateur (regions : ID -> Région, renseigné par le dashboard depuis le parc ; sinon "Non localisé").
+
+TOPIC_BASE = "jirama/transfo"
+TOPIC_ABONNEMENT = f"{TOPIC_BASE}/+/mesures"
+CHAMPS = ["sortie_kwh", "facture_kwh", "charge_pct", "temp_huile"]
+TS_MAX = 2 ** 33                       # secondes epoch (an 2242) : au-delà, horodatage rejeté
+REGION_INCONNUE = "Non localisé"
+MAX_HISTORIQUE_EN_ATTENTE = 2_000_000  # relevés gardés en mémoire si l'historique est indisponible
+MAX_FILE_EN_ATTENTE = 500_000          # messages bruts non encore dépilés (~100 Mo)
+
+_journal = logging.getLogger(__name__)
+
+
+def topic_transfo(id_transfo):
+    return f"{TOPIC_BASE}/{id_transfo}/mesures"
+
+
+# --- 1. MAGASIN EN COLONNES ---
+class MagasinMesures:
+    def __init__(self, capacite=1024):
+        self._verrou = threading.Lock()
+        self._index = {}
+        self._ids = []
+        self._valeurs = np.full((capacite, len(CHAMPS)), np.nan)
+        self._horodatage = np.zeros(capacite)
+        self._nb_mesures = np.zeros(capacite, dtype=np.int64)
+        self.version = 0
+
+    def _positions(self, ids):
+        # Attribue une ligne aux nouveaux transformateurs (capacité doublée si besoin)
+        pos = np.empty(len(ids), dtype=np.int64)
+        for i, id_transfo in enumerate(ids):
+            p = self._index.get(id_transfo)
+            if p is None:
+                p = self._index[id_transfo] = len(self._ids)
+                self._ids.append(id_transfo)
+            pos[i] = p
+        if len(self._ids) > len(self._horodatage):
+            taille = max(len(self._ids), 2 * len(self._horodatage))
+            self._valeurs = np.vstack([self._valeurs, np.full((taille - len(self._valeurs), len(CHAMPS)), np.nan)])
+            self._horodatage = np.concatenate([self._horodatage, np.zeros(taille - len(self._horodatage))])
+            self._nb_mesures = np.concatenate([self._nb_mesures, np.zeros(taille - len(self._nb_mesures), dtype=np.int64)])
+        return pos
+
+    def appliquer_lot(self, ids, valeurs, horodatage):
+        # valeurs : tableau (n, len(CHAMPS)) ; en cas de doublon dans le lot, la dernière mesure l'emporte
+        if not len(ids):
+            return
+        with self._verrou:
+            pos = self._positions(ids)
+            nb_par_pos = np.bincount(pos)
+            if nb_par_pos.max() > 1:
+                _, derniers = np.unique(pos[::-1], return_index=True)
+                garder = len(pos) - 1 - derniers
+                np.add.at(self._nb_mesures, pos, 1)
+                pos, valeurs, horodatage = pos[garder], valeurs[garder], np.asarray(horodatage)[garder]
+            else:
+                self._nb_mesures[pos] += 1
+            self._valeurs[pos] = valeurs
+            self._horodatage[pos] = horodatage
+            self.version += 1
+
+    def instantane(self):
+        # Copie cohérente de l'état courant, au format des dashboards
+        with self._verrou:
+            n = len(self._ids)
+            ids = list(self._ids)
+            valeurs = self._valeurs[:n].copy()
+            horodatage = self._horodatage[:n].copy()
+            nb = self._nb_mesures[:n].copy()
+        sortie, facture = valeurs[:, 0], valeurs[:, 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            perte = np.round((1 - facture / sortie) * 100, 1)
+        return pd.DataFrame({
+            "ID": ids,
+            "Sortie_kWh": sortie,
+            "Facture_kWh": facture,
+            "Charge_%": valeurs[:, 2],
+            "Perte_Vol_%": perte,
+            "Temp_Huile": valeurs[:, 3],
+            "Horodatage": pd.to_datetime(horodatage, unit="s"),
+            "Nb_Mesures": nb,
+        })
+
+
+# --- 2. PIPELINE D'INGESTION ---
+class IngestionMQTT:
+    def __init__(self, client, magasin=None, agregateur=None, taille_lot=5000, attente_s=0.02,
+                 historique=None, periode_historique_s=60, max_en_attente=MAX_FILE_EN_ATTENTE):
+        self.client = client
+        self.magasin = magasin or MagasinMesures()
+        # Taux de perte glissants 1h / 24h / 30j alimentés par le même flux (voir pertes_glissantes.py)
+        self.agregateur = agregateur or AgregateurPertes()
+        self.taille_lot = taille_lot
+        self.attente_s = attente_s
+        self.historique = historique
+        self.periode_historique_s = periode_historique_s
+        self.max_en_attente = max_en_attente
+        self.regions = {}
+        self.nb_recus = 0
+        self.nb_rejetes = 0
+        self.nb_perdus = 0
+        self.nb_historises = 0
+        self._sature = False
+        self._file = deque()
+        self._a_historiser = []
+        self._dernier_historique = time.monotonic()
+        self._arret = threading.Event()
+        self._thread = None
+
+    def demarrer(self):
+        self.client.on_connect = self._connecte
+        self.client.on_message = self._recu
+        self.client.subscribe(TOPIC_ABONNEMENT)
+        self._thread = threading.Thread(target=self._boucle, name="ingestion-mqtt", daemon=True)
+        self._thread.start()
+        self.client.loop_start()
+        return self
+
+    def arreter(self):
+        self.client.loop_stop()
+        self._arret.set()
+        if self._thread:
+            self._thread.join()
+        self._vider()
+        self._historiser()
+
+    def _connecte(self, client, userdata, flags, reason_code, properties=None):
+        # Réabonnement après reconnexion au broker
+        client.subscribe(TOPIC_ABONNEMENT)
+
+    def _recu(self, client, userdata, msg):
+        # Thread réseau MQTT : aucun décodage ici, juste l'empilement (seul producteur : compte exact)
+        if len(self._file) >= self.max_en_attente:
+            self.nb_perdus += 1
+            if not self._sature:
+                self._sature = True
+                _journal.warning("File d'ingestion MQTT pleine (%d messages) : messages abandonnés", self.max_en_attente)
+            return
+        self._file.append((msg.topic, msg.payload))
+
+    def statistiques(self):
+        return {"recus": self.nb_recus, "rejetes": self.nb_rejetes, "perdus": self.nb_perdus,
+                "en_attente": len(self._file), "historises": self.nb_historises}
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            try:
+                traites = self._traiter_lot()
+            except Exception:
+                _journal.exception("Erreur d'ingestion MQTT, lot ignoré")
+                continue
+            if time.monotonic() - self._dernier_historique >= self.periode_historique_s:
+                self._historiser()
+            if not traites:
+                time.sleep(self.attente_s)
+
+    def _vider(self):
+        while self._traiter_lot():
+            pass
+
+    def _traiter_lot(self):
+        file = self._file
+        n = min(len(file), self.taille_lot)
+        if not n:
+            self._sature = False
+            return 0
+        ids, lignes, horodatage = [], [], []
+        maintenant = time.time()
+        for _ in range(n):
+            topic, payload = file.popleft()
+            # Message entièrement décodé avant d'être retenu : ids, lignes et horodatage restent alignés
+            try:
+                mesure = json.loads(payload)
+                id_transfo = topic.split("/")[2]
+                ligne = [float(mesure[c]) for c in CHAMPS]
+                ts = float(mesure.get("ts", maintenant))
+                if not 0 <= ts < TS_MAX:
+                    raise ValueError(ts)
+            except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+                self.nb_rejetes += 1
+                continue
+            ids.append(id_transfo)
+            lignes.append(ligne)
+            horodatage.append(ts)
+        if not ids:
+            return n
+        valeurs = np.array(lignes).reshape(-1, len(CHAMPS))
+        # Un lot en erreur est journalisé et abandonné : le thread d'ingestion continue avec les suivants
+        try:
+            self.magasin.appliquer_lot(ids, valeurs, np.array(horodatage))
+            self.agregateur.ajouter_lot(ids, valeurs[:, 0], valeurs[:, 1], horodatage)
+        except Exception:
+            _journal.exception("Lot de %d mesures MQTT abandonné", len(ids))
+            self.nb_rejetes += len(ids)
+            return n
+        if self.historique is not None:
+            self._a_historiser.append((ids, valeurs, horodatage))
+        self.nb_recus += len(ids)
+        return n
+
+    def _historiser(self):
+        # Thread d'ingestion (ou arrêt) : relevés accumulés -> historique Arrow, un fichier par (région, jour)
+        self._dernier_historique = time.monotonic()
+        lots, self._a_historiser = self._a_historiser, []
+        if self.historique is None or not lots:
+            return 0
+        ids = [i for lot in lots for i in lot[0]]
+        valeurs = np.vstack([lot[1] for lot in lots])
+        releves = pd.DataFrame({
+            "ID": ids,
+            "Région": pd.Series(ids).map(self.regions).fillna(REGION_INCONNUE).astype(str),
+            "Horodatage": pd.to_datetime(np.concatenate([lot[2] for lot in lots]), unit="s"),
+            "Sortie_kWh": valeurs[:, 0], "Facture_kWh": valeurs[:, 1],
+            "Charge_%": valeurs[:, 2], "Temp_Huile": valeurs[:, 3],
+        })
+        try:
+            nb = self.historique.ajouter(releves)
+        except Exception:
+            # Gardés pour le prochain passage, dans la limite de MAX_HISTORIQUE_EN_ATTENTE relevés
+            _journal.exception("Historisation de %d relevés MQTT échouée", len(ids))
+            if len(ids) <= MAX_HISTORIQUE_EN_ATTENTE:
+                self._a_historiser[:0] = lots
+            return 0
+        self.nb_historises += nb
+        return nb
+
+
+def client_paho(hote, port=1883, ca_certs=None):
+    # Client paho-mqtt réel ; TLS activé si un certificat CA est fourni (check-list Go-Live "MQTT SSL")
+    import paho.mqtt.client as mqtt
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"jirama-dashboard-{threading.get_ident()}")
+    if ca_certs:
+        client.tls_set(ca_certs=ca_certs)
+    client.connect(hote, port)
+    return client
+
+
+_ingestion = None
+_verrou_ingestion = threading.Lock()
+
+
+def ingestion_depuis_environnement():
+    # Pipeline unique par processus si JIRAMA_MQTT_BROKER est défini, sinon None (données simulées)
+    global _ingestion
+    if not os.environ.get("JIRAMA_MQTT_BROKER"):
+        return None
+    with _verrou_ingestion:
+        if _ingestion is None:
+            client = client_paho(os.environ["JIRAMA_MQTT_BROKER"], int(os.environ.get("JIRAMA_MQTT_PORT", 1883)),
+                                 os.environ.get("JIRAMA_MQTT_CA"))
+            from historique_parc import HistoriqueParc
+            _ingestion = IngestionMQTT(client, historique=HistoriqueParc()).demarrer()
+        return _ingestion
+
+
+# --- 3. BROKER FACTICE EN MÉMOIRE (TESTS / DÉMO SANS MOSQUITTO) ---
+class _MessageFactice:
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+def _correspond(filtre, topic):
+    f, t = filtre.split("/"), topic.split("/")
+    for i, niveau in enumerate(f):
+        if niveau == "#":
+            return True
+        if i >= len(t) or (niveau != "+" and niveau != t[i]):
+            return False
+    return len(f) == len(t)
+
+
+class ClientFactice:
+    # Même interface que paho.mqtt.client.Client pour ce qu'utilise IngestionMQTT
+    def __init__(self, broker):
+        self.broker = broker
+        self.on_connect = None
+        self.on_message = None
+        self.filtres = []
+
+    def subscribe(self, filtre, qos=0):
+        self.filtres.append(filtre)
+
+    def publish(self, topic, payload, qos=0):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.broker.distribuer(topic, payload)
+
+    def loop_start(self):
+        self.broker.clients.append(self)
+
+    def loop_stop(self):
+        if self in self.broker.clients:
+            self.broker.clients.remove(self)
+
+    def disconnect(self):
+        self.loop_stop()
+
+
+class BrokerFactice:
+    def __init__(self):
+        self.clients = []
+
+    def client(self):
+        return ClientFactice(self)
+
+    def distribuer(self, topic, payload):
+        msg = _MessageFactice(topic, payload)
+        for c in self.clients:
+            if c.on_message and any(_correspond(f, topic) for f in c.filtres):
+                c.on_message(c, None, msg)
@@ -1,49 +1,62 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import random
 from datetime import datetime
+from moteur_diagnostic import diagnostiquer, REGLES_MISSIONS
+from magasin_partage import magasin
+from ingestion_mqtt import ingestion_depuis_environnement
+from pertes_glissantes import appliquer_ratios
+from score_anomalie import scorer_parc, SEUIL_SCORE_HAUTE
+from rendu_carte import figure_carte
+from export_missions import FORMATS, fichier_export
+from mesures_perf import chrono, taille_parc
+from simulateur_parc import instantane, ids_transfos
+from tableau_pagine import tableau_pagine
+from planification_nocturne import dernier_plan
+from tournees import tournees_memorisees
 
 # --- CONFIGURATION ---
 st.set_page_config(page_title="JIRAMA Mission Control", layout="wide")
 st.title("⚡ JIRAMA : Détection de Fraude & Ordres de Mission")
 
 # --- 1. GÉNÉRATION DES DONNÉES IOT (SIMULATION TEMPS RÉEL) ---
-regions = ["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"]
-@st.cache_data
+# Parc simulé reproductible (graine JIRAMA_GRAINE), tiré en une passe vectorisée (voir simulateur_parc.py)
 def load_data():
-    data = []
-    for i in range(20):
-        sortie_kw = random.randint(1000, 3000)
-        facture_kw = sortie_kw * random.uniform(0.4, 0.95) # Simulation pertes non techniques
-        perte_pct = round((1 - (facture_kw / sortie_kw)) * 100, 1)
-        charge = random.randint(40, 115)
+    nb = taille_parc(20)
+    parc = instantane(nb, sortie_kw=(1000, 3000), taux_facture=(0.4, 0.95), charge=(40, 115)) # Pertes non techniques
+    perte_pct = parc["Perte_%"].round(1)
+    return pd.DataFrame({
+        "ID_Transfo": ids_transfos(nb, "TR-MDG-", 1000),
+        "Région": parc["Région"],
+        "Charge (%)": parc["Charge_%"],
+        "Perte/Vol (%)": perte_pct,
         # Coût de la perte (Tarif JIRAMA moyen ~600 Ar/kWh)
-        perte_ariary = (sortie_kw - facture_kw) * 24 * 30 * 600 
-        
-        data.append({
-            "ID_Transfo": f"TR-MDG-{1000+i}",
-            "Région": random.choice(regions),
-            "Charge (%)": charge,
-            "Perte/Vol (%)": perte_pct,
-            "Manque à gagner (Ar)": perte_ariary,
-            "Priorité": "HAUTE" if perte_pct > 30 or charge > 100 else "NORMALE"
-        })
-    return pd.DataFrame(data)
-
-df = load_data()
+        "Manque à gagner (Ar)": (parc["Sortie_kW"] - parc["Facture_kW"]) * 24 * 30 * 600,
+        "Priorité": ((perte_pct > 30) | (parc["Charge_%"] > 100)).map({True: "HAUTE", False: "NORMALE"}),
+    })
 
-# --- 2. BOT DE RECOMMANDATION BILINGUE ---
-lang = st.radio("Langue / Language", ["FR", "EN"])
+# Magasin unique par processus : les sessions partagent les colonnes au lieu d'une copie chacune
+with chrono("donnees"):
+    version_donnees, df = magasin("mission_control", load_data).vue_versionnee()
+
+    # Compteurs MQTT configurés : perte sur 24h glissantes (relevés 15 min) à la place du relevé simulé
+    ingestion = ingestion_depuis_environnement()
+    if ingestion is not None:
+        # Régions du parc : partition des relevés MQTT dans l'historique (ingestion_mqtt.py)
+        ingestion.regions = df.set_index("ID_Transfo")["Région"]
+        df = appliquer_ratios(df, ingestion.agregateur.ratios(), "ID_Transfo", "Perte/Vol (%)")
+        df["Priorité"] = ((df["Perte/Vol (%)"] > 30) | (df["Charge (%)"] > 100)).map({True: "HAUTE", False: "NORMALE"})
+    version_carte = (version_donnees, ingestion.magasin.version if ingestion is not None else 0)
 
-def bot_logic(row):
-    if row['Perte/Vol (%)'] > 35:
-        return "🚨 Descente immédiate requise : Vol massif suspecté." if lang == "FR" else "🚨 Immediate raid required: Massive theft suspected."
-    elif row['Charge (%)'] > 100:
-        return "⚠️ Délestage imminent : Basculer sur batterie." if lang == "FR" else "⚠️ Imminent blackout: Switch to battery."
-    return "✅ Stable"
+# Score de suspicion par rapport aux pairs de la région : un transformateur anormal pour sa zone
+# passe en HAUTE même sous le seuil fixe de 30%
+with chrono("diagnostic"):
+    df = df.join(scorer_parc(df, "Région", "Perte/Vol (%)"))
+    df.loc[df["Score_Suspicion"] >= SEUIL_SCORE_HAUTE, "Priorité"] = "HAUTE"
 
-df['Action_Bot'] = df.apply(bot_logic, axis=1)
+# --- 2. BOT DE RECOMMANDATION BILINGUE ---
+def bot_logic(df, lang):
+    # Règles évaluées sur tout le tableau en une passe (voir moteur_diagnostic.py)
+    return diagnostiquer(df, REGLES_MISSIONS)[lang]
 
 # --- 3. DASHBOARD FINANCIER & TECHNIQUE ---
 total_perte = df["Manque à gagner (Ar)"].sum()
@@ -58,25 +71,65 @@ kpi3.metric("Météo Solaire (Tana)", "☀️ 850 W/m²", help="Données scrapé
 st.markdown("---")
 
 # --- 4. PLANIFICATION DES MISSIONS (EXPORT) ---
-st.subheader("📋 Ordres de Mission Prioritaires")
-missions_urgentes = df[df['Priorité'] == "HAUTE"].sort_values(by="Perte/Vol (%)", ascending=False)
+# Fragment : la langue du bot et le format d'export ne relancent que les ordres de mission,
+# pas les KPI ni la carte
+@st.fragment
+def ordres_de_mission(missions_urgentes):
+    st.subheader("📋 Ordres de Mission Prioritaires")
+    lang = st.radio("Langue / Language", ["FR", "EN"], horizontal=True)
+    with chrono("diagnostic"):
+        missions_urgentes = missions_urgentes.assign(Action_Bot=bot_logic(missions_urgentes, lang))
+
+    tableau_pagine(missions_urgentes[['ID_Transfo', 'Région', 'Perte/Vol (%)', 'Score_Suspicion', 'Action_Bot']], "ordres_mission")
+
+    # Bouton d'exportation pour les équipes terrain : fichier généré seulement au clic, par blocs,
+    # avec localisation GPS et motif (voir export_missions.py)
+    format_export = st.radio("Format d'export", list(FORMATS), horizontal=True)
+    st.download_button(
+        label=f"📥 Télécharger les Ordres de Mission ({format_export})",
+        data=lambda: fichier_export(missions_urgentes, format_export, col_id="ID_Transfo", col_region="Région",
+                                    col_perte="Perte/Vol (%)", col_charge="Charge (%)", seuil_fraude=30),
+        file_name=f"ordres_mission_JIRAMA_{datetime.now().strftime('%Y-%m-%d')}.{FORMATS[format_export]['extension']}",
+        mime=FORMATS[format_export]['mime'],
+    )
+
+    # Tournées d'une journée par agent au départ de l'agence régionale, ordonnées pour le plus de
+    # Manque à gagner récupéré par heure de route (voir tournees.py) ; replanifiées seulement si
+    # les données ou le nombre d'agents changent, et seulement sur demande (le corps d'un expander
+    # s'exécute même replié)
+    with st.expander("🚗 Tournées terrain des agents"):
+        p1, p2 = st.columns([1, 2])
+        nb_agents = p1.number_input("Agents par région", min_value=1, max_value=50, value=2)
+        planifier = p2.toggle("Planifier les tournées", key="tournees_actives")
+        if not planifier:
+            st.caption("Activer la planification pour calculer les tournées du jour.")
+        else:
+            with chrono("tournees"):
+                feuille, synthese = tournees_memorisees(("mission_control", version_carte), missions_urgentes, col_id="ID_Transfo",
+                                                        col_region="Région", col_gain="Manque à gagner (Ar)",
+                                                        agents_par_region=int(nb_agents))
+        if planifier and len(synthese):
+            t1, t2, t3 = st.columns(3)
+            t1.metric("Cibles planifiées", f"{len(feuille)} / {len(missions_urgentes)}")
+            t2.metric("Récupérable (Ar)", f"{synthese['Récupéré (Ar)'].sum():,.0f}")
+            t3.metric("Ar / heure de route", f"{synthese['Récupéré (Ar)'].sum() / synthese['Route (h)'].sum():,.0f}")
+            st.dataframe(synthese, hide_index=True, use_container_width=True)
+            tableau_pagine(feuille, "tournees", surligner=False)
 
-st.dataframe(missions_urgentes[['ID_Transfo', 'Région', 'Perte/Vol (%)', 'Action_Bot']])
+    # Plan classé dans la nuit sur tout l'historique (planification_nocturne.py), chargé sans recalcul
+    rapport, plan = dernier_plan()
+    if plan is not None:
+        with st.expander(f"🌙 Plan nocturne du {rapport['jour']} ({rapport['jours']} jours d'historique, {len(plan):,} transformateurs)"):
+            tableau_pagine(plan, "plan_nocturne")
 
-# Bouton d'exportation pour les équipes terrain
-csv = missions_urgentes.to_csv(index=False).encode('utf-8')
-st.download_button(
-    label="📥 Télécharger les Ordres de Mission (CSV)",
-    data=csv,
-    file_name=f"ordres_mission_JIRAMA_{datetime.now().strftime('%Y-%m-%d')}.csv",
-    mime="text/csv",
-)
+ordres_de_mission(df[df['Priorité'] == "HAUTE"].sort_values(by=["Score_Suspicion", "Perte/Vol (%)"], ascending=False))
 
 # --- 5. CARTOGRAPHIE DES PERTES ---
 st.subheader("📍 Analyse Géographique des Fraudes")
-fig = px.scatter(df, x="Région", y="Perte/Vol (%)", size="Manque à gagner (Ar)", color="Priorité",
-                 hover_name="ID_Transfo", color_discrete_map={"HAUTE": "red", "NORMALE": "green"})
-st.plotly_chart(fig, use_container_width=True)
+with chrono("figure"):
+    fig = figure_carte(df, ("mission_control", version_carte), x="Région", y="Perte/Vol (%)", size="Manque à gagner (Ar)", color="Priorité",
+                       hover_name="ID_Transfo", color_discrete_map={"HAUTE": "red", "NORMALE": "green"})
+    st.plotly_chart(fig, use_container_width=True)
 
 # --- 6. OPTIMISATION DU DÉLESTAGE ---
 st.info("""
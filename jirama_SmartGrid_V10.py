@@ -1,49 +1,75 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-import plotly.express as px
-import hashlib
-import random
-import os
-import base64
-from gtts import gTTS
-from datetime import datetime
+from synthese_vocale import cache_depuis_environnement
+from journal_audit import JournalAudit
+from rendu_carte import figure_carte
+from export_missions import FORMATS, fichier_export
+from moteur_diagnostic import REGLES_SUPERVISION
+from index_parc import index_parc, TAILLE_PAGE
+from mesures_perf import chrono, taille_parc
+from simulateur_parc import instantane, ids_transfos
+from tableau_pagine import tableau_pagine
+from magasin_partage import magasin
+from etat_partage import etat_depuis_environnement, initialiser_comptes, compte, enregistrer_compte, ouvrir_session, script_cookie, COOKIE_SESSION
+from identifiants import hacher, a_migrer, VerificateurConnexions, CacheJetons, SurchargeConnexions
 
 # --- 1. SÉCURITÉ ET AUTHENTIFICATION ---
-def make_hashes(password):
-    return hashlib.sha256(str.encode(password)).hexdigest()
-
-def check_hashes(password, hashed_text):
-    return make_hashes(password) == hashed_text
-
 # Comptes : admin_jirama / admin123 | agent_tana / agent123
-users = {
-    "admin_jirama": {"pwd": make_hashes("admin123"), "role": "ADMIN"},
-    "agent_tana": {"pwd": make_hashes("agent123"), "role": "AGENT"}
-}
-
-if 'logged_in' not in st.session_state:
-    st.session_state.update({'logged_in': False, 'role': None, 'user': None, 'audit_log': []})
+COMPTES_INITIAUX = {"admin_jirama": ("admin123", "ADMIN"), "agent_tana": ("agent123", "AGENT")}
+
+# Sessions de connexion et comptes dans le backend d'état (JIRAMA_ETAT, voir etat_partage.py) : toute réplique
+# derrière l'équilibreur de charge retrouve la session à partir du jeton du cookie. Comptes écrits une fois par processus
+@st.cache_resource
+def etat():
+    backend = etat_depuis_environnement()
+    initialiser_comptes(backend, {u: {"pwd": hacher(pwd), "role": role} for u, (pwd, role) in COMPTES_INITIAUX.items()})
+    return backend
+
+# Empreintes scrypt vérifiées dans un pool borné ; session vérifiée gardée en cache entre les runs (voir identifiants.py)
+@st.cache_resource
+def verificateur():
+    return VerificateurConnexions()
+
+@st.cache_resource
+def cache_jetons():
+    return CacheJetons()
+
+# Jeton : cookie du navigateur, jamais l'URL. st.context.cookies reste celui de l'ouverture de la page,
+# d'où la copie en session_state à la connexion / déconnexion. Anciens liens ?session=... ignorés.
+if "session" in st.query_params:
+    del st.query_params["session"]
+jeton = st.session_state.get('jeton', st.context.cookies.get(COOKIE_SESSION))
+connexion = cache_jetons().lire(etat(), jeton)
+if connexion is not None and st.context.cookies.get(COOKIE_SESSION) != jeton:
+    components.html(script_cookie(jeton), height=0)
+elif connexion is None and st.context.cookies.get(COOKIE_SESSION):
+    components.html(script_cookie("", 0), height=0)
+st.session_state.update({'logged_in': connexion is not None, 'role': connexion and connexion["role"],
+                         'user': connexion and connexion["utilisateur"]})
+
+# Journal d'audit persistant, commun à toutes les sessions (conservé après déconnexion)
+@st.cache_resource
+def journal():
+    return JournalAudit()
 
 def add_audit(action, target):
-    st.session_state.audit_log.append({
-        "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "User": st.session_state.user,
-        "Action": action,
-        "Cible": target
-    })
+    journal().ajouter(st.session_state.user, action, target)
 
 # --- 2. FONCTION SYNTHÈSE VOCALE (TTS) ---
+# Cache audio partagé par toutes les sessions : un rapport déjà lu est rejoué sans nouvelle synthèse
+@st.cache_resource
+def cache_audio():
+    return cache_depuis_environnement()
+
 def speak_text(text, lang_code):
     try:
-        tts = gTTS(text=text, lang=lang_code)
-        filename = "temp_speech.mp3"
-        tts.save(filename)
-        with open(filename, "rb") as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            md = f'<audio controls autoplay="true"><source src="data:audio/mp3;base64,{b64}" type="audio/mp3"></audio>'
-            st.markdown(md, unsafe_allow_html=True)
-        os.remove(filename)
+        with chrono("tts"):
+            clip = cache_audio().demander(text, lang_code).result(timeout=30)
+        if st.get_option("server.enableStaticServing"):
+            st.audio(clip.url, format=clip.mime, autoplay=True)
+        else:
+            st.audio(cache_audio().lire_octets(clip), format=clip.mime, autoplay=True)
     except Exception as e:
         st.error(f"Erreur audio : {e}")
 
@@ -54,90 +80,163 @@ if not st.session_state.logged_in:
         u = st.text_input("Matricule / Identifiant")
         p = st.text_input("Mot de passe", type='password')
         if st.form_submit_button("Se connecter"):
-            if u in users and check_hashes(p, users[u]["pwd"]):
-                st.session_state.update({'logged_in': True, 'role': users[u]["role"], 'user': u})
+            fiche = compte(etat(), u)
+            try:
+                valide = verificateur().soumettre(p, fiche and fiche["pwd"]).result()
+            except SurchargeConnexions:
+                valide = None
+                st.warning("Trop de connexions simultanées : réessayez dans quelques secondes.")
+            if valide:
+                # Ancienne empreinte SHA-256 : remplacée par une empreinte scrypt, calculée hors du script
+                if a_migrer(fiche["pwd"]):
+                    backend = etat()
+                    try:
+                        verificateur().hacher(p).add_done_callback(lambda f: enregistrer_compte(backend, u, {**fiche, "pwd": f.result()}))
+                    except SurchargeConnexions:
+                        pass  # migration à la prochaine connexion
+                st.session_state.jeton = ouvrir_session(etat(), u, fiche["role"])
+                st.session_state.update({'logged_in': True, 'role': fiche["role"], 'user': u})
                 st.rerun()
-            else: st.error("Identifiants invalides")
+            elif valide is not None: st.error("Identifiants invalides")
     st.stop()
 
 # --- 4. LOGIQUE MÉTIER (DONNÉES ET IA) ---
 st.sidebar.title(f"👤 {st.session_state.user}")
-lang = st.sidebar.radio("Langue de l'Assistant", ["FR", "EN"])
-lang_code = 'fr' if lang == "FR" else 'en'
 
-@st.cache_data
+# Parc simulé reproductible (graine JIRAMA_GRAINE), tiré en une passe vectorisée (voir simulateur_parc.py)
 def load_data():
-    regions = ["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"]
-    data = []
-    for i in range(12):
-        sortie = random.randint(1000, 2500)
-        facture = sortie * random.uniform(0.40, 0.98) # Simulation vol
-        perte_pct = round((1 - (facture / sortie)) * 100, 1)
-        charge = random.randint(40, 115)
-        data.append({
-            "ID": f"TR-MDG-{200+i}", "Région": random.choice(regions),
-            "Charge_%": charge, "Perte_Vol_%": perte_pct,
-            "Priorité": "HAUTE" if perte_pct > 25 or charge > 100 else "NORMAL"
-        })
-    return pd.DataFrame(data)
-
-df = load_data()
+    nb = taille_parc(12)
+    parc = instantane(nb, sortie_kw=(1000, 2500), taux_facture=(0.40, 0.98), charge=(40, 115)) # Simulation vol
+    perte_pct = parc["Perte_%"].round(1)
+    return pd.DataFrame({
+        "ID": ids_transfos(nb, "TR-MDG-", 200), "Région": parc["Région"],
+        "Charge_%": parc["Charge_%"], "Perte_Vol_%": perte_pct,
+        "Priorité": ((perte_pct > 25) | (parc["Charge_%"] > 100)).map({True: "HAUTE", False: "NORMAL"}),
+    })
+
+# Magasin unique par processus : les sessions partagent les colonnes au lieu d'une copie chacune
+with chrono("donnees"):
+    version_donnees, df = magasin("jirama_v10", load_data).vue_versionnee()
 
 # --- 5. DASHBOARD PRINCIPAL ---
 st.title("🎙️ JIRAMA AI : Supervision Vocale & Anti-Fraude")
 
-# Sélection du transformateur pour Audit
-selected_id = st.selectbox("Sélectionner un transformateur pour rapport vocal", df['ID'])
-row = df[df['ID'] == selected_id].iloc[0]
-
-# Diagnostic du Bot
-def get_diagnosis(r):
-    diag = []
-    if r['Perte_Vol_%'] > 25: diag.append("🚩 Fraude détectée" if lang=="FR" else "🚩 Fraud detected")
-    if r['Charge_%'] > 100: diag.append("⚠️ Surcharge critique" if lang=="FR" else "⚠️ Critical Overload")
-    return " | ".join(diag) if diag else ("✅ Stable" if lang=="FR" else "✅ Stable")
-
-diagnosis = get_diagnosis(row)
-
-# Génération du script vocal
-if lang == "FR":
-    script = f"Transformateur {row['ID']}. Région {row['Région']}. Charge {row['Charge_%']} pourcent. Vol suspecté {row['Perte_Vol_%']} pourcent. Diagnostic : {diagnosis}."
-else:
-    script = f"Transformer {row['ID']}. Region {row['Région']}. Load {row['Charge_%']} percent. Theft suspected {row['Perte_Vol_%']} percent. Diagnosis: {diagnosis}."
-
-col1, col2 = st.columns([2, 1])
-with col1:
-    st.info(f"**Analyse du Bot :** {diagnosis}")
-    st.write(f"**Détails :** {script}")
-with col2:
-    if st.button("🔊 LIRE LE RAPPORT"):
-        speak_text(script, lang_code)
-        add_audit("LECTURE_VOCALE", row['ID'])
+# Index par ID partagé entre sessions : accès direct à la ligne, diagnostics précalculés (voir index_parc.py)
+with chrono("diagnostic"):
+    index = index_parc(("v10", version_donnees), df, "ID", "Région", REGLES_SUPERVISION)
+
+# Diagnostic du Bot (précalculé pour tout le parc)
+def get_diagnosis(r, lang):
+    return index.diagnostic(r['ID'], lang)
+
+# Fragment : langue, recherche et choix du transformateur ne relancent que le rapport vocal
+@st.fragment
+def rapport_vocal(index):
+    lang = st.radio("Langue de l'Assistant", ["FR", "EN"], horizontal=True)
+    lang_code = 'fr' if lang == "FR" else 'en'
+
+    # Sélection du transformateur pour Audit : recherche côté serveur, seule la page courante part au navigateur
+    s1, s2, s3 = st.columns([2, 2, 1])
+    region_choisie = s1.selectbox("Région", ["Toutes"] + index.regions)
+    region_choisie = None if region_choisie == "Toutes" else region_choisie
+    prefixe = s2.text_input("Rechercher un ID (début, ex: TR-MDG-2)")
+    _, total = index.rechercher(prefixe, region_choisie)
+    nb_pages = max(1, -(-total // TAILLE_PAGE))
+    page = s3.number_input(f"Page (sur {nb_pages})", 1, nb_pages, 1, key=f"page_{region_choisie}_{prefixe}")
+    ids_page, total = index.rechercher(prefixe, region_choisie, page)
+    if not ids_page:
+        st.warning("Aucun transformateur ne correspond à la recherche.")
+        ids_page, total = index.rechercher()
+    selected_id = st.selectbox("Sélectionner un transformateur pour rapport vocal", ids_page)
+    st.caption(f"{total:,} transformateur(s) — page {page}/{nb_pages}")
+    row = index.ligne(selected_id)
+
+    with chrono("diagnostic"):
+        diagnosis = get_diagnosis(row, lang)
+
+    # Génération du script vocal
+    if lang == "FR":
+        script = f"Transformateur {row['ID']}. Région {row['Région']}. Charge {row['Charge_%']} pourcent. Vol suspecté {row['Perte_Vol_%']} pourcent. Diagnostic : {diagnosis}."
+    else:
+        script = f"Transformer {row['ID']}. Region {row['Région']}. Load {row['Charge_%']} percent. Theft suspected {row['Perte_Vol_%']} percent. Diagnosis: {diagnosis}."
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.info(f"**Analyse du Bot :** {diagnosis}")
+        st.write(f"**Détails :** {script}")
+    with col2:
+        if st.button("🔊 LIRE LE RAPPORT"):
+            speak_text(script, lang_code)
+            add_audit("LECTURE_VOCALE", row['ID'])
+
+rapport_vocal(index)
 
 st.markdown("---")
 
 # --- 6. VUE PAR RÔLE ---
+# Fragment : filtres, pages et export du journal sans relancer la carte ni le rapport
+@st.fragment
+def journal_admin():
+    j = journal()
+    j.vider()
+    f1, f2, f3 = st.columns(3)
+    filtres = {
+        "utilisateur": f1.selectbox("Utilisateur", [""] + j.valeurs_distinctes("utilisateur")),
+        "action": f2.selectbox("Action", [""] + j.valeurs_distinctes("action")),
+        "cible": f3.text_input("Cible (ex: TR-PILOTE-01)").strip(),
+    }
+    # Pagination par curseur : pile des curseurs des pages déjà parcourues
+    if st.session_state.get('audit_filtres') != filtres:
+        st.session_state.update({'audit_filtres': filtres, 'audit_pages': [None]})
+    pages = st.session_state.audit_pages
+    page, suivant = j.rechercher(**filtres, avant_id=pages[-1])
+    if page.empty:
+        st.write("Aucune activité enregistrée.")
+    else:
+        st.table(page)
+    n1, n2, n3 = st.columns(3)
+    if n1.button("◀ Page précédente", disabled=len(pages) == 1):
+        pages.pop()
+        st.rerun(scope="fragment")
+    if n2.button("Page suivante ▶", disabled=suivant is None):
+        pages.append(suivant)
+        st.rerun(scope="fragment")
+    n3.caption(f"{j.compter(**filtres):,} entrées — page {len(pages)}")
+    e1, e2 = st.columns(2)
+    e1.download_button("📥 Exporter le journal (CSV)", lambda: j.export_csv_fichier(**filtres), "journal_audit.csv", "text/csv")
+    if e2.button("💾 Sauvegarder la base des logs"):
+        st.success(f"Sauvegarde créée : {j.sauvegarder()}")
+
+# Fragment : le choix du format d'export ne relance que la liste des missions
+@st.fragment
+def missions_terrain(missions):
+    tableau_pagine(missions, "missions_terrain")
+    format_export = st.radio("Format d'export", list(FORMATS), horizontal=True)
+    fmt = FORMATS[format_export]
+    # Fichier généré uniquement au clic, bloc par bloc, avec GPS et motif (voir export_missions.py)
+    if st.download_button(f"📥 Exporter Missions ({format_export})",
+                          lambda: fichier_export(missions, format_export, col_id="ID", col_region="Région",
+                                                 col_perte="Perte_Vol_%", col_charge="Charge_%", seuil_fraude=25),
+                          f"missions.{fmt['extension']}", fmt['mime']):
+        add_audit(fmt['audit'], "Liste_Missions")
+
 if st.session_state.role == "ADMIN":
     st.subheader("🛡️ Console Administration (Accès réservé)")
     tab1, tab2 = st.tabs(["Analyse Cartographique", "Journal d'Audit"])
     
     with tab1:
-        fig = px.scatter(df, x="Région", y="Perte_Vol_%", size="Charge_%", color="Priorité", hover_name="ID")
-        st.plotly_chart(fig, use_container_width=True)
+        with chrono("figure"):
+            fig = figure_carte(df, ("v10_admin", version_donnees), x="Région", y="Perte_Vol_%", size="Charge_%", color="Priorité", hover_name="ID")
+            st.plotly_chart(fig, use_container_width=True)
     
     with tab2:
-        if st.session_state.audit_log:
-            st.table(pd.DataFrame(st.session_state.audit_log))
-        else: st.write("Aucune activité enregistrée.")
+        journal_admin()
 
 else: # VUE AGENT
     st.subheader("📋 Mes Missions Terrain")
-    missions = df[df['Priorité'] == "HAUTE"]
-    st.dataframe(missions)
-    if st.button("📥 Exporter Missions (CSV)"):
-        add_audit("EXPORT_CSV", "Liste_Missions")
-        st.download_button("Télécharger", missions.to_csv().encode('utf-8'), "missions.csv", "text/csv")
+    missions_terrain(df[df['Priorité'] == "HAUTE"])
 
 if st.sidebar.button("Déconnexion"):
-    st.session_state.logged_in = False
+    cache_jetons().fermer(etat(), jeton)
+    st.session_state.update({'jeton': None, 'logged_in': False})
     st.rerun()
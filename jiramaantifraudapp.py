@@ -1,89 +1,111 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import random
+from moteur_diagnostic import diagnostiquer, avec_seuil, REGLES_BOT_IA
+from score_anomalie import scorer_parc, SEUIL_SCORE_HAUTE
+from rendu_carte import figure_carte
+from magasin_partage import magasin
+from mesures_perf import chrono, taille_parc
+from simulateur_parc import instantane, ids_transfos
+from tableau_pagine import tableau_pagine
+from stockage_batteries import simuler_memorise
 
 # --- CONFIGURATION ---
 st.set_page_config(page_title="JIRAMA AI Monitor", layout="wide")
 st.title("⚡ JIRAMA Smart Monitor & AI Bot")
+NB_ACTIONS_AFFICHEES = 10 # Actions prioritaires détaillées par le chatbot
 
 # --- 1. GÉNÉRATION DES DONNÉES IOT (TRANSFORMATEURS) ---
-regions = ["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"]
+# Parc simulé reproductible (graine JIRAMA_GRAINE), tiré en une passe vectorisée (voir simulateur_parc.py)
 def generate_data():
-    data = []
-    for i in range(15):
-        sortie_kw = random.randint(800, 2000)
-        facture_kw = sortie_kw * random.uniform(0.5, 0.98) # Simulation de fraude
-        perte = round((1 - (facture_kw / sortie_kw)) * 100, 1)
-        charge = random.randint(30, 115) # Surcharge possible
-        data.append({
-            "ID": f"TR-TANA-{100+i}",
-            "Région": random.choice(regions),
-            "Charge_Pct": charge,
-            "Perte_Fraude_Pct": perte,
-            "Temp_Huile": random.randint(40, 95)
-        })
-    return pd.DataFrame(data)
+    nb = taille_parc(15)
+    # Facturé = 50 à 98% du sorti (simulation de fraude), surcharge possible jusqu'à 115%
+    parc = instantane(nb, sortie_kw=(800, 2000), taux_facture=(0.5, 0.98), charge=(30, 115), temp_huile=(40, 95))
+    return pd.DataFrame({
+        "ID": ids_transfos(nb, "TR-TANA-", 100),
+        "Région": parc["Région"],
+        "Charge_Pct": parc["Charge_%"],
+        "Perte_Fraude_Pct": parc["Perte_%"].round(1),
+        "Temp_Huile": parc["Temp_Huile"],
+    })
 
-df = generate_data()
+# Magasin unique par processus : un clic sur un widget ne régénère plus les données
+with chrono("donnees"):
+    version_donnees, df = magasin("ai_monitor", generate_data).vue_versionnee()
 
 # --- 2. BOT DE RECOMMANDATION (IA LOGIQUE) ---
-def ai_recommandation(row, lang):
-    recos = []
-    # Logique de détection
-    if row['Perte_Fraude_Pct'] > 25:
-        recos.append("🚩 Fraude suspectée élevée" if lang == "FR" else "🚩 High Fraud Suspected")
-    if row['Charge_Pct'] > 95:
-        recos.append("⚠️ Surcharge critique" if lang == "FR" else "⚠️ Critical Overload")
-    if row['Temp_Huile'] > 85:
-        recos.append("🔥 Surchauffe huile" if lang == "FR" else "🔥 Oil Overheating")
-    
-    if not recos:
-        return "✅ État Nominal" if lang == "FR" else "✅ Nominal State"
-    return " | ".join(recos)
+def ai_recommandation(df, lang, seuil_fraude=25):
+    # Détection fraude / surcharge / surchauffe vectorisée (voir moteur_diagnostic.py)
+    return diagnostiquer(df, avec_seuil(REGLES_BOT_IA, "Perte_Fraude_Pct", seuil_fraude))[lang]
 
-# --- 3. INTERFACE UTILISATEUR ---
-lang = st.radio("Sélectionner la langue du Bot / Select Bot Language", ["FR", "EN"])
-
-st.sidebar.header("📡 Paramètres Réseau")
-seuil_alerte = st.sidebar.slider("Seuil Alerte Fraude (%)", 10, 50, 25)
+# Score de suspicion : écart robuste à la médiane des transformateurs de la même région.
+# Ne dépend ni de la langue ni du seuil : calculé une fois par run complet, hors du fragment
+with chrono("diagnostic"):
+    df = df.join(scorer_parc(df, "Région", "Perte_Fraude_Pct")).sort_values("Score_Suspicion", ascending=False)
 
+# --- 3. INTERFACE UTILISATEUR ---
 # --- 4. TABLEAU DE BORD & BOT ---
-st.subheader("🤖 Analyse Automatisée du Bot")
+# Fragment : la langue et le seuil d'alerte ne relancent que l'analyse du bot et les actions
+# prioritaires, pas le panneau BESS ni la carte
+@st.fragment
+def analyse_bot(df):
+    st.subheader("🤖 Analyse Automatisée du Bot")
+    c1, c2 = st.columns(2)
+    lang = c1.radio("Sélectionner la langue du Bot / Select Bot Language", ["FR", "EN"])
+    seuil_alerte = c2.slider("Seuil Alerte Fraude (%)", 10, 50, 25)
 
-# On ajoute la recommandation du bot au DataFrame
-df['Recommandation_Bot'] = df.apply(lambda row: ai_recommandation(row, lang), axis=1)
+    # On ajoute la recommandation du bot au DataFrame (seuil de fraude réglé ci-dessus)
+    with chrono("diagnostic"):
+        df = df.assign(Recommandation_Bot=ai_recommandation(df, lang, seuil_alerte))
+        df['Priorité'] = ((df['Perte_Fraude_Pct'] > seuil_alerte) | (df['Score_Suspicion'] >= SEUIL_SCORE_HAUTE)).map({True: "HAUTE", False: "NORMALE"})
 
-# Affichage stylisé
-st.dataframe(df.style.apply(lambda x: ['background-color: #ff4b4b' if '🚩' in str(v) or '⚠️' in str(v) else '' for v in x], axis=1), use_container_width=True)
-
-# --- 5. FOCUS SUR LE STOCKAGE (BATTERIES) ---
-st.markdown("---")
-col_bot, col_bat = st.columns([1, 1])
+    # Affichage stylisé : page courante seulement, alertes 🚩/⚠️ surlignées (voir tableau_pagine.py)
+    tableau_pagine(df, "analyse_bot", use_container_width=True)
 
-with col_bot:
     st.subheader("🗨️ Chatbot : Actions Prioritaires")
     targets = df[df['Charge_Pct'] > 90]
     if not targets.empty:
-        for _, r in targets.iterrows():
+        # Les plus suspects d'abord (df trié par score) ; le reste est résumé en une ligne
+        for _, r in targets.head(NB_ACTIONS_AFFICHEES).iterrows():
             msg = f"**{r['ID']}** ({r['Région']}): Délester de {r['Charge_Pct']-90}% ou injecter batterie." if lang == "FR" else f"**{r['ID']}** ({r['Région']}): Shed {r['Charge_Pct']-90}% load or inject battery."
             st.warning(msg)
+        if len(targets) > NB_ACTIONS_AFFICHEES:
+            reste = len(targets) - NB_ACTIONS_AFFICHEES
+            st.caption(f"… et {reste:,} autres transformateurs au-delà de 90% de charge." if lang == "FR" else f"… and {reste:,} more transformers above 90% load.")
     else:
         st.success("Aucune action urgente requise." if lang == "FR" else "No urgent actions required.")
 
-with col_bat:
-    st.subheader("🔋 Gestion du Stockage (BESS)")
-    # Simulation de surproduction solaire (Scraping météo virtuel)
-    meteo_soleil = random.randint(0, 100) 
-    st.write(f"Ensoleillement à Tana : {meteo_soleil}%")
-    if meteo_soleil > 70:
-        st.info("Surproduction solaire active. Chargement des batteries de secours (Antsirabe/Tana).")
-        st.progress(meteo_soleil / 100)
-    else:
-        st.error("Faible production. Utilisation des réserves pour éviter le délestage.")
+analyse_bot(df)
+
+# --- 5. FOCUS SUR LE STOCKAGE (BATTERIES) ---
+# Simulation de surproduction solaire (Scraping météo virtuel), relevée au plus tous les quarts d'heure
+@st.cache_data(ttl=900)
+def ensoleillement_tana():
+    return random.randint(0, 100)
+
+st.markdown("---")
+st.subheader("🔋 Gestion du Stockage (BESS)")
+meteo_soleil = ensoleillement_tana()
+st.write(f"Ensoleillement à Tana : {meteo_soleil}%")
+if meteo_soleil > 70:
+    st.info("Surproduction solaire active. Chargement des batteries de secours (Antsirabe/Tana).")
+    st.progress(meteo_soleil / 100)
+else:
+    st.error("Faible production. Utilisation des réserves pour éviter le délestage.")
+
+# Un an de dispatch horaire des sites BESS + solaire sur les surcharges du parc, ensoleillement du jour
+# pris comme crête (voir stockage_batteries.py) ; mémorisé par empreinte des entrées
+with chrono("stockage"):
+    bess = simuler_memorise(df["Charge_Pct"], df["Région"], ensoleillement_crete=meteo_soleil * 10)
+b1, b2, b3 = st.columns(3)
+b1.metric("Surcharges à couvrir", f"{bess['synthese']['Besoin (MWh/an)'].sum():,.1f} MWh/an")
+b2.metric("Délestage résiduel", f"{bess['synthese']['Délestage (MWh)'].sum():,.1f} MWh/an")
+b3.metric("Transformateurs encore délestés", int((bess["heures_delestage"]["Avec site (h/an)"] > 0).sum()))
+st.dataframe(bess["synthese"], hide_index=True, use_container_width=True)
 
 # --- 6. CARTOGRAPHIE DES VOLS ---
 st.subheader("🗺️ Cartographie des zones de pertes (Fraudes)")
-fig = px.scatter(df, x="Région", y="Perte_Fraude_Pct", size="Charge_Pct", color="Temp_Huile",
-                 hover_name="ID", title="Analyse Spatiale des Pertes JIRAMA")
-st.plotly_chart(fig, use_container_width=True)
+with chrono("figure"):
+    fig = figure_carte(df, ("ai_monitor", version_donnees), x="Région", y="Perte_Fraude_Pct", size="Charge_Pct", color="Temp_Huile",
+                       hover_name="ID", title="Analyse Spatiale des Pertes JIRAMA")
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,253 @@
+import csv
+import io
+import logging
+import os
+import tempfile
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import date, datetime, timedelta
+import pandas as pd
+
+# --- JOURNAL D'AUDIT PERSISTANT (SQLite WAL) ---
+# add_audit() ne fait qu'empiler l'entrée ; un thread écrivain regroupe les entrées en une seule
+# transaction (group commit) toutes les `delai_s` secondes ou dès `taille_lot` entrées.
+# Index sur utilisateur / action / cible / horodatage pour filtrer et paginer des millions de lignes.
+# Sauvegarde quotidienne (check-list Go-Live "Backup") : copie cohérente via l'API backup de SQLite,
+# les `nb_sauvegardes` plus récentes sont conservées. Elle tourne dans son propre thread, avec sa propre
+# connexion : en WAL, les group commits continuent pendant la copie d'une base de plusieurs Go.
+# Rotation du journal vivant : après la sauvegarde, les entrées de plus de `conservation_jours` jours sont
+# déplacées jour par jour dans archives/audit_<AAAA-MM>.db (même table) ; audit.db reste borné (pages
+# libérées réutilisées) et les requêtes de l'onglet admin portent sur la période de conservation.
+# Une écriture en échec (base verrouillée au-delà du timeout, disque plein) est journalisée et retentée
+# avec un délai croissant ; une entrée impossible à enregistrer est écartée seule, sans perdre son lot.
+
+DOSSIER_JOURNAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal")
+COLONNES = ["Date", "User", "Action", "Cible"]
+INSERTION = "INSERT INTO audit (horodatage, utilisateur, action, cible) VALUES (?, ?, ?, ?)"
+DELAI_MAX_REESSAI_S = 30
+
+_journal = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY,
+    horodatage TEXT NOT NULL,
+    utilisateur TEXT,
+    action TEXT NOT NULL,
+    cible TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_audit_horodatage ON audit (horodatage);
+CREATE INDEX IF NOT EXISTS idx_audit_utilisateur ON audit (utilisateur, id);
+CREATE INDEX IF NOT EXISTS idx_audit_action ON audit (action, id);
+CREATE INDEX IF NOT EXISTS idx_audit_cible ON audit (cible, id);
+"""
+
+SCHEMA_ARCHIVE = [
+    "CREATE TABLE IF NOT EXISTS archive.audit (id INTEGER PRIMARY KEY, horodatage TEXT NOT NULL, utilisateur TEXT, action TEXT NOT NULL, cible TEXT)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_audit_horodatage ON audit (horodatage)",
+]
+
+
+class JournalAudit:
+    def __init__(self, chemin=None, taille_lot=500, delai_s=0.2, nb_sauvegardes=30, conservation_jours=365):
+        self.chemin = chemin or os.environ.get("JIRAMA_AUDIT_DB", os.path.join(DOSSIER_JOURNAL, "audit.db"))
+        self.dossier_sauvegardes = os.path.join(os.path.dirname(os.path.abspath(self.chemin)), "sauvegardes")
+        self.dossier_archives = os.path.join(os.path.dirname(os.path.abspath(self.chemin)), "archives")
+        self.taille_lot = taille_lot
+        self.delai_s = delai_s
+        self.nb_sauvegardes = nb_sauvegardes
+        self.conservation_jours = conservation_jours  # None : pas de rotation du journal vivant
+        os.makedirs(os.path.dirname(os.path.abspath(self.chemin)), exist_ok=True)
+        self._file = queue.Queue()
+        self._vide = threading.Condition()
+        self._en_attente = 0
+        self._maintenance = threading.Lock()
+        ecriture = self._connexion()
+        ecriture.executescript(SCHEMA)
+        self._dernier_jour = date.today()
+        self._thread = threading.Thread(target=self._ecrivain, args=(ecriture,), name="journal-audit", daemon=True)
+        self._thread.start()
+
+    def _connexion(self):
+        cnx = sqlite3.connect(self.chemin, check_same_thread=False, timeout=30)
+        cnx.execute("PRAGMA journal_mode=WAL")
+        cnx.execute("PRAGMA synchronous=NORMAL")
+        return cnx
+
+    # --- 1. ÉCRITURE BUFFERISÉE ---
+    def ajouter(self, utilisateur, action, cible, horodatage=None):
+        horodatage = horodatage or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._vide:
+            self._en_attente += 1
+        self._file.put((horodatage, utilisateur, action, None if cible is None else str(cible)))
+
+    def vider(self, timeout=5):
+        # Attend que toutes les entrées déjà ajoutées soient écrites (avant une lecture admin)
+        with self._vide:
+            return self._vide.wait_for(lambda: self._en_attente == 0, timeout)
+
+    def _ecrivain(self, cnx):
+        while True:
+            lot = [self._file.get()]
+            try:
+                while len(lot) < self.taille_lot:
+                    lot.append(self._file.get(timeout=self.delai_s))
+            except queue.Empty:
+                pass
+            attente = self.delai_s
+            while True:
+                try:
+                    self._ecrire(cnx, lot)
+                    break
+                except Exception:
+                    _journal.exception("Écriture de %d entrées d'audit échouée, nouvel essai dans %.1fs", len(lot), attente)
+                    time.sleep(attente)
+                    attente = min(2 * attente, DELAI_MAX_REESSAI_S)
+            with self._vide:
+                self._en_attente -= len(lot)
+                self._vide.notify_all()
+            if date.today() != self._dernier_jour:
+                self._dernier_jour = date.today()
+                threading.Thread(target=self._maintenance_quotidienne, name="journal-audit-maintenance", daemon=True).start()
+
+    def _maintenance_quotidienne(self):
+        # Une seule à la fois : si la précédente copie n'est pas finie, celle du jour est sautée
+        if not self._maintenance.acquire(blocking=False):
+            return
+        try:
+            self.sauvegarder()
+            if self.conservation_jours:
+                self.archiver(date.today() - timedelta(days=self.conservation_jours))
+        except Exception:
+            _journal.exception("Maintenance quotidienne du journal d'audit échouée")
+        finally:
+            self._maintenance.release()
+
+    def _ecrire(self, cnx, lot):
+        # Lot en une transaction ; si une entrée ne peut pas être liée, reprise ligne à ligne
+        try:
+            with cnx:
+                cnx.executemany(INSERTION, lot)
+        except (sqlite3.InterfaceError, sqlite3.ProgrammingError):
+            with cnx:
+                for ligne in lot:
+                    try:
+                        cnx.execute(INSERTION, ligne)
+                    except (sqlite3.InterfaceError, sqlite3.ProgrammingError):
+                        _journal.error("Entrée d'audit écartée (non enregistrable) : %r", ligne)
+
+    # --- 2. REQUÊTES INDEXÉES ---
+    def _filtres(self, utilisateur=None, action=None, cible=None, debut=None, fin=None):
+        clauses, params = [], []
+        for colonne, valeur in [("utilisateur", utilisateur), ("action", action), ("cible", cible)]:
+            if valeur:
+                clauses.append(f"{colonne} = ?")
+                params.append(valeur)
+        if debut:
+            clauses.append("horodatage >= ?")
+            params.append(str(debut))
+        if fin:
+            clauses.append("horodatage < ?")
+            params.append(str(fin))
+        return clauses, params
+
+    def rechercher(self, utilisateur=None, action=None, cible=None, debut=None, fin=None, avant_id=None, limite=50):
+        # Pagination par curseur (id décroissant) : coût constant quelle que soit la profondeur de page.
+        # Retourne (DataFrame au format Date/User/Action/Cible, curseur de la page suivante ou None)
+        clauses, params = self._filtres(utilisateur, action, cible, debut, fin)
+        if avant_id is not None:
+            clauses.append("id < ?")
+            params.append(avant_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connexion()) as cnx:
+            lignes = cnx.execute(
+                f"SELECT id, horodatage, utilisateur, action, cible FROM audit {where} ORDER BY id DESC LIMIT ?",
+                params + [limite + 1],
+            ).fetchall()
+        suivant = lignes[limite - 1][0] if len(lignes) > limite else None
+        return pd.DataFrame([l[1:] for l in lignes[:limite]], columns=COLONNES), suivant
+
+    def compter(self, utilisateur=None, action=None, cible=None, debut=None, fin=None):
+        clauses, params = self._filtres(utilisateur, action, cible, debut, fin)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connexion()) as cnx:
+            return cnx.execute(f"SELECT COUNT(*) FROM audit {where}", params).fetchone()[0]
+
+    def valeurs_distinctes(self, colonne):
+        # Listes des filtres (utilisateurs, actions) : saut d'une valeur à la suivante dans l'index,
+        # en O(nb valeurs × log n) au lieu d'un parcours complet du journal
+        assert colonne in ("utilisateur", "action")
+        requete = f"""
+            WITH RECURSIVE v(val) AS (
+                SELECT MIN({colonne}) FROM audit
+                UNION ALL
+                SELECT (SELECT MIN({colonne}) FROM audit WHERE {colonne} > v.val) FROM v WHERE v.val IS NOT NULL
+            )
+            SELECT val FROM v WHERE val IS NOT NULL"""
+        with closing(self._connexion()) as cnx:
+            return [v for (v,) in cnx.execute(requete)]
+
+    # --- 3. EXPORT & SAUVEGARDE ---
+    def exporter_csv(self, flux, taille_bloc=10_000, **filtres):
+        # Écrit les lignes au fil de l'eau dans un flux texte, sans charger le journal en mémoire
+        clauses, params = self._filtres(**filtres)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        ecrivain = csv.writer(flux)
+        ecrivain.writerow(COLONNES)
+        with closing(self._connexion()) as cnx:
+            curseur = cnx.execute(f"SELECT horodatage, utilisateur, action, cible FROM audit {where} ORDER BY id", params)
+            while True:
+                bloc = curseur.fetchmany(taille_bloc)
+                if not bloc:
+                    break
+                ecrivain.writerows(bloc)
+
+    def export_csv_fichier(self, **filtres):
+        # Fichier temporaire sur disque, relu par st.download_button au moment du clic
+        fichier = tempfile.TemporaryFile()
+        flux = io.TextIOWrapper(fichier, encoding="utf-8", newline="", write_through=True)
+        self.exporter_csv(flux, **filtres)
+        flux.detach()
+        fichier.seek(0)
+        return fichier
+
+    def sauvegarder(self):
+        # Copie cohérente même pendant les écritures (instantané de lecture WAL, en une passe), puis
+        # rotation des anciennes sauvegardes
+        os.makedirs(self.dossier_sauvegardes, exist_ok=True)
+        cible = os.path.join(self.dossier_sauvegardes, f"audit_{datetime.now().strftime('%Y-%m-%d')}.db")
+        with closing(sqlite3.connect(cible)) as destination, closing(self._connexion()) as source:
+            source.backup(destination)
+        sauvegardes = sorted(f for f in os.listdir(self.dossier_sauvegardes) if f.startswith("audit_") and f.endswith(".db"))
+        for ancienne in sauvegardes[:-self.nb_sauvegardes]:
+            os.remove(os.path.join(self.dossier_sauvegardes, ancienne))
+        return cible
+
+    def archiver(self, avant):
+        # Déplace les entrées antérieures au jour `avant` vers archives/audit_<AAAA-MM>.db, une transaction
+        # par jour (verrou d'écriture bref pour le group commit). Id conservé et INSERT OR IGNORE : un jour
+        # interrompu entre les deux bases est simplement rejoué. Retourne le nombre d'entrées déplacées.
+        os.makedirs(self.dossier_archives, exist_ok=True)
+        avant, nb = str(avant), 0
+        with closing(self._connexion()) as cnx:
+            jours = [j for (j,) in cnx.execute(
+                "SELECT DISTINCT substr(horodatage, 1, 10) FROM audit WHERE horodatage < ? ORDER BY 1", (avant,))]
+            for jour in jours:
+                try:
+                    fin = min((date.fromisoformat(jour) + timedelta(days=1)).isoformat(), avant)
+                except ValueError:
+                    fin = avant  # horodatage hors format : archivé avec le reste
+                cnx.execute("ATTACH DATABASE ? AS archive", (os.path.join(self.dossier_archives, f"audit_{jour[:7]}.db"),))
+                try:
+                    for requete in SCHEMA_ARCHIVE:
+                        cnx.execute(requete)
+                    with cnx:
+                        cnx.execute("INSERT OR IGNORE INTO archive.audit SELECT id, horodatage, utilisateur, action, cible "
+                                    "FROM main.audit WHERE horodatage >= ? AND horodatage < ?", (jour, fin))
+                        nb += cnx.execute("DELETE FROM main.audit WHERE horodatage >= ? AND horodatage < ?", (jour, fin)).rowcount
+                finally:
+                    cnx.execute("DETACH DATABASE archive")
+        return nb
@@ -0,0 +1,69 @@
+import threading
+import time
+import pandas as pd
+
+# --- MAGASIN DE DONNÉES PARTAGÉ ENTRE SESSIONS ---
+# Une seule copie du parc de transformateurs par processus (colonnes NumPy / Arrow).
+# Chaque session reçoit une vue superficielle : avec le Copy-on-Write de pandas (toujours actif
+# à partir de pandas 3, d'où pandas>=3 dans requirements.txt), les colonnes
+# sont partagées tant que la session ne les modifie pas, et une modification locale ne copie
+# que la colonne touchée, sans jamais altérer le magasin.
+# publier() remplace l'instantané (données + version) en une seule affectation :
+# une session voit soit l'ancienne version complète, soit la nouvelle, jamais un mélange.
+
+
+class MagasinFlotte:
+    def __init__(self, generateur=None, ttl_s=None):
+        self._generateur = generateur
+        self._ttl_s = ttl_s
+        self._verrou = threading.Lock()
+        self._verrou_rafraichissement = threading.Lock()
+        self._instantane = (0, pd.DataFrame(), 0.0)
+        if generateur is not None:
+            self.rafraichir()
+
+    @property
+    def version(self):
+        return self._instantane[0]
+
+    def publier(self, df):
+        # Nouvelles données compteurs : invalidation atomique de l'instantané courant
+        df = pd.DataFrame(df, copy=True)
+        with self._verrou:
+            self._instantane = (self._instantane[0] + 1, df, time.monotonic())
+            return self._instantane[0]
+
+    def rafraichir(self):
+        return self.publier(self._generateur())
+
+    def _perime(self):
+        return self._ttl_s is not None and self._generateur is not None and time.monotonic() - self._instantane[2] > self._ttl_s
+
+    def vue_versionnee(self):
+        # Vue sans copie des colonnes ; une seule session régénère quand le TTL est dépassé,
+        # les autres continuent de lire l'instantané précédent pendant ce temps
+        if self._perime() and self._verrou_rafraichissement.acquire(blocking=False):
+            try:
+                if self._perime():
+                    self.rafraichir()
+            finally:
+                self._verrou_rafraichissement.release()
+        version, df, _ = self._instantane
+        return version, df.copy(deep=False)
+
+    def vue(self):
+        return self.vue_versionnee()[1]
+
+
+# --- REGISTRE PAR PROCESSUS ---
+# Équivalent de st.cache_resource, mais nommé explicitement par application : plusieurs scripts
+# lancés dans le même processus (tests AppTest, multipage) ne partagent pas le même magasin.
+_magasins = {}
+_verrou_registre = threading.Lock()
+
+
+def magasin(nom, generateur, ttl_s=None):
+    with _verrou_registre:
+        if nom not in _magasins:
+            _magasins[nom] = MagasinFlotte(generateur, ttl_s)
+        return _magasins[nom]
@@ -0,0 +1,184 @@
+import io
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import nullcontext
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows : pas de getrusage
+    resource = None
+
+# --- MESURES DE PERFORMANCE (BANC D'ESSAI + CONSOLE ADMIN) ---
+# Taille du parc simulé : JIRAMA_NB_TRANSFOS remplace le nombre de transformateurs codé en dur
+# dans les générateurs des applications (load_data / generate_data / generer_donnees).
+# chrono(section) mesure les grandes étapes d'une exécution du script (données, diagnostic,
+# figure, tts, export) :
+#  - benchmarks/bench_apps.py relève les durées après chaque run (releve) ;
+#  - la console admin de V12 affiche p50/p95/p99 par section, pour tout le processus et par session.
+# Les durées sont gardées dans des tampons circulaires bornés (TAILLE_TAMPON par section, et
+# TAILLE_TAMPON_SESSION pour chacune des MAX_SESSIONS sessions les plus récentes).
+# JIRAMA_MESURES=0 (ou activer(False)) : chrono() rend un contexte vide partagé, sans horloge ni verrou.
+
+VARIABLE_TAILLE_PARC = "JIRAMA_NB_TRANSFOS"
+VARIABLE_MESURES = "JIRAMA_MESURES"
+TAILLE_TAMPON = 2048
+TAILLE_TAMPON_SESSION = 256
+MAX_SESSIONS = 64
+CENTILES = (50, 95, 99)
+
+actif = os.environ.get(VARIABLE_MESURES, "1") != "0"
+
+_releves = defaultdict(lambda: deque(maxlen=TAILLE_TAMPON))
+_global = defaultdict(lambda: deque(maxlen=TAILLE_TAMPON))
+_sessions = OrderedDict()
+_verrou = threading.Lock()
+_INACTIF = nullcontext()
+
+
+def taille_parc(defaut):
+    valeur = os.environ.get(VARIABLE_TAILLE_PARC)
+    return int(valeur) if valeur else defaut
+
+
+def activer(etat=True):
+    global actif
+    actif = bool(etat)
+
+
+def session_courante():
+    # ID de la session Streamlit du thread courant ; None hors d'un run de script (benchmarks,
+    # fichier d'export servi par le serveur au clic...) : la mesure n'est alors que globale.
+    # Streamlit n'est pas importé ici : le traitement nocturne et les benchmarks s'en passent
+    scriptrunner = sys.modules.get("streamlit.runtime.scriptrunner")
+    if scriptrunner is None:
+        return None
+    ctx = scriptrunner.get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+# --- 1. CHRONOMÉTRAGE ---
+class _Chrono:
+    __slots__ = ("section", "debut")
+
+    def __init__(self, section):
+        self.section = section
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        enregistrer(self.section, time.perf_counter() - self.debut)
+        return False
+
+
+def chrono(section):
+    return _Chrono(section) if actif else _INACTIF
+
+
+def enregistrer(section, duree, session=None):
+    session = session or session_courante()
+    with _verrou:
+        _releves[section].append(duree)
+        _global[section].append(duree)
+        if session is not None:
+            sections = _sessions.get(session)
+            if sections is None:
+                sections = _sessions[session] = defaultdict(lambda: deque(maxlen=TAILLE_TAMPON_SESSION))
+                while len(_sessions) > MAX_SESSIONS:
+                    _sessions.popitem(last=False)
+            else:
+                _sessions.move_to_end(session)
+            sections[section].append(duree)
+
+
+def releve(reinitialiser=True):
+    # {section: [durées en s]} depuis le dernier relevé
+    with _verrou:
+        resultat = {section: list(durees) for section, durees in _releves.items()}
+        if reinitialiser:
+            _releves.clear()
+    return resultat
+
+
+# --- 2. HISTOGRAMMES ET CENTILES ---
+def durees(section=None, session=None):
+    # {section: np.array des durées (s)} du processus, ou d'une seule session
+    with _verrou:
+        source = _global if session is None else _sessions.get(session, {})
+        return {s: np.array(d) for s, d in source.items() if section is None or s == section}
+
+
+def centiles(session=None):
+    # Une ligne par section : nombre de mesures, p50 / p95 / p99 et max en ms
+    lignes = []
+    for section, d in sorted(durees(session=session).items()):
+        if not len(d):
+            continue
+        p = np.percentile(d, CENTILES) * 1e3
+        lignes.append({"Section": section, "Mesures": len(d), **{f"p{c} (ms)": round(v, 2) for c, v in zip(CENTILES, p)},
+                       "max (ms)": round(d.max() * 1e3, 2)})
+    return lignes
+
+
+def histogramme(section, session=None, nb_classes=20):
+    # (bornes inférieures des classes en ms, effectifs)
+    d = durees(section, session).get(section, np.array([])) * 1e3
+    if not len(d):
+        return np.array([]), np.array([], dtype=int)
+    effectifs, bornes = np.histogram(d, bins=nb_classes)
+    return bornes[:-1], effectifs
+
+
+# --- 3. MÉMOIRE DU PROCESSUS ---
+def memoire():
+    # RSS courante (Linux : /proc) et pic depuis le démarrage, en Mo ; None si indisponible
+    courante = pic = None
+    try:
+        with open("/proc/self/statm") as f:
+            courante = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux : Ko
+    return {"rss_mo": courante, "pic_mo": pic}
+
+
+# --- 4. PROFILAGE D'UN RUN (À LA DEMANDE) ---
+def outils_profil():
+    outils = ["cProfile"]
+    try:
+        import pyinstrument  # noqa: F401  (facultatif)
+        outils.append("pyinstrument")
+    except ImportError:
+        pass
+    return outils
+
+
+def demarrer_profil(outil="cProfile"):
+    if outil == "pyinstrument":
+        from pyinstrument import Profiler
+        profil = Profiler()
+        profil.start()
+    else:
+        import cProfile
+        profil = cProfile.Profile()
+        profil.enable()
+    return outil, profil
+
+
+def terminer_profil(capture, nb_lignes=30):
+    # Rapport texte : arbre d'appels (pyinstrument) ou fonctions triées par temps cumulé (cProfile)
+    outil, profil = capture
+    if outil == "pyinstrument":
+        profil.stop()
+        return profil.output_text(unicode=True, color=False)
+    import pstats
+    profil.disable()
+    sortie = io.StringIO()
+    pstats.Stats(profil, stream=sortie).strip_dirs().sort_stats("cumulative").print_stats(nb_lignes)
+    return sortie.getvalue()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# --- MOTEUR DE DIAGNOSTIC VECTORISÉ (FR + EN EN UNE PASSE) ---
+# Chaque règle : (colonne, seuil, libellé FR, libellé EN). Une règle se déclenche si colonne > seuil.
+# Mode "cumul"   : toutes les règles déclenchées sont jointes par " | " (get_diagnosis, ai_recommandation).
+# Mode "premier" : seule la première règle déclenchée est retenue (bot_logic).
+
+SEPARATEUR = " | "
+
+# V10 / V12 : get_diagnosis
+REGLES_SUPERVISION = {
+    "mode": "cumul",
+    "regles": [
+        ("Perte_Vol_%", 25, "🚩 Fraude détectée", "🚩 Fraud detected"),
+        ("Charge_%", 100, "⚠️ Surcharge critique", "⚠️ Critical Overload"),
+    ],
+    "defaut": ("✅ Stable", "✅ Stable"),
+}
+
+# jiramaSmartGridapp.py : bot_logic
+REGLES_MISSIONS = {
+    "mode": "premier",
+    "regles": [
+        ("Perte/Vol (%)", 35, "🚨 Descente immédiate requise : Vol massif suspecté.", "🚨 Immediate raid required: Massive theft suspected."),
+        ("Charge (%)", 100, "⚠️ Délestage imminent : Basculer sur batterie.", "⚠️ Imminent blackout: Switch to battery."),
+    ],
+    "defaut": ("✅ Stable", "✅ Stable"),
+}
+
+# jiramaantifraudapp.py : ai_recommandation
+REGLES_BOT_IA = {
+    "mode": "cumul",
+    "regles": [
+        ("Perte_Fraude_Pct", 25, "🚩 Fraude suspectée élevée", "🚩 High Fraud Suspected"),
+        ("Charge_Pct", 95, "⚠️ Surcharge critique", "⚠️ Critical Overload"),
+        ("Temp_Huile", 85, "🔥 Surchauffe huile", "🔥 Oil Overheating"),
+    ],
+    "defaut": ("✅ État Nominal", "✅ Nominal State"),
+}
+
+
+def avec_seuil(regles, colonne, seuil):
+    # Copie d'un jeu de règles avec un seuil remplacé (ex: slider "Seuil Alerte Fraude")
+    return {**regles, "regles": [(c, seuil if c == colonne else s, fr, en) for c, s, fr, en in regles["regles"]]}
+
+
+def _masques(df, regles):
+    # NaN > seuil vaut False, comme la comparaison ligne à ligne d'origine
+    return [df[col].to_numpy() > seuil for col, seuil, _, _ in regles["regles"]]
+
+
+def _table_libelles(regles, idx_lang):
+    # Libellé associé à chaque code, calculé une seule fois par jeu de règles
+    libelles = [r[2 + idx_lang] for r in regles["regles"]]
+    defaut = regles["defaut"][idx_lang]
+    if regles["mode"] == "premier":
+        # code 0 = aucune règle, code i = i-ème règle déclenchée en premier
+        return np.array([defaut] + libelles, dtype=object)
+    # code binaire : bit i levé si la règle i est déclenchée
+    table = []
+    for code in range(1 << len(libelles)):
+        actifs = [lib for i, lib in enumerate(libelles) if code >> i & 1]
+        table.append(SEPARATEUR.join(actifs) if actifs else defaut)
+    return np.array(table, dtype=object)
+
+
+def diagnostiquer(df, regles):
+    # Retourne un DataFrame (même index que df) avec les colonnes "FR" et "EN"
+    masques = _masques(df, regles)
+    if regles["mode"] == "premier":
+        code = np.select(masques, np.arange(1, len(masques) + 1), default=0)
+    else:
+        code = np.zeros(len(df), dtype=np.int64)
+        for i, m in enumerate(masques):
+            code |= m.astype(np.int64) << i
+    return pd.DataFrame({lang: _table_libelles(regles, i)[code] for i, lang in enumerate(["FR", "EN"])}, index=df.index)
+
+
+def diagnostic_ligne(row, regles, lang):
+    # Même logique appliquée à une seule ligne (Series ou dict), sans passer par un DataFrame
+    idx_lang = 0 if lang == "FR" else 1
+    actifs = []
+    for col, seuil, fr, en in regles["regles"]:
+        if row[col] > seuil:
+            actifs.append(fr if idx_lang == 0 else en)
+            if regles["mode"] == "premier":
+                break
+    return SEPARATEUR.join(actifs) if actifs else regles["defaut"][idx_lang]
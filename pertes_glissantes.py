@@ -0,0 +1,144 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# --- TAUX DE PERTE SUR FENÊTRES GLISSANTES (1h / 24h / 30j) ---
+# Chaque fenêtre est un anneau de seaux (énergie sortie, énergie facturée) et une somme courante.
+# Un relevé va dans le seau de son horodatage (ts // durée du seau), pas dans celui du relevé précédent :
+# une pince qui publie chaque minute remplit le même seau de 15 min, un relevé en retard va dans son seau
+# s'il est encore dans la fenêtre (ignoré sinon), un relevé répété (même transformateur, même ts) est
+# ignoré. Quand un transformateur passe à un seau plus récent, les seaux sautés sont vidés ; ratios()
+# avance aussi les transformateurs muets jusqu'à l'horloge du flux (ts le plus récent reçu) : un compteur
+# silencieux voit ses fenêtres se vider, puis son taux passer à NaN. Coût O(1) par relevé.
+# 1h et 24h sont exactes au pas de 15 min ; 30j utilise des seaux journaliers (la fenêtre couvre
+# les 29 jours complets précédents + la journée en cours), ce qui ramène la mémoire à ~1 Ko par
+# transformateur au lieu de 2880 relevés.
+# Perte (%) = (1 - facturé / sorti) * 100 sur la fenêtre, comme le perte_pct des dashboards.
+
+PAS_MINUTES = 15
+INTERVALLES_PAR_JOUR = 24 * 60 // PAS_MINUTES
+# nom : (nombre de seaux, intervalles de 15 min par seau)
+FENETRES = {"1h": (60 // PAS_MINUTES, 1), "24h": (INTERVALLES_PAR_JOUR, 1), "30j": (30, INTERVALLES_PAR_JOUR)}
+
+
+class AgregateurPertes:
+    def __init__(self, fenetres=FENETRES, capacite=1024):
+        self.fenetres = dict(fenetres)
+        self._verrou = threading.Lock()
+        self._index = {}
+        self._ids = []
+        self._dernier_ts = np.full(capacite, -np.inf)
+        self._seaux = {nom: np.zeros((capacite, b, 2), dtype=np.float32) for nom, (b, _) in self.fenetres.items()}
+        self._sommes = {nom: np.zeros((capacite, 2)) for nom in self.fenetres}
+        # Seau absolu (ts // durée du seau) le plus récent de chaque transformateur, par fenêtre
+        self._dernier_seau = {nom: np.full(capacite, -1, dtype=np.int64) for nom in self.fenetres}
+        self.horloge = -np.inf
+
+    def _lignes(self, ids):
+        lignes = np.empty(len(ids), dtype=np.int64)
+        for i, id_transfo in enumerate(ids):
+            ligne = self._index.get(id_transfo)
+            if ligne is None:
+                ligne = self._index[id_transfo] = len(self._ids)
+                self._ids.append(id_transfo)
+            lignes[i] = ligne
+        if len(self._ids) > len(self._dernier_ts):
+            ajout = max(len(self._ids), 2 * len(self._dernier_ts)) - len(self._dernier_ts)
+            self._dernier_ts = np.concatenate([self._dernier_ts, np.full(ajout, -np.inf)])
+            self._seaux = {nom: np.concatenate([s, np.zeros((ajout,) + s.shape[1:], dtype=s.dtype)]) for nom, s in self._seaux.items()}
+            self._sommes = {nom: np.concatenate([s, np.zeros((ajout, 2))]) for nom, s in self._sommes.items()}
+            self._dernier_seau = {nom: np.concatenate([d, np.full(ajout, -1, dtype=np.int64)]) for nom, d in self._dernier_seau.items()}
+        return lignes
+
+    def ajouter(self, id_transfo, sortie_kwh, facture_kwh, horodatage=None):
+        self.ajouter_lot([id_transfo], [sortie_kwh], [facture_kwh], horodatage)
+
+    def ajouter_lot(self, ids, sortie_kwh, facture_kwh, horodatage=None):
+        # horodatage : secondes epoch, scalaire (tick de tout le parc) ou une valeur par relevé ; défaut : maintenant.
+        # Si un transformateur apparaît plusieurs fois, ses relevés sont appliqués dans l'ordre, tour par tour.
+        valeurs = np.column_stack([np.asarray(sortie_kwh, dtype=float), np.asarray(facture_kwh, dtype=float)])
+        ts = np.broadcast_to(np.asarray(time.time() if horodatage is None else horodatage, dtype=float), (len(valeurs),))
+        with self._verrou:
+            lignes = self._lignes(ids)
+            if len(np.unique(lignes)) == len(lignes):
+                self._pas(lignes, valeurs, ts)
+            else:
+                rang = pd.Series(lignes).groupby(lignes).cumcount().to_numpy()
+                for r in range(rang.max() + 1):
+                    self._pas(lignes[rang == r], valeurs[rang == r], ts[rang == r])
+            if len(ts):
+                self.horloge = max(self.horloge, ts.max())
+
+    def _avancer(self, nom, lignes, seau):
+        # Passe les lignes au seau absolu `seau` : vide les seaux sautés depuis leur dernier relevé
+        nb_seaux = self.fenetres[nom][0]
+        dernier = self._dernier_seau[nom]
+        avance = seau > dernier[lignes]
+        if not avance.any():
+            return
+        l, d, b = lignes[avance], dernier[lignes[avance]], seau[avance]
+        seaux, somme = self._seaux[nom], self._sommes[nom]
+        ecart = np.minimum(b - d, nb_seaux)
+        # Cas courant (relevé de l'intervalle suivant) : un seul seau recyclé, retiré de la somme ;
+        # resynchronisation exacte à chaque tour complet de l'anneau (pas de dérive des flottants)
+        un = ecart == 1
+        if un.any():
+            lu, s = l[un], b[un] % nb_seaux
+            somme[lu] -= seaux[lu, s]
+            seaux[lu, s] = 0
+            tour = lu[s == 0]
+            somme[tour] = seaux[tour].sum(axis=1, dtype=np.float64)
+        # Plusieurs seaux sautés (compteur muet, trou dans le flux) : vidés, somme recalculée ;
+        # rien à vider au premier relevé d'un transformateur (anneau encore vide)
+        plusieurs = ~un & (d >= 0)
+        if plusieurs.any():
+            lp, dp, ep = l[plusieurs], d[plusieurs], ecart[plusieurs]
+            k = np.arange(1, nb_seaux + 1)
+            sautes = k[None, :] <= ep[:, None]
+            seaux[np.broadcast_to(lp[:, None], sautes.shape)[sautes], ((dp[:, None] + k[None, :]) % nb_seaux)[sautes]] = 0
+            somme[lp] = seaux[lp].sum(axis=1, dtype=np.float64)
+        dernier[l] = b
+
+    def _pas(self, lignes, valeurs, ts):
+        nouveau = ts != self._dernier_ts[lignes]
+        lignes, valeurs, ts = lignes[nouveau], valeurs[nouveau], ts[nouveau]
+        for nom, (nb_seaux, par_seau) in self.fenetres.items():
+            seau = (ts // (PAS_MINUTES * 60 * par_seau)).astype(np.int64)
+            self._avancer(nom, lignes, seau)
+            # Relevé en retard : gardé s'il tombe encore dans la fenêtre
+            dans = seau > self._dernier_seau[nom][lignes] - nb_seaux
+            l = lignes[dans]
+            self._seaux[nom][l, seau[dans] % nb_seaux] += valeurs[dans]
+            self._sommes[nom][l] += valeurs[dans]
+        self._dernier_ts[lignes] = np.maximum(self._dernier_ts[lignes], ts)
+
+    def ratios(self, maintenant=None):
+        # DataFrame indexé par ID : Perte_1h_%, Perte_24h_%, Perte_30j_% (NaN si rien n'est sorti sur la fenêtre).
+        # maintenant : secondes epoch ; défaut : horloge du flux
+        with self._verrou:
+            n = len(self._ids)
+            ids = list(self._ids)
+            maintenant = self.horloge if maintenant is None else maintenant
+            if n and np.isfinite(maintenant):
+                lignes = np.arange(n)
+                for nom, (_, par_seau) in self.fenetres.items():
+                    self._avancer(nom, lignes, np.full(n, int(maintenant // (PAS_MINUTES * 60 * par_seau)), dtype=np.int64))
+            sommes = {nom: s[:n].copy() for nom, s in self._sommes.items()}
+        colonnes = {}
+        for nom, s in sommes.items():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                colonnes[f"Perte_{nom}_%"] = np.round(np.where(s[:, 0] > 0, (1 - s[:, 1] / s[:, 0]) * 100, np.nan), 1)
+        return pd.DataFrame(colonnes, index=pd.Index(ids, name="ID"))
+
+
+def appliquer_ratios(df, ratios, col_id, col_perte, fenetre="24h"):
+    # Ajoute les colonnes Perte_<fenêtre>_% au tableau du dashboard et remplace la perte instantanée
+    # par celle de `fenetre` quand elle est disponible : get_diagnosis / bot_logic s'appliquent alors
+    # au taux glissant plutôt qu'à un seul couple de relevés.
+    if ratios.empty:
+        return df
+    df = df.join(ratios, on=col_id)
+    glissant = df[f"Perte_{fenetre}_%"]
+    df[col_perte] = glissant.where(glissant.notna(), df[col_perte])
+    return df
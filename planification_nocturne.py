@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- PLANIFICATION NOCTURNE DES DESCENTES TECHNIQUES (TRAITEMENT PAR LOTS) ---
+# python planification_nocturne.py [--jour AAAA-MM-JJ] [--jours 7] [--processus N] [--historique DOSSIER] [--sortie DOSSIER]
+# Lit l'historique partitionné (historique_parc.py) et classe tout le parc pour la tournée du matin :
+#  1. agrégation  : une tâche par partition (région, jour) -> sommes sortie / facturé, charge max par transformateur ;
+#  2. classement  : une tâche par région -> perte, Manque à gagner (Ar) mensualisé, score de suspicion
+#                   du dernier jour face à la ligne de base du transformateur (ajustée sur les jours
+#                   précédents de la fenêtre) et aux pairs de la région, priorité, GPS et motif, rang régional ;
+#  3. publication : liste nationale classée + une liste par région (Arrow IPC), dans <sortie>/<jour>/.
+# Le rapport (rapport.json) donne pour chaque étape sa durée, son débit et le temps CPU cumulé des
+# tâches : CPU / durée ~ nombre de cœurs effectivement occupés. Une partition ou une région en échec
+# est listée dans rapport["echecs"] ; le plan est publié avec les régions restantes.
+# rapport.json est écrit avant le plan (tous deux par renommage atomique) : un plan visible a son rapport.
+# Les étapes 1 et 2 tournent dans un pool de processus ; seules les petites tables d'agrégats
+# (une ligne par transformateur) transitent entre processus. Les dashboards lisent le dernier plan
+# publié avec dernier_plan(), mappé en mémoire, sans rien recalculer : les modules du traitement
+# (historique, score, export) ne sont importés que par les fonctions du lot, pas par les dashboards.
+
+DOSSIER_MISSIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "missions")
+TARIF_AR_KWH = 600          # Tarif JIRAMA moyen, comme le "Manque à gagner" de jiramaSmartGridapp.py
+JOURS_PAR_MOIS = 30
+SEUIL_PERTE_HAUTE = 30      # Règles de priorité de jiramaSmartGridapp.py / antifraudeapp.py
+SEUIL_CHARGE_HAUTE = 100
+NOM_PLAN = "missions_nationales.arrow"
+NOM_RAPPORT = "rapport.json"
+
+
+def dossier_missions(dossier=None):
+    return dossier or os.environ.get("JIRAMA_MISSIONS", DOSSIER_MISSIONS)
+
+
+# --- 1. AGRÉGATION PAR PARTITION (PROCESSUS DU POOL) ---
+def agreger_partition(dossier_historique, region, jour):
+    from historique_parc import HistoriqueParc
+    cpu, t0 = time.process_time(), time.perf_counter()
+    table = HistoriqueParc(dossier_historique).table([region], jour, jour, colonnes=["ID", "Sortie_kWh", "Facture_kWh", "Charge_%"])
+    t1 = time.perf_counter()
+    agregats = table.group_by("ID").aggregate([("Sortie_kWh", "sum"), ("Facture_kWh", "sum"), ("Charge_%", "max")])
+    t2 = time.perf_counter()
+    return region, agregats, {"releves": table.num_rows, "lecture_s": t1 - t0, "agregation_s": t2 - t1,
+                              "cpu_s": time.process_time() - cpu}
+
+
+# --- 2. CLASSEMENT PAR RÉGION (PROCESSUS DU POOL) ---
+def _perte(sortie, facture):
+    # Sortie nulle (compteur en panne, départ coupé) : perte non mesurable (NaN)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(sortie > 0, (1 - facture / sortie) * 100, np.nan)
+
+
+def _score_individuel(ids, partiels, nb_jours):
+    # Ligne de base par transformateur ajustée sur les pertes journalières des jours précédents
+    # (par jour de semaine si la fenêtre couvre plus d'une semaine, base plus réactive sur une
+    # fenêtre courte), puis perte du dernier jour à scorer contre elle : (scoreur, perte, saison)
+    from score_anomalie import ScoreurAnomalies
+    nb_saisons = 7 if nb_jours > 7 else 1
+    scoreur = ScoreurAnomalies(len(ids), nb_saisons=nb_saisons, alpha=max(0.05, 1 / nb_jours))
+    perte_jour = np.full(len(ids), np.nan)
+    for k, (jour, table) in enumerate(sorted(partiels, key=lambda p: p[0])):
+        lignes = ids.get_indexer(table["ID"].to_numpy(zero_copy_only=False))
+        perte = _perte(table["Sortie_kWh_sum"].to_numpy(), table["Facture_kWh_sum"].to_numpy())
+        if k < len(partiels) - 1:
+            scoreur.ajuster(lignes, jour.toordinal() % nb_saisons, perte)
+        else:
+            perte_jour[lignes] = perte
+    return scoreur, perte_jour, jour.toordinal() % nb_saisons
+
+
+def classer_region(region, partiels, nb_jours, dossier_sortie):
+    # partiels : [(jour, agrégats du jour par transformateur)]
+    from score_anomalie import scorer_parc, SEUIL_SCORE_HAUTE
+    from export_missions import enrichir
+    cpu, t0 = time.process_time(), time.perf_counter()
+    agregats = pa.concat_tables([t for _, t in partiels]).group_by("ID").aggregate(
+        [("Sortie_kWh_sum", "sum"), ("Facture_kWh_sum", "sum"), ("Charge_%_max", "max")]).to_pandas()
+    sortie = agregats["Sortie_kWh_sum_sum"].to_numpy(float)
+    facture = agregats["Facture_kWh_sum_sum"].to_numpy(float)
+    perte = _perte(sortie, facture)
+    df = pd.DataFrame({
+        "ID": agregats["ID"], "Région": region,
+        "Charge_max_%": agregats["Charge_%_max_max"].to_numpy(float).round(1),
+        "Perte_%": perte.round(1),
+        "Manque à gagner (Ar)": ((sortie - facture) * TARIF_AR_KWH * JOURS_PAR_MOIS / nb_jours).round(0),
+    })
+    # Score du dernier jour (base individuelle + pairs) ; sans relevé ce jour-là, pairs sur la fenêtre ;
+    # perte non mesurable sur toute la fenêtre : non scorée
+    scoreur, perte_jour, saison = _score_individuel(pd.Index(agregats["ID"]), partiels, nb_jours)
+    jour_mesure = ~np.isnan(perte_jour)
+    fenetre = df["Perte_%"].notna().to_numpy() & ~jour_mesure
+    dernier = df[jour_mesure].assign(_ligne=np.flatnonzero(jour_mesure), _perte_jour=perte_jour[jour_mesure])
+    df["Score_Suspicion"] = 0.0
+    df.loc[jour_mesure, "Score_Suspicion"] = scorer_parc(dernier, "Région", "_perte_jour", scoreur, "_ligne", saison)["Score_Suspicion"]
+    df.loc[fenetre, "Score_Suspicion"] = scorer_parc(df[fenetre], "Région", "Perte_%")["Score_Suspicion"]
+    haute = (df["Perte_%"] > SEUIL_PERTE_HAUTE) | (df["Charge_max_%"] > SEUIL_CHARGE_HAUTE) | (df["Score_Suspicion"] >= SEUIL_SCORE_HAUTE)
+    df["Priorité"] = haute.map({True: "HAUTE", False: "NORMALE"})
+    df = enrichir(df, "ID", "Région", "Perte_%", "Charge_max_%", SEUIL_PERTE_HAUTE)
+    # HAUTE d'abord, puis par manque à gagner décroissant
+    df = df.assign(_haute=haute).sort_values(["_haute", "Manque à gagner (Ar)"], ascending=False, ignore_index=True).drop(columns="_haute")
+    df.insert(0, "Rang_Régional", np.arange(1, len(df) + 1))
+    t1 = time.perf_counter()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    _ecrire(table, os.path.join(dossier_sortie, f"missions_{quote(region, safe='')}.arrow"))
+    t2 = time.perf_counter()
+    return table, {"transfos": len(df), "classement_s": t1 - t0, "ecriture_s": t2 - t1, "cpu_s": time.process_time() - cpu}
+
+
+def _ecrire(table, chemin, publier=True):
+    # Écrit dans <chemin>.tmp puis renomme ; publier=False laisse le renommage à l'appelant
+    temporaire = f"{chemin}.tmp"
+    with pa.OSFile(temporaire, "wb") as f, pa.ipc.new_file(f, table.schema) as ecrivain:
+        ecrivain.write_table(table)
+    if publier:
+        os.replace(temporaire, chemin)
+    return temporaire
+
+
+def _ecrire_rapport(rapport, chemin):
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=1)
+    os.replace(temporaire, chemin)
+
+
+# --- 3. ORCHESTRATION ---
+def planifier(jour=None, nb_jours=7, processus=None, dossier_historique=None, dossier_sortie=None, regions=None):
+    # Retourne le rapport d'exécution (durées et débits par étape) ; le plan est écrit dans <sortie>/<jour>/
+    jour = jour or date.today() - timedelta(days=1)
+    from historique_parc import HistoriqueParc
+    jours = [jour - timedelta(days=k) for k in range(nb_jours)][::-1]
+    historique = HistoriqueParc(dossier_historique)
+    regions = regions or historique.regions()
+    sortie = os.path.join(dossier_missions(dossier_sortie), jour.isoformat())
+    os.makedirs(sortie, exist_ok=True)
+    processus = processus or os.cpu_count()
+    rapport = {"jour": jour.isoformat(), "jours": nb_jours, "processus": processus, "regions": len(regions), "etapes": {}, "echecs": []}
+    debut = time.perf_counter()
+    # Micro-lots de l'ingestion MQTT (un par minute et par partition) regroupés avant la lecture
+    partitions = historique.compacter()
+    rapport["etapes"]["compactage"] = {"partitions": partitions, "duree_s": round(time.perf_counter() - debut, 3)}
+    # Un seul thread Arrow par processus : le parallélisme vient du pool, sans sursouscription des cœurs
+    with ProcessPoolExecutor(max_workers=processus, initializer=pa.set_cpu_count, initargs=(1,)) as pool:
+        t0 = time.perf_counter()
+        partiels, mesures = {r: [] for r in regions}, []
+        taches = {(r, j): pool.submit(agreger_partition, historique.dossier, r, j) for r in regions for j in jours}
+        for (r, j), tache in taches.items():
+            try:
+                region, agregats, m = tache.result()
+            except Exception as e:
+                rapport["echecs"].append({"etape": "agregation", "region": r, "jour": j.isoformat(), "erreur": repr(e)})
+                continue
+            if agregats.num_rows:
+                partiels[region].append((j, agregats))
+            mesures.append(m)
+        t1 = time.perf_counter()
+        releves = sum(m["releves"] for m in mesures)
+        rapport["etapes"]["agregation"] = {
+            "taches": len(taches), "releves": releves, "duree_s": round(t1 - t0, 3),
+            "releves_par_s": round(releves / (t1 - t0)),
+            "lecture_s": round(sum(m["lecture_s"] for m in mesures), 3),
+            "cpu_s": round(sum(m["cpu_s"] for m in mesures), 3),
+        }
+        taches = {r: pool.submit(classer_region, r, p, nb_jours, sortie) for r, p in partiels.items() if p}
+        resultats = []
+        for r, tache in taches.items():
+            try:
+                resultats.append(tache.result())
+            except Exception as e:
+                rapport["echecs"].append({"etape": "classement", "region": r, "erreur": repr(e)})
+        t2 = time.perf_counter()
+    transfos = sum(m["transfos"] for _, m in resultats)
+    rapport["etapes"]["classement"] = {
+        "taches": len(taches), "transfos": transfos, "duree_s": round(t2 - t1, 3),
+        "transfos_par_s": round(transfos / (t2 - t1)) if transfos else 0,
+        "ecriture_s": round(sum(m["ecriture_s"] for _, m in resultats), 3),
+        "cpu_s": round(sum(m["cpu_s"] for _, m in resultats), 3),
+    }
+    # Liste nationale : même ordre de priorité, toutes régions confondues
+    temporaire = None
+    if resultats:
+        plan = pa.concat_tables([t for t, _ in resultats], promote_options="default").to_pandas()
+        plan = plan.assign(_haute=plan["Priorité"] == "HAUTE").sort_values(
+            ["_haute", "Manque à gagner (Ar)"], ascending=False, ignore_index=True).drop(columns="_haute")
+        plan.insert(0, "Rang_National", np.arange(1, len(plan) + 1))
+        temporaire = _ecrire(pa.Table.from_pandas(plan, preserve_index=False), os.path.join(sortie, NOM_PLAN), publier=False)
+    t3 = time.perf_counter()
+    rapport["etapes"]["publication"] = {"transfos": transfos, "duree_s": round(t3 - t2, 3)}
+    rapport["duree_totale_s"] = round(t3 - debut, 3)
+    rapport["genere_le"] = datetime.now().isoformat(timespec="seconds")
+    _ecrire_rapport(rapport, os.path.join(sortie, NOM_RAPPORT))
+    if temporaire is not None:
+        os.replace(temporaire, os.path.join(sortie, NOM_PLAN))
+    return rapport
+
+
+# --- 4. LECTURE PAR LES DASHBOARDS ---
+_memo = {}
+_verrou = threading.Lock()
+
+
+def dernier_plan(dossier=None):
+    # (rapport, DataFrame du plan national) du dernier jour publié, ou (None, None) ; relu seulement s'il a changé.
+    # Un jour n'est retenu qu'avec ses deux fichiers (plan d'une version antérieure sans rapport, etc.)
+    racine = dossier_missions(dossier)
+    jours = sorted(j for j in os.listdir(racine)
+                   if all(os.path.isfile(os.path.join(racine, j, nom)) for nom in (NOM_PLAN, NOM_RAPPORT))) if os.path.isdir(racine) else []
+    if not jours:
+        return None, None
+    chemin = os.path.join(racine, jours[-1], NOM_PLAN)
+    cle = (chemin, os.path.getmtime(chemin))
+    with _verrou:
+        if cle not in _memo:
+            with pa.memory_map(chemin) as source:
+                plan = pa.ipc.open_file(source).read_all().to_pandas()
+            with open(os.path.join(racine, jours[-1], NOM_RAPPORT), encoding="utf-8") as f:
+                _memo.clear()
+                _memo[cle] = (json.load(f), plan)
+        return _memo[cle]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planification nocturne des descentes techniques JIRAMA")
+    parser.add_argument("--jour", type=date.fromisoformat, default=None, help="Dernier jour inclus (défaut : hier)")
+    parser.add_argument("--jours", type=int, default=7, help="Nombre de jours d'historique agrégés")
+    parser.add_argument("--processus", type=int, default=None, help="Taille du pool (défaut : nombre de cœurs)")
+    parser.add_argument("--historique", default=None, help="Dossier de l'historique (défaut : JIRAMA_HISTORIQUE ou ./historique)")
+    parser.add_argument("--sortie", default=None, help="Dossier des plans (défaut : JIRAMA_MISSIONS ou ./missions)")
+    args = parser.parse_args()
+    rapport = planifier(args.jour, args.jours, args.processus, args.historique, args.sortie)
+    print(f"Plan du {rapport['jour']} : {rapport['regions']} régions, {rapport['processus']} processus, {rapport['duree_totale_s']}s")
+    for nom, etape in rapport["etapes"].items():
+        print(f"  {nom:<12} " + ", ".join(f"{k}={v:,}" if isinstance(v, int) else f"{k}={v}" for k, v in etape.items()))
+    for echec in rapport["echecs"]:
+        print("  ÉCHEC " + ", ".join(f"{k}={v}" for k, v in echec.items()))
+
+
+if __name__ == "__main__":
+    main()
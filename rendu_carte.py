@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# --- RENDU SERVEUR DE LA CARTOGRAPHIE (AGRÉGATION + MÉMOÏSATION) ---
+# Jusqu'à `budget` points, la figure est identique à l'ancien px.scatter.
+# Au-delà, seuls les transformateurs les plus critiques (perte la plus élevée) restent des points
+# individuels ; les autres sont regroupés par (Région, couleur, tranche de perte) en un point par
+# tranche, avec le nombre de transformateurs en survol. La figure envoyée au navigateur reste
+# bornée quel que soit le parc.
+# Les figures sont mémorisées par (vue, version des données, filtres, budget) : une relance du
+# script sans changement de données ni de filtres ne reconstruit pas la figure.
+
+BUDGET_POINTS = 5_000
+PART_POINTS_INDIVIDUELS = 0.5
+MAX_TRANCHES = 200
+TAILLE_MEMO = 64
+
+_memo = OrderedDict()
+_verrou = threading.Lock()
+statistiques = {"succes": 0, "echecs": 0}
+
+
+def agreger_points(df, x, y, size, color, hover_name, budget=BUDGET_POINTS):
+    # Retourne (points à tracer, agrégé ?)
+    if len(df) <= budget:
+        return df, False
+    couleur_continue = color is not None and pd.api.types.is_numeric_dtype(df[color])
+    nb_individuels = int(budget * PART_POINTS_INDIVIDUELS)
+    critiques = df.nlargest(nb_individuels, y)
+    reste = df.drop(critiques.index)
+
+    cles = [x] + ([color] if color is not None and not couleur_continue else [])
+    nb_groupes = max(1, reste.groupby(cles, observed=True).ngroups)
+    nb_tranches = int(np.clip((budget - nb_individuels) // nb_groupes, 1, MAX_TRANCHES))
+    y_min, y_max = reste[y].min(), reste[y].max()
+    largeur = (y_max - y_min) / nb_tranches or 1.0
+    tranche = np.minimum(((reste[y] - y_min) / largeur).astype(int), nb_tranches - 1).rename("_tranche")
+
+    agregats = {y: (y, "mean"), "Nb transformateurs": (y, "size")}
+    if size is not None:
+        agregats[size] = (size, "mean")
+    if couleur_continue:
+        agregats[color] = (color, "mean")
+    groupes = reste.groupby(cles + [tranche], observed=True).agg(**agregats).reset_index().drop(columns="_tranche")
+    groupes[hover_name] = groupes["Nb transformateurs"].map(lambda n: f"{n} transformateurs")
+    critiques = critiques.assign(**{"Nb transformateurs": 1})
+    colonnes = list(dict.fromkeys([c for c in [x, y, size, color, hover_name] if c is not None] + ["Nb transformateurs"]))
+    return pd.concat([critiques[colonnes], groupes[colonnes]], ignore_index=True), True
+
+
+def figure_carte(df, cle, x, y, size=None, color=None, hover_name=None, budget=BUDGET_POINTS, **options):
+    # `cle` = (vue, version des données, filtres...) : doit changer dès que `df` change
+    cle = (cle, x, y, size, color, hover_name, budget, repr(sorted(options.items())))
+    with _verrou:
+        fig = _memo.get(cle)
+        if fig is not None:
+            _memo.move_to_end(cle)
+            statistiques["succes"] += 1
+            return fig
+    points, agrege = agreger_points(df, x, y, size, color, hover_name, budget)
+    hover_data = {"Nb transformateurs": True} if agrege else None
+    import plotly.express as px  # chargé à la première figure : hors du démarrage à froid
+    fig = px.scatter(points, x=x, y=y, size=size, color=color, hover_name=hover_name, hover_data=hover_data, **options)
+    if agrege:
+        fig.add_annotation(text=f"{len(df):,} transformateurs : {len(points):,} points affichés (agrégés par tranche de perte)",
+                           xref="paper", yref="paper", x=0, y=1.08, showarrow=False, font={"size": 11})
+    with _verrou:
+        statistiques["echecs"] += 1
+        _memo[cle] = fig
+        while len(_memo) > TAILLE_MEMO:
+            _memo.popitem(last=False)
+    return fig
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# --- SCORE DE SUSPICION STATISTIQUE (AU-DELÀ DES SEUILS FIXES) ---
+# Deux écarts robustes, combinés en un score 0-100 qui alimente la colonne "Priorité" :
+#  1. z individuel : perte du jour comparée à la ligne de base du transformateur pour le même jour
+#     de la semaine (saisonnalité hebdomadaire). Ligne de base et dispersion sont mises à jour de
+#     façon incrémentale avec des résidus écrêtés (Huber) : un vol massif ne déplace pas la base.
+#  2. z pairs : perte comparée aux transformateurs de la même Région (médiane / MAD du jour).
+# Tout est vectorisé sur le parc ; l'historique est parcouru jour par jour.
+# Perte non mesurable (NaN, ex. sortie nulle sur la fenêtre) : score 0, base individuelle inchangée.
+
+MAD_NORMAL = 1.4826          # MAD -> écart-type (loi normale)
+ECART_ABS_NORMAL = 1.2533    # écart absolu moyen -> écart-type (loi normale)
+ECHELLE_MIN_INDIVIDUELLE = 0.5
+ECHELLE_MIN_PAIRS = 2.0      # points de %, évite des z énormes quand une région est très homogène
+SEUIL_SCORE_HAUTE = 60.0     # score à partir duquel la mission passe en Priorité HAUTE
+
+
+class ScoreurAnomalies:
+    def __init__(self, nb_transfos, nb_saisons=7, alpha=0.05, c_huber=2.0, poids_individuel=0.6):
+        self.nb_saisons = nb_saisons
+        self.alpha = alpha
+        self.c_huber = c_huber
+        self.poids_individuel = poids_individuel
+        self.niveau = np.full((nb_transfos, nb_saisons), np.nan)
+        self.echelle = np.full((nb_transfos, nb_saisons), 2.0)
+        self.nb_obs = np.zeros((nb_transfos, nb_saisons), dtype=np.int32)
+
+    # --- 1. LIGNE DE BASE INDIVIDUELLE (INCRÉMENTALE) ---
+    def z_individuel(self, lignes, saison, perte):
+        niveau = self.niveau[lignes, saison]
+        echelle = np.maximum(self.echelle[lignes, saison], ECHELLE_MIN_INDIVIDUELLE)
+        return (perte - niveau) / (ECART_ABS_NORMAL * echelle)
+
+    def ajuster(self, lignes, saison, perte):
+        # Un relevé par (transformateur, saison) par appel ; le premier relevé initialise la base
+        perte = np.asarray(perte, dtype=float)
+        mesure = np.isfinite(perte)
+        lignes, saison, perte = np.asarray(lignes)[mesure], np.broadcast_to(saison, mesure.shape)[mesure], perte[mesure]
+        niveau = self.niveau[lignes, saison]
+        echelle = self.echelle[lignes, saison]
+        nouveau = np.isnan(niveau)
+        residu = np.where(nouveau, 0.0, perte - niveau)
+        limite = self.c_huber * ECART_ABS_NORMAL * np.maximum(echelle, ECHELLE_MIN_INDIVIDUELLE)
+        residu = np.clip(residu, -limite, limite)
+        self.niveau[lignes, saison] = np.where(nouveau, perte, niveau + self.alpha * residu)
+        self.echelle[lignes, saison] = np.where(nouveau, echelle, (1 - self.alpha) * echelle + self.alpha * np.abs(residu))
+        self.nb_obs[lignes, saison] += 1
+
+    # --- 2. COMPARAISON AUX PAIRS DE LA RÉGION ---
+    @staticmethod
+    def z_pairs(region, perte):
+        groupes = pd.Series(perte).groupby(np.asarray(region))
+        mediane = groupes.transform("median").to_numpy()
+        mad = pd.Series(np.abs(perte - mediane)).groupby(np.asarray(region)).transform("median").to_numpy()
+        return (perte - mediane) / (MAD_NORMAL * np.maximum(mad, ECHELLE_MIN_PAIRS))
+
+    # --- 3. SCORE COMBINÉ ---
+    def combiner(self, z_ind, z_pairs):
+        # Seuls les écarts à la hausse (plus de pertes que prévu) sont suspects. Moyenne quadratique
+        # pondérée : un écart fort sur un seul des deux axes n'est pas dilué par l'autre.
+        z_ind = np.maximum(z_ind, 0)
+        z_pairs = np.maximum(z_pairs, 0)
+        combine = np.where(np.isnan(z_ind), z_pairs, np.sqrt(self.poids_individuel * z_ind ** 2 + (1 - self.poids_individuel) * z_pairs ** 2))
+        return np.nan_to_num(np.round(100 * (1 - np.exp(-combine / 3)), 1), nan=0.0)
+
+    def scorer_puis_ajuster(self, lignes, saison, region, perte):
+        # Score du jour contre l'historique passé, puis intégration du jour dans la base
+        perte = np.asarray(perte, dtype=float)
+        score = self.combiner(self.z_individuel(lignes, saison, perte), self.z_pairs(region, perte))
+        self.ajuster(lignes, saison, perte)
+        return score
+
+    def scorer_historique(self, lignes, jour, region, perte):
+        # Historique long (transformateur-jours) : traité jour par jour, vectorisé sur le parc
+        lignes, jour, region, perte = map(np.asarray, (lignes, jour, region, perte))
+        ordre = np.argsort(jour, kind="stable")
+        bornes = np.flatnonzero(np.diff(jour[ordre])) + 1
+        score = np.empty(len(perte))
+        for idx in np.split(ordre, bornes):
+            score[idx] = self.scorer_puis_ajuster(lignes[idx], jour[idx] % self.nb_saisons, region[idx], perte[idx])
+        return score
+
+
+def scorer_parc(df, col_region, col_perte, scoreur=None, col_ligne=None, saison=None):
+    # Score d'un instantané de dashboard : pairs de la région seulement, plus la ligne de base
+    # individuelle si un scoreur déjà ajusté est fourni. Retourne Score_Suspicion et Rang_Suspicion.
+    perte = df[col_perte].to_numpy(dtype=float)
+    z_pairs = ScoreurAnomalies.z_pairs(df[col_region].to_numpy(), perte)
+    if scoreur is not None:
+        z_ind = scoreur.z_individuel(df[col_ligne].to_numpy(), saison, perte)
+        score = scoreur.combiner(z_ind, z_pairs)
+    else:
+        score = ScoreurAnomalies(0).combiner(np.full(len(df), np.nan), z_pairs)
+    score = pd.Series(score, index=df.index)
+    return pd.DataFrame({
+        "Score_Suspicion": score,
+        "Rang_Suspicion": score.rank(ascending=False, method="min").astype(int),
+    })
@@ -0,0 +1,170 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from pertes_glissantes import PAS_MINUTES, INTERVALLES_PAR_JOUR
+
+# --- SIMULATEUR DU PARC DE TRANSFORMATEURS (REPRODUCTIBLE, VECTORISÉ) ---
+# Remplace les boucles random.* ligne par ligne des applications. Tout est tiré d'un générateur
+# NumPy initialisé par (graine, bloc de transformateurs, jour) : le même parc est regénéré
+# à l'identique d'un processus à l'autre, quelle que soit la façon dont on découpe le travail.
+#  - instantane() : un relevé par transformateur (tableaux de bord) ;
+#  - ecrire_simulation() : N transformateurs x T intervalles de 15 min, écrits colonne par colonne
+#    dans des fichiers .npy mappés en mémoire (forme (T, N) : un intervalle = une ligne contiguë),
+#    relus sans copie par lire_simulation().
+# Scénarios du protocole de test pilote (protocole.txt), injectés sur une fraction du parc :
+#  A. Référence : énergie facturée = énergie sortie (0% de perte), dès le premier intervalle ;
+#  B. Fraude    : écart de 35% (branchement clandestin) à partir de debut_injection ;
+#  C. Surcharge : charge entre 101% et 115% à partir de debut_injection.
+
+VARIABLE_GRAINE = "JIRAMA_GRAINE"
+GRAINE_DEFAUT = 2024
+
+REGIONS = ["Analamanga", "Atsinanana", "Diana", "Boeny", "Sava"]
+BLOC_TRANSFOS = 16_384
+PAS_HEURES = PAS_MINUTES / 60
+
+# Code stocké par transformateur : 0 = aucun scénario
+SCENARIOS = {
+    "A": "Référence (0% fraude)",
+    "B": "Injection de fraude (35%)",
+    "C": "Surcharge (> 100%)",
+}
+CODES_SCENARIOS = {nom: i + 1 for i, nom in enumerate(SCENARIOS)}
+ECART_FRAUDE_B = 0.35
+SURCHARGE_C = (101, 115)
+
+# Profil de charge journalier (pointe = 1) : creux de nuit, plateau de journée, pointe du soir
+_heures = np.arange(INTERVALLES_PAR_JOUR) * PAS_HEURES
+PROFIL_JOURNALIER = (0.45 + 0.25 * np.exp(-((_heures - 12) / 4) ** 2) + 0.55 * np.exp(-((_heures - 19.5) / 1.8) ** 2))
+PROFIL_JOURNALIER = (PROFIL_JOURNALIER / PROFIL_JOURNALIER.max()).astype(np.float32)
+
+# Bruit relatif d'un intervalle à l'autre, et modèle thermique de l'huile (°C) en fonction de la charge
+BRUIT_CHARGE = 0.04
+BRUIT_FACTURATION = 0.02
+TEMP_AMBIANTE = 35.0
+TEMP_PAR_POINT_CHARGE = 0.45
+BRUIT_TEMP = 2.0
+
+COLONNES_SERIES = ["sortie_kwh", "facture_kwh", "charge_pct", "temp_huile"]
+
+
+def graine_simulation(defaut=GRAINE_DEFAUT):
+    valeur = os.environ.get(VARIABLE_GRAINE)
+    return int(valeur) if valeur else defaut
+
+
+def ids_transfos(n, prefixe="TR-MDG-", premier=0):
+    return np.char.add(prefixe, np.arange(premier, premier + n).astype(str))
+
+
+def _blocs(n):
+    return [(b, debut, min(debut + BLOC_TRANSFOS, n)) for b, debut in enumerate(range(0, n, BLOC_TRANSFOS))]
+
+
+def _caracteristiques(graine, bloc, m, regions, sortie_kw, taux_facture, charge, temp_huile, injections):
+    # Paramètres fixes d'un bloc de transformateurs ; tous les tirages sont faits, scénario ou non,
+    # pour que la suite aléatoire ne dépende pas des injections demandées
+    rng = np.random.default_rng([graine, bloc, 0])
+    c = {
+        "region": rng.integers(0, len(regions), m).astype(np.uint8),
+        "sortie_kw": rng.integers(sortie_kw[0], sortie_kw[1] + 1, m),
+        "taux_facture": rng.uniform(taux_facture[0], taux_facture[1], m),
+        "charge_pct": rng.integers(charge[0], charge[1] + 1, m),
+        "temp_huile": rng.integers(temp_huile[0], temp_huile[1] + 1, m),
+    }
+    surcharge = rng.integers(SURCHARGE_C[0], SURCHARGE_C[1] + 1, m)
+    tirage = rng.random(m)
+    # Scénarios attribués par tranches cumulées de la fraction demandée (ex: {"B": 0.05, "C": 0.02})
+    scenario = np.zeros(m, dtype=np.uint8)
+    borne = 0.0
+    for nom, fraction in (injections or {}).items():
+        scenario[(tirage >= borne) & (tirage < borne + fraction)] = CODES_SCENARIOS[nom]
+        borne += fraction
+    c["scenario"] = scenario
+    c["surcharge_pct"] = surcharge
+    return c
+
+
+def instantane(n, graine=None, regions=REGIONS, sortie_kw=(1000, 2500), taux_facture=(0.40, 0.98),
+               charge=(40, 115), temp_huile=(40, 95), injections=None):
+    # Un relevé par transformateur : DataFrame (Région, Sortie_kW, Facture_kW, Perte_%, Charge_%, Temp_Huile, Scénario)
+    graine = graine_simulation() if graine is None else graine
+    parties = [_caracteristiques(graine, b, fin - debut, regions, sortie_kw, taux_facture, charge, temp_huile, injections)
+               for b, debut, fin in _blocs(n)]
+    c = {k: np.concatenate([p[k] for p in parties]) if parties else np.array([]) for k in
+         ["region", "sortie_kw", "taux_facture", "charge_pct", "temp_huile", "scenario", "surcharge_pct"]}
+    taux = np.where(c["scenario"] == CODES_SCENARIOS["A"], 1.0,
+                    np.where(c["scenario"] == CODES_SCENARIOS["B"], 1 - ECART_FRAUDE_B, c["taux_facture"]))
+    charge_pct = np.where(c["scenario"] == CODES_SCENARIOS["C"], c["surcharge_pct"], c["charge_pct"])
+    libelles = np.array([""] + list(SCENARIOS), dtype=object)
+    return pd.DataFrame({
+        "Région": np.asarray(regions, dtype=object)[c["region"].astype(np.intp)],
+        "Sortie_kW": c["sortie_kw"],
+        "Facture_kW": c["sortie_kw"] * taux,
+        "Perte_%": (1 - taux) * 100,
+        "Charge_%": charge_pct.astype(np.int64),
+        "Temp_Huile": c["temp_huile"],
+        "Scénario": libelles[c["scenario"]],
+    })
+
+
+def _series_bloc(graine, bloc, jour, c, t0, t1, debut_injection):
+    # Relevés des intervalles [t0, t1) d'une même journée pour un bloc : tableaux (t1 - t0, m) en float32
+    rng = np.random.default_rng([graine, bloc, jour + 1])
+    k, m = t1 - t0, len(c["region"])
+    bruit = rng.standard_normal((3, k, m), dtype=np.float32)
+    profil = PROFIL_JOURNALIER[t0 % INTERVALLES_PAR_JOUR:(t1 - 1) % INTERVALLES_PAR_JOUR + 1, None]
+    variation = profil * (1 + BRUIT_CHARGE * bruit[0])
+    charge = c["charge_pct"].astype(np.float32) * variation
+    sortie = c["sortie_kw"].astype(np.float32) * variation * np.float32(PAS_HEURES)
+    taux = np.clip(c["taux_facture"].astype(np.float32) * (1 + BRUIT_FACTURATION * bruit[1]), 0, 1)
+    injecte = (np.arange(t0, t1) >= debut_injection)[:, None]
+    scenario = c["scenario"][None, :]
+    taux = np.where(scenario == CODES_SCENARIOS["A"], np.float32(1), taux)
+    taux = np.where(injecte & (scenario == CODES_SCENARIOS["B"]), np.float32(1 - ECART_FRAUDE_B), taux)
+    charge = np.where(injecte & (scenario == CODES_SCENARIOS["C"]),
+                      np.maximum(charge, c["surcharge_pct"].astype(np.float32)), charge)
+    temp = TEMP_AMBIANTE + TEMP_PAR_POINT_CHARGE * charge + BRUIT_TEMP * bruit[2]
+    return {"sortie_kwh": sortie, "facture_kwh": sortie * taux, "charge_pct": charge, "temp_huile": temp}
+
+
+def ecrire_simulation(dossier, nb_transfos, nb_intervalles, graine=None, regions=REGIONS, sortie_kw=(1000, 2500),
+                      taux_facture=(0.40, 0.98), charge=(40, 115), injections=None, debut_injection=0,
+                      prefixe_id="TR-MDG-", premier_id=200):
+    # Écrit la simulation dans `dossier` (une colonne .npy par grandeur + meta.json) et retourne les métadonnées.
+    # Travail par bloc de BLOC_TRANSFOS transformateurs x 1 journée : la mémoire reste bornée quel que soit N x T.
+    graine = graine_simulation() if graine is None else graine
+    os.makedirs(dossier, exist_ok=True)
+    series = {col: np.lib.format.open_memmap(os.path.join(dossier, f"{col}.npy"), mode="w+", dtype=np.float32,
+                                             shape=(nb_intervalles, nb_transfos)) for col in COLONNES_SERIES}
+    region = np.lib.format.open_memmap(os.path.join(dossier, "region.npy"), mode="w+", dtype=np.uint8, shape=(nb_transfos,))
+    scenario = np.lib.format.open_memmap(os.path.join(dossier, "scenario.npy"), mode="w+", dtype=np.uint8, shape=(nb_transfos,))
+    for b, debut, fin in _blocs(nb_transfos):
+        c = _caracteristiques(graine, b, fin - debut, regions, sortie_kw, taux_facture, charge, (0, 0), injections)
+        region[debut:fin] = c["region"]
+        scenario[debut:fin] = c["scenario"]
+        for jour, t0 in enumerate(range(0, nb_intervalles, INTERVALLES_PAR_JOUR)):
+            t1 = min(t0 + INTERVALLES_PAR_JOUR, nb_intervalles)
+            for col, valeurs in _series_bloc(graine, b, jour, c, t0, t1, debut_injection).items():
+                series[col][t0:t1, debut:fin] = valeurs
+    for tableau in [*series.values(), region, scenario]:
+        tableau.flush()
+    meta = {
+        "graine": graine, "nb_transfos": nb_transfos, "nb_intervalles": nb_intervalles, "pas_minutes": PAS_MINUTES,
+        "regions": list(regions), "prefixe_id": prefixe_id, "premier_id": premier_id,
+        "scenarios": {nom: CODES_SCENARIOS[nom] for nom in SCENARIOS}, "injections": dict(injections or {}),
+        "debut_injection": debut_injection, "colonnes": COLONNES_SERIES,
+    }
+    with open(os.path.join(dossier, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    return meta
+
+
+def lire_simulation(dossier):
+    # (métadonnées, {colonne: tableau mappé en lecture seule}) ; series[col][t] = tout le parc à l'intervalle t
+    with open(os.path.join(dossier, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    colonnes = {col: np.load(os.path.join(dossier, f"{col}.npy"), mmap_mode="r")
+                for col in meta["colonnes"] + ["region", "scenario"]}
+    return meta, colonnes
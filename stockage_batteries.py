@@ -0,0 +1,185 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from geographie import COORDONNEES_REGIONS
+from simulateur_parc import PROFIL_JOURNALIER, graine_simulation
+
+# --- SIMULATION DU STOCKAGE (BESS + SOLAIRE) : DISPATCH HORAIRE SUR UN AN ---
+# Un site de stockage par région (batteries + champ solaire), qui sert les transformateurs en surcharge :
+#  - besoin : la colonne Charge (%) des tableaux de bord est la charge de pointe de chaque transformateur ;
+#    heure par heure, charge = pointe x profil journalier (simulateur_parc) x saison, et tout ce qui
+#    dépasse 100% de PUISSANCE_NOMINALE_KW est à délester, faute d'énergie stockée ;
+#  - production : ensoleillement horaire de ciel clair à la latitude du site (COORDONNEES_REGIONS),
+#    ramené à la crête prévue, x nébulosité journalière tirée avec la graine JIRAMA_GRAINE ;
+#  - dispatch : le solaire couvre d'abord la surcharge, puis la batterie (puissance et état de charge
+#    bornés) ; le surplus solaire recharge la batterie (et le réseau aux heures creuses si recharge_reseau) ;
+#  - allocation : l'énergie d'une heure sert d'abord les plus petits dépassements, pour couvrir
+#    entièrement le plus de transformateurs possible (moins d'abonnés délestés).
+# Tout est vectorisé sur les heures et les régions ; seul l'état de charge, récurrent, est avancé heure
+# par heure (une opération NumPy par grandeur sur les R sites). Les besoins et le nombre de
+# transformateurs couverts s'obtiennent sur les charges triées (sommes cumulées + recherche dichotomique),
+# sans tableau transformateur x heure. Résultats mémorisés par empreinte des entrées (simuler_memorise).
+
+HEURES_PAR_AN = 8760
+PROFIL_HORAIRE = PROFIL_JOURNALIER.reshape(24, -1).mean(axis=1).astype(np.float64)
+PUISSANCE_NOMINALE_KW = 630          # transformateur de distribution type (630 kVA, cos phi ~ 1)
+AMPLITUDE_SAISON = 0.08              # pointe de saison chaude (janvier) / fraîche (juillet)
+HEURES_CREUSES = range(0, 5)         # recharge sur le réseau (recharge_reseau=True)
+RENDEMENT_CHARGE = 0.95              # aller-retour ~ 0.9
+RENDEMENT_DECHARGE = 0.95
+RATIO_PERFORMANCE_PV = 0.8
+ENSOLEILLEMENT_CRETE = 1000          # W/m² à midi, ciel clair
+SITE_DEFAUT = {"capacite_kwh": 4000.0, "puissance_kw": 1000.0, "pv_kwc": 1500.0}
+SITES_BESS = {
+    "Analamanga": {"capacite_kwh": 8000.0, "puissance_kw": 2000.0, "pv_kwc": 3000.0},  # Ambatolampy
+    "Atsinanana": SITE_DEFAUT, "Diana": SITE_DEFAUT, "Boeny": SITE_DEFAUT, "Sava": SITE_DEFAUT,
+}
+TAILLE_MEMO = 16
+
+_memo = OrderedDict()
+_verrou = threading.Lock()
+
+
+# --- 1. BESOIN ET PRODUCTION HORAIRES ---
+def facteur_charge(nb_heures=HEURES_PAR_AN):
+    # Charge / charge de pointe, heure par heure : profil journalier x saison (pointe le 15 janvier)
+    heures = np.arange(nb_heures)
+    jour = heures // 24
+    saison = 1 + AMPLITUDE_SAISON * np.cos(2 * np.pi * (jour - 15) / 365)
+    return PROFIL_HORAIRE[heures % 24] * saison / (1 + AMPLITUDE_SAISON)
+
+
+def ensoleillement(latitudes, crete=ENSOLEILLEMENT_CRETE, nb_heures=HEURES_PAR_AN, graine=None):
+    # W/m² (heures x sites) : ciel clair à la latitude du site x nébulosité du jour (plus forte en saison des pluies)
+    heures = np.arange(nb_heures)
+    jour = heures // 24
+    declinaison = np.radians(23.44) * np.sin(2 * np.pi * (284 + jour) / 365)[:, None]
+    phi = np.radians(np.asarray(latitudes, dtype=float))[None, :]
+    angle_horaire = np.radians(15.0 * (heures % 24 + 0.5 - 12))[:, None]
+    hauteur = np.sin(phi) * np.sin(declinaison) + np.cos(phi) * np.cos(declinaison) * np.cos(angle_horaire)
+    rng = np.random.default_rng(graine_simulation() if graine is None else graine)
+    pluies = 0.5 + 0.5 * np.cos(2 * np.pi * (np.arange(nb_heures // 24 + 1) - 15) / 365)
+    clarte = np.clip(rng.beta(6, 2, (len(pluies), phi.shape[1])) - 0.25 * pluies[:, None], 0.1, 1.0)
+    return crete * np.clip(hauteur, 0, None) ** 1.15 * clarte[jour]
+
+
+class _ChargesRegion:
+    # Charges de pointe d'une région triées, et sommes cumulées : besoin et couverture en O(log n) par heure
+    def __init__(self, pointes):
+        self.c = np.sort(np.asarray(pointes, dtype=float))
+        self.cumul = np.r_[0.0, np.cumsum(self.c)]
+
+    def premier_en_surcharge(self, facteur):
+        return np.searchsorted(self.c, 100 / facteur, side="right")
+
+    def energie(self, debut, fin, facteur):
+        # kWh sur une heure des dépassements des rangs [debut, fin) au facteur de charge donné
+        return PUISSANCE_NOMINALE_KW / 100 * (facteur * (self.cumul[fin] - self.cumul[debut]) - 100 * (fin - debut))
+
+    def couverts(self, debut, facteur, energie):
+        # Plus grand k (par heure) tel que les k plus petits dépassements tiennent dans l'énergie disponible
+        bas, haut = np.zeros_like(debut), len(self.c) - debut
+        while np.any(bas < haut):
+            milieu = (bas + haut + 1) // 2
+            tient = self.energie(debut, debut + milieu, facteur) <= energie + 1e-6
+            bas, haut = np.where(tient, milieu, bas), np.where(tient, haut, milieu - 1)
+        return bas
+
+
+# --- 2. DISPATCH HORAIRE ---
+def simuler_dispatch(charges, regions, ensoleillement_crete=ENSOLEILLEMENT_CRETE, sites=None,
+                     recharge_reseau=False, nb_heures=HEURES_PAR_AN, graine=None):
+    # {"synthese": DataFrame par site, "series": {grandeur: (heures x sites)}, "heures_delestage": DataFrame
+    # par transformateur (ordre d'entrée)} ; charges = Charge (%) de pointe, regions = Région du transformateur
+    sites = sites or SITES_BESS
+    charges = np.asarray(charges, dtype=float)
+    codes, noms = pd.factorize(np.asarray(regions), sort=True)
+    noms = list(noms)
+    facteur = facteur_charge(nb_heures)
+    latitudes = [COORDONNEES_REGIONS.get(r, (-18.9, 47.5))[0] for r in noms]
+    site = [sites.get(r, SITE_DEFAUT) for r in noms]
+    capacite = np.array([s["capacite_kwh"] for s in site])
+    puissance = np.array([s["puissance_kw"] for s in site])
+    solaire = ensoleillement(latitudes, ensoleillement_crete, nb_heures, graine) / 1000 * RATIO_PERFORMANCE_PV \
+        * np.array([s["pv_kwc"] for s in site])
+
+    groupes = [_ChargesRegion(charges[codes == r]) for r in range(len(noms))]
+    debut = np.stack([g.premier_en_surcharge(facteur) for g in groupes], axis=1)
+    besoin = np.stack([g.energie(debut[:, r], len(g.c), facteur) for r, g in enumerate(groupes)], axis=1)
+
+    # Seule récurrence : l'état de charge, avancé heure par heure sur tous les sites à la fois
+    direct = np.minimum(solaire, besoin)
+    reste = besoin - direct
+    creuses = np.isin(np.arange(nb_heures) % 24, HEURES_CREUSES)[:, None]
+    apport = (solaire - direct) + (puissance * creuses * (reste == 0) if recharge_reseau else 0)
+    decharge, recharge, soc = np.empty_like(besoin), np.empty_like(besoin), np.empty_like(besoin)
+    etat = capacite / 2
+    for t in range(nb_heures):
+        sortie = np.minimum(np.minimum(reste[t], puissance), etat * RENDEMENT_DECHARGE)
+        etat = etat - sortie / RENDEMENT_DECHARGE
+        entree = np.minimum(np.minimum(apport[t], puissance), (capacite - etat) / RENDEMENT_CHARGE)
+        etat = etat + entree * RENDEMENT_CHARGE
+        decharge[t], recharge[t], soc[t] = sortie, entree, etat
+    delestage = reste - decharge
+
+    # Transformateurs délestés par heure, et heures délestées par transformateur (avec / sans site)
+    sans, avec = np.zeros(len(charges)), np.zeros(len(charges))
+    delestes = np.empty(besoin.shape, dtype=np.int32)
+    for r, g in enumerate(groupes):
+        n = len(g.c)
+        k = g.couverts(debut[:, r], facteur, direct[:, r] + decharge[:, r])
+        delestes[:, r] = n - debut[:, r] - k
+        rang = np.empty(n, dtype=int)
+        membres = np.flatnonzero(codes == r)
+        rang[np.argsort(charges[membres], kind="stable")] = np.arange(n)
+        sans[membres] = np.bincount(debut[:, r], minlength=n + 1)[:n].cumsum()[rang]
+        avec[membres] = np.bincount(debut[:, r] + k, minlength=n + 1)[:n].cumsum()[rang]
+
+    solaire_stocke = np.minimum(recharge, solaire - direct)
+    synthese = pd.DataFrame({
+        "Région": noms,
+        "Transformateurs": [len(g.c) for g in groupes],
+        "Besoin (MWh/an)": besoin.sum(axis=0) / 1e3,
+        "Solaire direct (MWh)": direct.sum(axis=0) / 1e3,
+        "Batterie (MWh)": decharge.sum(axis=0) / 1e3,
+        "Délestage (MWh)": delestage.sum(axis=0) / 1e3,
+        "Délestage évité (%)": np.where(besoin.sum(axis=0) > 0, 100 * (1 - delestage.sum(axis=0) / np.maximum(besoin.sum(axis=0), 1e-9)), 100.0),
+        "Heures-transfo délestées sans site": np.bincount(codes, weights=sans, minlength=len(noms)),
+        "Heures-transfo délestées": np.bincount(codes, weights=avec, minlength=len(noms)),
+        "Solaire stocké (kWh/jour)": solaire_stocke.sum(axis=0) / (nb_heures / 24),
+        "Charge moyenne batterie (%)": 100 * soc.mean(axis=0) / capacite,
+    }).round(1)
+    return {
+        "synthese": synthese,
+        "series": {"solaire_kwh": solaire, "besoin_kwh": besoin, "decharge_kwh": decharge, "recharge_kwh": recharge,
+                   "soc_kwh": soc, "delestage_kwh": delestage, "transfos_delestes": delestes, "regions": noms},
+        "heures_delestage": pd.DataFrame({"Sans site (h/an)": sans, "Avec site (h/an)": avec}),
+    }
+
+
+# --- 3. MÉMOÏSATION PAR EMPREINTE DES ENTRÉES ---
+def empreinte(charges, regions, **parametres):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(np.asarray(charges, dtype=float)).tobytes())
+    codes, noms = pd.factorize(np.asarray(regions))
+    h.update(codes.tobytes())
+    h.update("\x1f".join(map(str, noms)).encode())
+    h.update(repr(sorted(parametres.items())).encode())
+    return h.hexdigest()
+
+
+def simuler_memorise(charges, regions, **parametres):
+    # Mêmes charges, mêmes régions, mêmes paramètres : résultat partagé entre sessions et relances
+    cle = empreinte(charges, regions, **parametres)
+    with _verrou:
+        if cle in _memo:
+            _memo.move_to_end(cle)
+            return _memo[cle]
+    resultat = simuler_dispatch(charges, regions, **parametres)
+    with _verrou:
+        _memo[cle] = resultat
+        while len(_memo) > TAILLE_MEMO:
+            _memo.popitem(last=False)
+    return resultat
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+
+# --- SYNTHÈSE VOCALE AVEC CACHE AUDIO ---
+# Les clips sont adressés par leur contenu : sha256(moteur, langue, script). Deux sessions qui
+# demandent le même rapport partagent le même fichier, sans conflit d'écriture.
+# Les fichiers sont écrits dans static/audio/ et servis par URL (/app/static/audio/<clé>.<ext>)
+# quand server.enableStaticServing est actif (voir .streamlit/config.toml).
+
+DOSSIER_AUDIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "audio")
+URL_AUDIO = "/app/static/audio"
+
+
+# --- 1. MOTEURS TTS ---
+class MoteurGTTS:
+    nom = "gtts"
+    extension = "mp3"
+    mime = "audio/mpeg"
+
+    def synthetiser(self, texte, lang):
+        from gtts import gTTS
+        tampon = io.BytesIO()
+        gTTS(text=texte, lang=lang).write_to_fp(tampon)
+        return tampon.getvalue()
+
+
+class MoteurHorsLigne:
+    # Moteur sans réseau (benchmarks, postes isolés) : WAV déterministe, durée proportionnelle au texte.
+    # latence_s simule le temps de réponse d'un service TTS distant.
+    nom = "horsligne"
+    extension = "wav"
+    mime = "audio/wav"
+
+    def __init__(self, latence_s=0.0, frequence_hz=8000):
+        self.latence_s = latence_s
+        self.frequence_hz = frequence_hz
+
+    def synthetiser(self, texte, lang):
+        if self.latence_s:
+            time.sleep(self.latence_s)
+        graine = int.from_bytes(hashlib.sha256(f"{lang}|{texte}".encode()).digest()[:4], "little")
+        t = np.arange(int(self.frequence_hz * 0.06 * len(texte))) / self.frequence_hz
+        signal = (0.3 * np.sin(2 * np.pi * (300 + graine % 200) * t) * 32767).astype(np.int16)
+        tampon = io.BytesIO()
+        with wave.open(tampon, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.frequence_hz)
+            w.writeframes(signal.tobytes())
+        return tampon.getvalue()
+
+
+MOTEURS = {"gtts": MoteurGTTS, "horsligne": MoteurHorsLigne}
+
+
+# --- 2. CACHE AUDIO (MÉMOIRE + DISQUE, LRU PAR TAILLE) ---
+class Clip:
+    __slots__ = ("cle", "chemin", "url", "mime", "taille")
+
+    def __init__(self, cle, chemin, url, mime, taille):
+        self.cle = cle
+        self.chemin = chemin
+        self.url = url
+        self.mime = mime
+        self.taille = taille
+
+
+class CacheAudio:
+    def __init__(self, moteur=None, dossier=DOSSIER_AUDIO, max_disque_octets=200 * 2**20,
+                 max_memoire_octets=32 * 2**20, nb_workers=4):
+        self.moteur = moteur or MoteurGTTS()
+        self.dossier = dossier
+        self.max_disque_octets = max_disque_octets
+        self.max_memoire_octets = max_memoire_octets
+        self._pool = ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix="tts")
+        self._verrou = threading.Lock()
+        self._en_cours = {}
+        self._disque = OrderedDict()
+        self._memoire = OrderedDict()
+        self._octets_disque = 0
+        self._octets_memoire = 0
+        self.succes = 0
+        self.echecs = 0
+        os.makedirs(dossier, exist_ok=True)
+        self._indexer_disque()
+
+    def cle(self, texte, lang):
+        return hashlib.sha256(f"{self.moteur.nom}|{lang}|{texte}".encode()).hexdigest()[:32]
+
+    def _indexer_disque(self):
+        # Reprise des clips existants après redémarrage, du plus ancien au plus récent
+        suffixe = "." + self.moteur.extension
+        fichiers = [e for e in os.scandir(self.dossier) if e.is_file() and e.name.endswith(suffixe)]
+        for e in sorted(fichiers, key=lambda e: e.stat().st_mtime):
+            self._disque[e.name[:-len(suffixe)]] = self._clip(e.name[:-len(suffixe)], e.stat().st_size)
+            self._octets_disque += e.stat().st_size
+        self._evincer()
+
+    def _clip(self, cle, taille):
+        nom = f"{cle}.{self.moteur.extension}"
+        return Clip(cle, os.path.join(self.dossier, nom), f"{URL_AUDIO}/{nom}", self.moteur.mime, taille)
+
+    def _evincer(self):
+        # Appelé sous verrou (ou à l'initialisation) : supprime les clips les moins récemment lus
+        while self._octets_disque > self.max_disque_octets and len(self._disque) > 1:
+            cle, clip = self._disque.popitem(last=False)
+            self._octets_disque -= clip.taille
+            if cle in self._memoire:
+                self._octets_memoire -= len(self._memoire.pop(cle))
+            try:
+                os.remove(clip.chemin)
+            except FileNotFoundError:
+                pass
+        while self._octets_memoire > self.max_memoire_octets and self._memoire:
+            self._octets_memoire -= len(self._memoire.popitem(last=False)[1])
+
+    def demander(self, texte, lang):
+        # Retourne un Future[Clip] ; déjà résolu si le clip est en cache.
+        # Les demandes simultanées d'un même rapport partagent une seule synthèse.
+        cle = self.cle(texte, lang)
+        with self._verrou:
+            clip = self._disque.get(cle)
+            if clip is not None:
+                self._disque.move_to_end(cle)
+                self.succes += 1
+                futur = Future()
+                futur.set_result(clip)
+                return futur
+            futur = self._en_cours.get(cle)
+            if futur is None:
+                self.echecs += 1
+                futur = self._en_cours[cle] = self._pool.submit(self._synthetiser, cle, texte, lang)
+            return futur
+
+    def lire_octets(self, clip):
+        with self._verrou:
+            donnees = self._memoire.get(clip.cle)
+            if donnees is not None:
+                self._memoire.move_to_end(clip.cle)
+                return donnees
+        with open(clip.chemin, "rb") as f:
+            donnees = f.read()
+        with self._verrou:
+            self._garder_en_memoire(clip.cle, donnees)
+        return donnees
+
+    def _garder_en_memoire(self, cle, donnees):
+        if cle not in self._memoire and len(donnees) <= self.max_memoire_octets:
+            self._memoire[cle] = donnees
+            self._octets_memoire += len(donnees)
+            self._evincer()
+
+    def _synthetiser(self, cle, texte, lang):
+        try:
+            donnees = self.moteur.synthetiser(texte, lang)
+            clip = self._clip(cle, len(donnees))
+            # Écriture atomique : jamais de fichier partiel servi au navigateur
+            temporaire = f"{clip.chemin}.{threading.get_ident()}.tmp"
+            with open(temporaire, "wb") as f:
+                f.write(donnees)
+            os.replace(temporaire, clip.chemin)
+            with self._verrou:
+                self._disque[cle] = clip
+                self._octets_disque += clip.taille
+                self._garder_en_memoire(cle, donnees)
+                self._evincer()
+            return clip
+        finally:
+            with self._verrou:
+                self._en_cours.pop(cle, None)
+
+    def statistiques(self):
+        with self._verrou:
+            return {
+                "succes": self.succes, "echecs": self.echecs,
+                "clips_disque": len(self._disque), "octets_disque": self._octets_disque,
+                "clips_memoire": len(self._memoire), "octets_memoire": self._octets_memoire,
+            }
+
+
+def cache_depuis_environnement():
+    # JIRAMA_TTS=horsligne pour fonctionner sans accès à Google TTS
+    return CacheAudio(MOTEURS[os.environ.get("JIRAMA_TTS", "gtts")]())
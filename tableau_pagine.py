@@ -0,0 +1,52 @@
+import re
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --- TABLEAU PAGINÉ CÔTÉ SERVEUR (REMPLACE df.style SUR LE TABLEAU COMPLET) ---
+# Seule la page visible (TAILLE_PAGE lignes) est mise en forme et envoyée au navigateur :
+# le coût d'affichage ne dépend plus de la taille du tableau (découpage iloc, sans copie).
+# Surlignage : un drapeau booléen par cellule, calculé colonne par colonne (str.contains
+# vectorisé) sur la page seulement, au lieu d'un lambda Python appelé sur chaque cellule.
+# Le tableau reçu doit déjà être trié (ex: par Score_Suspicion) : le tri du navigateur
+# ne porte que sur la page affichée.
+
+TAILLE_PAGE = 50
+MARQUEURS_ALERTE = ("🚩", "⚠️")
+STYLE_ALERTE = "background-color: #ff4b4b"
+
+
+def drapeaux_alerte(df, marqueurs=MARQUEURS_ALERTE):
+    # Tableau booléen (forme de df) : cellule texte contenant l'un des marqueurs
+    motif = "|".join(re.escape(m) for m in marqueurs)
+    drapeaux = np.zeros(df.shape, dtype=bool)
+    for i, col in enumerate(df.columns):
+        serie = df[col]
+        if pd.api.types.is_string_dtype(serie) or serie.dtype == object:
+            drapeaux[:, i] = serie.astype(str).str.contains(motif, regex=True).to_numpy(dtype=bool, na_value=False)
+    return drapeaux
+
+
+def page_tableau(df, page, taille_page=TAILLE_PAGE):
+    debut = (page - 1) * taille_page
+    return df.iloc[debut:debut + taille_page]
+
+
+def tableau_pagine(df, cle, taille_page=TAILLE_PAGE, surligner=True, **options):
+    # st.dataframe de la page courante, sélecteur de page et compteur de lignes ; `cle` unique par tableau
+    nb_pages = max(1, -(-len(df) // taille_page))
+    cle_page = f"{cle}_page"
+    # Le tableau a rétréci (nouvelles données, filtre) : on revient sur la dernière page existante
+    if st.session_state.get(cle_page, 1) > nb_pages:
+        st.session_state[cle_page] = nb_pages
+    c1, c2 = st.columns([1, 3])
+    page = c1.number_input(f"Page (sur {nb_pages})", 1, nb_pages, 1, key=cle_page)
+    vue = page_tableau(df, page, taille_page)
+    debut = (page - 1) * taille_page
+    c2.caption(f"Lignes {debut + 1 if len(vue) else 0:,}–{debut + len(vue):,} sur {len(df):,}")
+    if surligner:
+        drapeaux = drapeaux_alerte(vue)
+        if drapeaux.any():
+            vue = vue.style.apply(lambda _: np.where(drapeaux, STYLE_ALERTE, ""), axis=None)
+    st.dataframe(vue, **options)
+    return page
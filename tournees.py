@@ -0,0 +1,202 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from geographie import COORDONNEES_REGIONS, coordonnees_gps
+
+# --- TOURNÉES TERRAIN DES AGENTS (PLUS PROCHE VOISIN + 2-OPT) ---
+# Les cibles HAUTE d'une région sont réparties en tournées d'une journée, une par agent, au départ
+# du dépôt régional (agence du chef-lieu par défaut). Objectif : le plus de Manque à gagner (Ar)
+# récupéré par heure de route, au lieu de suivre l'ordre du tableau trié par perte.
+#  0. candidats : un agent fait au plus ~16 contrôles par jour ; seules les cibles joignables dans la
+#     journée (aller-retour depuis le dépôt + un contrôle) sont gardées, puis les CANDIDATS_PAR_AGENT
+#     x agents qui rapportent le plus par heure d'aller-retour : la matrice reste petite quelle que
+#     soit la taille du parc ;
+#  1. matrice des temps de trajet entre le dépôt et les candidats, calculée une fois : distance
+#     orthodromique x FACTEUR_DETOUR (tracé réel des routes) / VITESSE_KMH ;
+#  2. construction gloutonne : depuis sa position, l'agent va à la cible qui rapporte le plus par
+#     heure (gain / (trajet + contrôle)), tant qu'il peut encore rentrer au dépôt dans la journée ;
+#  3. 2-opt sur la tournée (meilleur échange, évalué en bloc NumPy) : mêmes cibles, trajet raccourci ;
+#     le temps gagné est reproposé à l'étape 2, jusqu'à ce que plus aucune cible ne rentre.
+# Les agents sont servis l'un après l'autre ; les cibles non retenues sont reportées.
+# Tout tourne hors ligne : positions relevées lues dans un fichier local (JIRAMA_COORDONNEES,
+# CSV ID,Latitude,Longitude), position déterministe de geographie.py pour les transformateurs absents.
+
+VARIABLE_COORDONNEES = "JIRAMA_COORDONNEES"
+RAYON_TERRE_KM = 6371.0
+FACTEUR_DETOUR = 1.4        # route / vol d'oiseau
+VITESSE_KMH = 35.0          # moyenne routes nationales + pistes
+DUREE_CONTROLE_H = 0.5      # contrôle sur place (compteur, branchements)
+DUREE_JOURNEE_H = 8.0
+BLOC_MATRICE = 512          # lignes de la matrice calculées à la fois (mémoire temporaire bornée)
+MAX_ECHANGES_2OPT = 10_000
+CANDIDATS_PAR_AGENT = 64    # ~4x les contrôles possibles en une journée
+TAILLE_MEMO = 16
+
+_memo = OrderedDict()
+_verrou = threading.Lock()
+_coordonnees = {}
+
+
+# --- 1. POSITIONS ET MATRICE DES TEMPS DE TRAJET ---
+def charger_coordonnees(chemin=None):
+    # DataFrame (Latitude, Longitude) indexé par ID, relu seulement si le fichier a changé ; vide sans fichier
+    chemin = chemin or os.environ.get(VARIABLE_COORDONNEES)
+    if not chemin or not os.path.isfile(chemin):
+        return pd.DataFrame(columns=["Latitude", "Longitude"], dtype=float)
+    cle = (chemin, os.path.getmtime(chemin))
+    with _verrou:
+        if cle not in _coordonnees:
+            releves = pd.read_csv(chemin, dtype={"ID": str}, usecols=["ID", "Latitude", "Longitude"])
+            _coordonnees.clear()
+            _coordonnees[cle] = releves.drop_duplicates("ID", keep="last").set_index("ID")
+        return _coordonnees[cle]
+
+
+def positions(ids, regions, releves=None):
+    # (latitude, longitude) : position relevée si connue, sinon position déterministe autour du chef-lieu
+    lat, lon = coordonnees_gps(ids, regions)
+    if releves is not None and len(releves):
+        connus = releves.reindex(pd.Index(ids).astype(str))
+        trouve = connus["Latitude"].notna().to_numpy()
+        lat = np.where(trouve, connus["Latitude"].to_numpy(float), lat)
+        lon = np.where(trouve, connus["Longitude"].to_numpy(float), lon)
+    return lat, lon
+
+
+def _heures(phi_a, lam_a, phi_b, lam_b):
+    # Heures de route (radians en entrée, diffusion NumPy entre a et b)
+    a = np.sin((phi_a - phi_b) / 2) ** 2 + np.cos(phi_a) * np.cos(phi_b) * np.sin((lam_a - lam_b) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * (FACTEUR_DETOUR / VITESSE_KMH)
+
+
+def matrice_temps(lat, lon):
+    # Heures de route entre tous les points, en float32 (100 Mo pour 5 000 points)
+    phi, lam = np.radians(lat), np.radians(lon)
+    n = len(phi)
+    temps = np.empty((n, n), dtype=np.float32)
+    for debut in range(0, n, BLOC_MATRICE):
+        b = slice(debut, debut + BLOC_MATRICE)
+        temps[b] = _heures(phi[b, None], lam[b, None], phi[None, :], lam[None, :])
+    return temps
+
+
+def candidats(depot, lat, lon, gains, nb_agents, duree_h=DUREE_JOURNEE_H):
+    # Positions (croissantes) des cibles retenues pour la matrice : joignables dans la journée, puis
+    # les CANDIDATS_PAR_AGENT x nb_agents de meilleur gain / (aller-retour + contrôle) ; O(n)
+    aller = _heures(np.radians(depot[0]), np.radians(depot[1]), np.radians(lat), np.radians(lon))
+    visite = 2 * aller + DUREE_CONTROLE_H
+    with np.errstate(invalid="ignore"):
+        retenues = np.flatnonzero(visite <= duree_h)
+    k = CANDIDATS_PAR_AGENT * nb_agents
+    if len(retenues) > k:
+        retenues = retenues[np.argpartition(-gains[retenues] / visite[retenues], k - 1)[:k]]
+    return np.sort(retenues)
+
+
+# --- 2. CONSTRUCTION ET AMÉLIORATION D'UNE TOURNÉE ---
+def _duree(temps, tournee):
+    # Heures écoulées au dernier contrôle (retour au dépôt non compris)
+    etapes = np.array([0, *tournee])
+    return float(temps[etapes[:-1], etapes[1:]].sum()) + DUREE_CONTROLE_H * len(tournee)
+
+
+def _prolonger(temps, gains, restants, duree_h, tournee):
+    # Ajoute à la tournée les cibles les plus rentables par heure ; `restants` est modifié en place
+    tournee = list(tournee)
+    courant = tournee[-1] if tournee else 0
+    ecoule = _duree(temps, tournee)
+    retour = temps[:, 0]
+    while True:
+        aller = temps[courant]
+        faisable = restants & (ecoule + aller + DUREE_CONTROLE_H + retour <= duree_h)
+        if not faisable.any():
+            return tournee
+        suivant = int(np.argmax(np.where(faisable, gains / (aller + DUREE_CONTROLE_H), -np.inf)))
+        ecoule += float(aller[suivant]) + DUREE_CONTROLE_H
+        restants[suivant] = False
+        tournee.append(suivant)
+        courant = suivant
+
+
+def deux_opt(temps, tournee):
+    # Tournée fermée dépôt -> cibles -> dépôt : à chaque itération, l'inversion de segment qui raccourcit
+    # le plus le trajet (tous les couples d'arcs évalués d'un coup)
+    t = np.array([0, *tournee, 0])
+    for _ in range(MAX_ECHANGES_2OPT):
+        a, b = t[:-1], t[1:]
+        arcs = temps[a, b]
+        gain = np.triu(temps[np.ix_(a, a)] + temps[np.ix_(b, b)] - arcs[:, None] - arcs[None, :], 2)
+        i, j = np.unravel_index(np.argmin(gain), gain.shape)
+        if gain[i, j] >= -1e-6:
+            break
+        t[i + 1:j + 1] = t[i + 1:j + 1][::-1].copy()
+    return t[1:-1].tolist()
+
+
+def tournee_agent(temps, gains, restants, duree_h=DUREE_JOURNEE_H):
+    tournee = []
+    while True:
+        nb = len(tournee)
+        tournee = _prolonger(temps, gains, restants, duree_h, tournee)
+        if len(tournee) == nb:
+            return tournee
+        tournee = deux_opt(temps, tournee)
+
+
+# --- 3. PLANIFICATION PAR RÉGION ---
+def planifier_tournees(missions, col_id, col_region, col_gain, agents_par_region=2, duree_h=DUREE_JOURNEE_H,
+                       depots=None, coordonnees=None):
+    # (feuille de route : une ligne par arrêt dans l'ordre de visite, synthèse : une ligne par agent)
+    # agents_par_region : nombre identique partout, ou {Région: nombre} ; régions sans dépôt connu ignorées
+    depots = depots or COORDONNEES_REGIONS
+    releves = charger_coordonnees(coordonnees)
+    arrets, synthese = [], []
+    for region, groupe in missions.groupby(col_region, sort=True, observed=True):
+        nb_agents = agents_par_region.get(region, 0) if isinstance(agents_par_region, dict) else agents_par_region
+        if region not in depots or not nb_agents:
+            continue
+        lat, lon = positions(groupe[col_id].to_numpy(), groupe[col_region].to_numpy(), releves)
+        gains = np.clip(groupe[col_gain].to_numpy(float), 0, None)
+        retenues = candidats(depots[region], lat, lon, gains, nb_agents, duree_h)
+        if not len(retenues):
+            continue
+        groupe, lat, lon = groupe.iloc[retenues], lat[retenues], lon[retenues]
+        temps = matrice_temps(np.r_[depots[region][0], lat], np.r_[depots[region][1], lon])
+        gains = np.r_[0.0, gains[retenues]]
+        restants = np.r_[False, np.ones(len(retenues), dtype=bool)]
+        for agent in range(1, nb_agents + 1):
+            tournee = tournee_agent(temps, gains, restants, duree_h)
+            if not tournee:
+                break
+            cibles = np.array(tournee)
+            trajet = temps[np.r_[0, cibles[:-1]], cibles].astype(float)
+            arrivee = np.cumsum(trajet + DUREE_CONTROLE_H) - DUREE_CONTROLE_H
+            route_h = trajet.sum() + float(temps[cibles[-1], 0])
+            arrets.append(groupe.iloc[cibles - 1][[col_id, col_region, col_gain]].assign(
+                Agent=agent, Ordre=np.arange(1, len(cibles) + 1), Latitude=lat[cibles - 1], Longitude=lon[cibles - 1],
+                **{"Trajet (km)": (trajet * VITESSE_KMH).round(1), "Arrivée (h)": arrivee.round(2)}))
+            synthese.append({"Région": region, "Agent": agent, "Arrêts": len(cibles),
+                             "Distance (km)": round(route_h * VITESSE_KMH, 1), "Route (h)": round(route_h, 2),
+                             "Journée (h)": round(route_h + DUREE_CONTROLE_H * len(cibles), 2),
+                             "Récupéré (Ar)": round(gains[cibles].sum()),
+                             "Ar / heure de route": round(gains[cibles].sum() / route_h) if route_h > 0 else None})
+    colonnes = ["Agent", "Ordre", col_id, col_region, col_gain, "Latitude", "Longitude", "Trajet (km)", "Arrivée (h)"]
+    feuille = pd.concat(arrets, ignore_index=True)[colonnes] if arrets else pd.DataFrame(columns=colonnes)
+    return feuille, pd.DataFrame(synthese)
+
+
+def tournees_memorisees(cle, missions, **parametres):
+    # Pour les dashboards : une relance sans nouvelles données ni nouveaux paramètres ne replanifie pas
+    cle = (cle, repr(sorted(parametres.items())))
+    with _verrou:
+        if cle in _memo:
+            _memo.move_to_end(cle)
+            return _memo[cle]
+    resultat = planifier_tournees(missions, **parametres)
+    with _verrou:
+        _memo[cle] = resultat
+        while len(_memo) > TAILLE_MEMO:
+            _memo.popitem(last=False)
+    return resultat